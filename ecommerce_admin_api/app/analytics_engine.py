@@ -0,0 +1,427 @@
+import time
+import logging
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import func, or_, select
+
+from ecommerce_admin_api.app.cache import cache
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.models.product import Product
+from ecommerce_admin_api.app.models.sale import Sale
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+
+# rows read per round trip when loading sales
+LOAD_BATCH = 100000
+# sales that arrived out of day order are merged into the sorted columns past this size
+MERGE_AT = 100000
+# ids skipped by the tail are re-checked this long (an open transaction may still commit them)
+GAP_SECONDS = 60
+MAX_GAPS = 10000
+
+# column -> numpy dtype, about 20 bytes a sale
+COLUMNS = {"product": "int32", "channel": "int16", "day": "int32", "quantity": "int64", "total": "float64"}
+
+
+def _day(value: date) -> int:
+    return (value - EPOCH).days
+
+
+class SalesColumns:
+    """
+    Sales as numpy columns (product id, channel code, day, quantity, total) for the
+    analytics functions in services.sales
+    Columns are sorted by day so a date range is a slice found with searchsorted;
+    sales are tailed by id and land in a small unsorted delta that is merged in
+    once it grows. Product categories are a product id -> category code array,
+    caught up like the search index when the products namespace version moves
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.ready = False
+            self.main = None  # column -> sorted array
+            self.delta = None  # column -> unsorted array, newest sales
+            self.last_id = 0
+            self.gaps = {}  # sale id -> when it was first missed
+            self.channels = {}  # channel -> code
+            self.channel_names = []
+            self.categories = {}  # category -> code
+            self.category_names = []
+            self.product_category = None  # product id -> category code, -1 = no such product
+            self.products_version = None
+            self.products_synced_at = None
+            self.synced = 0.0  # monotonic time of the last catch-up
+
+    # -- keeping up with the database
+
+    def touch(self):
+        """This worker wrote sales - catch up on the next read instead of waiting for the refresh"""
+        self.synced = 0.0
+
+    def sync(self, db):
+        """Load on first use, then pull in new sales and product changes"""
+        try:
+            (products_version,) = cache.versions("products")
+        except Exception:
+            logger.exception("products version lookup failed, analytics categories may be stale")
+            products_version = self.products_version
+
+        if (
+            self.ready
+            and time.monotonic() - self.synced < settings.ANALYTICS_ENGINE_REFRESH_SECONDS
+            and products_version == self.products_version
+        ):
+            return
+
+        with self._sync_lock:
+            if not self.ready:
+                self._load(db)
+            else:
+                self._catch_up_sales(db)
+                if products_version != self.products_version:
+                    self._catch_up_products(db)
+            self.products_version = products_version
+            self.synced = time.monotonic()
+
+    def warm_up(self, session_factory):
+        """Load the columns now (e.g. on a startup thread) so the first dashboard doesn't wait"""
+        db = session_factory()
+        try:
+            self.sync(db)
+        except Exception:
+            logger.exception("analytics engine warm-up failed, it will load on the first analytics query")
+        finally:
+            db.close()
+
+    def _code(self, codes, names, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def _sales_query(self):
+        return select(
+            Sale.id, Sale.product_id, Sale.channel, func.date(Sale.sale_date),
+            Sale.quantity, Sale.total_amount
+        )
+
+    def _to_columns(self, rows):
+        """Sale rows -> (ids, columns)"""
+        import numpy as np
+
+        ids, products, channels, days, quantities, totals = zip(*rows)
+        columns = {
+            # sales whose product was deleted point at 0, which is never a product
+            "product": np.fromiter((p or 0 for p in products), dtype=COLUMNS["product"], count=len(rows)),
+            "channel": np.fromiter(
+                (self._code(self.channels, self.channel_names, c) for c in channels),
+                dtype=COLUMNS["channel"], count=len(rows)
+            ),
+            # DATE() is a string on sqlite and a date on mysql, numpy parses both
+            "day": np.array(days, dtype="datetime64[D]").astype(COLUMNS["day"]),
+            "quantity": np.fromiter((q or 0 for q in quantities), dtype=COLUMNS["quantity"], count=len(rows)),
+            "total": np.fromiter((t or 0 for t in totals), dtype=COLUMNS["total"], count=len(rows)),
+        }
+        return ids, columns
+
+    def _load(self, db):
+        import numpy as np
+
+        self.clear()
+        self._load_products(db)
+
+        chunks = []
+        last_id = 0
+        while True:
+            rows = db.execute(
+                self._sales_query().where(Sale.id > last_id).order_by(Sale.id).limit(LOAD_BATCH)
+            ).all()
+            if not rows:
+                break
+            ids, columns = self._to_columns(rows)
+            chunks.append(columns)
+            last_id = ids[-1]
+
+        main = {
+            name: np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        order = np.argsort(main["day"], kind="stable")
+        main = {name: column[order] for name, column in main.items()}
+
+        with self._lock:
+            self.main = main
+            self.delta = {name: column[:0] for name, column in main.items()}
+            self.last_id = last_id
+            self.ready = True
+
+    def _catch_up_sales(self, db):
+        import numpy as np
+
+        now = time.monotonic()
+        # ids missed last time may belong to transactions that committed since
+        self.gaps = {sale_id: seen for sale_id, seen in self.gaps.items() if now - seen < GAP_SECONDS}
+        condition = Sale.id > self.last_id
+        if self.gaps:
+            condition = or_(condition, Sale.id.in_(list(self.gaps)))
+
+        rows = db.execute(self._sales_query().where(condition).order_by(Sale.id)).all()
+        if not rows:
+            return
+
+        ids, columns = self._to_columns(rows)
+        for sale_id in ids:
+            self.gaps.pop(sale_id, None)
+        expected = self.last_id + 1
+        for sale_id in ids:
+            if sale_id > expected:
+                self.gaps.update((missing, now) for missing in range(expected, min(sale_id, expected + MAX_GAPS)))
+            expected = max(expected, sale_id + 1)
+        if len(self.gaps) > MAX_GAPS:
+            # something bulk is going on - give up on the oldest gaps
+            for sale_id in sorted(self.gaps)[:len(self.gaps) - MAX_GAPS]:
+                del self.gaps[sale_id]
+
+        delta = {name: np.concatenate([self.delta[name], columns[name]]) for name in COLUMNS}
+        main = self.main
+        if len(delta["day"]) >= MERGE_AT:
+            # into the sorted columns, each sale after the ones of the same day
+            order = np.argsort(delta["day"], kind="stable")
+            delta = {name: column[order] for name, column in delta.items()}
+            at = np.searchsorted(main["day"], delta["day"], side="right")
+            main = {name: np.insert(main[name], at, delta[name]) for name in COLUMNS}
+            delta = {name: column[:0] for name, column in delta.items()}
+
+        with self._lock:
+            self.main = main
+            self.delta = delta
+            self.last_id = max(self.last_id, ids[-1])
+
+    def _product_rows(self, db):
+        return db.query(Product.id, Product.category, Product.updated_at)
+
+    def _set_categories(self, rows):
+        import numpy as np
+
+        rows = list(rows)
+        if not rows:
+            return
+        top = max(row.id for row in rows)
+        if self.product_category is None or top >= len(self.product_category):
+            grown = np.full(max(top + 1, int(top * 1.25)), -1, dtype=np.int32)
+            if self.product_category is not None:
+                grown[:len(self.product_category)] = self.product_category
+            self.product_category = grown
+        for row in rows:
+            self.product_category[row.id] = self._code(self.categories, self.category_names, row.category)
+            if row.updated_at and (self.products_synced_at is None or row.updated_at > self.products_synced_at):
+                self.products_synced_at = row.updated_at
+
+    def _load_products(self, db):
+        self._set_categories(self._product_rows(db).execution_options(yield_per=10000))
+
+    def _catch_up_products(self, db):
+        import numpy as np
+
+        # new and changed products - same second again, updated_at isn't finer than that
+        query = self._product_rows(db)
+        if self.products_synced_at is not None:
+            query = query.filter(Product.updated_at >= self.products_synced_at)
+        self._set_categories(query)
+
+        # deleted products - only compare ids when the counts say something is off
+        known = int(np.count_nonzero(self.product_category >= 0)) if self.product_category is not None else 0
+        if db.query(Product.id).count() != known:
+            ids = np.fromiter((product_id for (product_id,) in db.query(Product.id)), dtype=np.int64)
+            exists = np.zeros(len(self.product_category), dtype=bool)
+            exists[ids[ids < len(exists)]] = True
+            self.product_category[~exists] = -1
+
+    # -- reads
+
+    def _segments(self, start_date: date, end_date: date, category=None, channel=None):
+        """Columns of the sales in a whole-day range, filtered - the sorted slice and the delta"""
+        import numpy as np
+
+        with self._lock:
+            main, delta = self.main, self.delta
+        low, high = _day(start_date), _day(end_date)
+
+        segments = []
+        # keys in the column's dtype - a python int makes numpy cast the whole column first
+        day = main["day"].dtype.type
+        begin = np.searchsorted(main["day"], day(low), side="left")
+        end = np.searchsorted(main["day"], day(high), side="right")
+        segments.append({name: column[begin:end] for name, column in main.items()})
+        if len(delta["day"]):
+            in_range = (delta["day"] >= low) & (delta["day"] <= high)
+            segments.append({name: column[in_range] for name, column in delta.items()})
+
+        channel_code = self.channels.get(channel) if channel else None
+        category_code = self.categories.get(category) if category else None
+        filtered = []
+        for segment in segments:
+            keep = None
+            if channel:
+                keep = segment["channel"] == (channel_code if channel_code is not None else -1)
+            if category:
+                in_category = self._products_in(category_code, segment["product"])
+                keep = in_category if keep is None else keep & in_category
+            if keep is not None:
+                segment = {name: column[keep] for name, column in segment.items()}
+            filtered.append(segment)
+        return filtered
+
+    def _products_in(self, category_code, products):
+        """Mask of the sales whose product is in a category, one gather from a per-product mask"""
+        import numpy as np
+
+        categories = self.product_category
+        if category_code is None or categories is None:
+            return np.zeros(len(products), dtype=bool)
+        # trailing False - ids past the end (products newer than the last catch up) clip onto it
+        wanted = np.append(categories == category_code, False)
+        return np.take(wanted, products, mode="clip")
+
+    def _category_of(self, products):
+        """Category code per sale, -1 for sales without a (known) product"""
+        import numpy as np
+
+        categories = self.product_category
+        if categories is None:
+            return np.full(len(products), -1, dtype=np.int32)
+        inside = products < len(categories)
+        codes = np.full(len(products), -1, dtype=np.int32)
+        codes[inside] = categories[products[inside]]
+        return codes
+
+    def totals(self, start_date: date, end_date: date, category=None, channel=None):
+        """(total sales, total quantity) in the range, None for both when nothing sold"""
+        segments = self._segments(start_date, end_date, category, channel)
+        count = sum(len(segment["day"]) for segment in segments)
+        if not count:
+            return None, None
+        return (
+            float(sum(segment["total"].sum() for segment in segments)),
+            int(sum(segment["quantity"].sum() for segment in segments))
+        )
+
+    def daily(self, start_date: date, end_date: date, category=None, channel=None):
+        """(day, total sales, total quantity) for each day in the range that has sales"""
+        import numpy as np
+
+        low = _day(start_date)
+        days = _day(end_date) - low + 1
+        counts = np.zeros(days, dtype=np.int64)
+        sales = np.zeros(days)
+        quantities = np.zeros(days)
+        for segment in self._segments(start_date, end_date, category, channel):
+            offsets = segment["day"] - low
+            counts += np.bincount(offsets, minlength=days)
+            sales += np.bincount(offsets, weights=segment["total"], minlength=days)
+            quantities += np.bincount(offsets, weights=segment["quantity"], minlength=days)
+        return [
+            (start_date + timedelta(days=int(offset)), float(sales[offset]), int(round(quantities[offset])))
+            for offset in np.flatnonzero(counts)
+        ]
+
+    def _product_totals(self, start_date: date, end_date: date):
+        """Per product id: sales count, total sales, total quantity"""
+        import numpy as np
+
+        size = len(self.product_category) if self.product_category is not None else 1
+        segments = self._segments(start_date, end_date)
+        for segment in segments:
+            if len(segment["product"]):
+                size = max(size, int(segment["product"].max()) + 1)
+        counts = np.zeros(size, dtype=np.int64)
+        sales = np.zeros(size)
+        quantities = np.zeros(size)
+        for segment in segments:
+            counts += np.bincount(segment["product"], minlength=size)
+            sales += np.bincount(segment["product"], weights=segment["total"], minlength=size)
+            quantities += np.bincount(segment["product"], weights=segment["quantity"], minlength=size)
+        return counts, sales, quantities
+
+    def by_product(self, start_date: date, end_date: date, limit: int = 10):
+        """(product id, total sales, total quantity) for the top sellers, sales of deleted products as None"""
+        import numpy as np
+
+        counts, sales, quantities = self._product_totals(start_date, end_date)
+        known = self._category_of(np.arange(len(counts))) >= 0
+
+        # like GROUP BY product_id - sales without a product are one group
+        orphan = ~known & (counts > 0)
+        sold = np.flatnonzero(known & (counts > 0))
+        limit = max(limit, 0)
+        if len(sold) > limit:
+            # only the top sellers become python tuples
+            sold = sold[np.argpartition(-sales[sold], limit - 1)[:limit]] if limit else sold[:0]
+        groups = [
+            (int(product_id), float(sales[product_id]), int(round(quantities[product_id])))
+            for product_id in sold
+        ]
+        if orphan.any():
+            groups.append((None, float(sales[orphan].sum()), int(round(quantities[orphan].sum()))))
+        groups.sort(key=lambda group: group[1], reverse=True)
+        return groups[:limit]
+
+    def by_category(self, start_date: date, end_date: date):
+        """(category, total sales, total quantity) per category, biggest first"""
+        import numpy as np
+
+        counts, sales, quantities = self._product_totals(start_date, end_date)
+        codes = self._category_of(np.arange(len(counts)))
+        # like the inner join on products - sales without a product drop out
+        sold = (codes >= 0) & (counts > 0)
+        size = len(self.category_names)
+        category_sales = np.bincount(codes[sold], weights=sales[sold], minlength=size)
+        category_quantities = np.bincount(codes[sold], weights=quantities[sold], minlength=size)
+        present = np.zeros(size, dtype=bool)
+        present[codes[sold]] = True
+        groups = [
+            (self.category_names[code], float(category_sales[code]), int(round(category_quantities[code])))
+            for code in np.flatnonzero(present)
+        ]
+        groups.sort(key=lambda group: group[1], reverse=True)
+        return groups
+
+
+# one per worker process
+sales_columns = SalesColumns()
+
+
+def available():
+    """numpy is installed - the engine is an optional extra"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_warned = False
+
+
+def columns_for(db):
+    """The synced engine when ANALYTICS_ENGINE is on, None to answer with SQL"""
+    global _warned
+    if not settings.ANALYTICS_ENGINE:
+        return None
+    if not available():
+        if not _warned:
+            logger.error("ANALYTICS_ENGINE needs the numpy package (pip install numpy), using SQL")
+            _warned = True
+        return None
+    sales_columns.sync(db)
+    return sales_columns
@@ -0,0 +1,305 @@
+import json
+import time
+import hashlib
+import inspect
+import logging
+import threading
+import functools
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from ecommerce_admin_api.app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# values are stored as JSON so any worker (or another process) can read them
+# dates are tagged so they come back as dates, not strings
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"can't cache {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def dumps(value):
+    return json.dumps(value, default=_encode, separators=(",", ":"))
+
+
+def loads(raw):
+    return json.loads(raw, object_hook=_decode)
+
+
+class MemoryBackend:
+    """Per-process LRU store with TTLs, bounded by entry count and bytes"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (raw value, expires_at)
+        self._counters = {}  # version counters, never evicted
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                if key in self._counters:
+                    values.append(str(self._counters[key]))
+                    continue
+
+                entry = self._entries.get(key)
+                if entry is None or entry[1] < now:
+                    if entry is not None:
+                        self._drop(key)
+                    values.append(None)
+                    continue
+
+                # most recently used goes to the end
+                self._entries.move_to_end(key)
+                values.append(entry[0])
+        return values
+
+    def set(self, key, value: str, ttl: float):
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self.bytes += len(value)
+
+            # evict least recently used until back in bounds
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def add(self, key, value: int):
+        """Set a counter only if it doesn't exist"""
+        with self._lock:
+            self._counters.setdefault(key, value)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "evictions": self.evictions}
+
+    def _drop(self, key):
+        # caller holds the lock
+        value, _ = self._entries.pop(key)
+        self.bytes -= len(value)
+
+
+class RedisBackend:
+    """
+    Shared store for all workers, over the Redis protocol
+    Takes any redis-py compatible client (e.g. a fakeredis instance in tests)
+    """
+
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package (pip install redis)")
+        return cls(redis.Redis.from_url(url))
+
+    def get_many(self, keys):
+        return [
+            value.decode() if isinstance(value, bytes) else value
+            for value in self.client.mget(keys)
+        ]
+
+    def set(self, key, value: str, ttl: float):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def add(self, key, value: int):
+        self.client.set(key, value, nx=True)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def stats(self):
+        return {}
+
+
+class Cache:
+    """
+    Cache front with versioned keys
+    Every cached key embeds the current version of the namespace (and of the
+    buckets it depends on); invalidating bumps a version, so all workers
+    sharing the backend stop using the old keys at once and they expire by TTL
+    """
+
+    def __init__(self, backend, prefix: str):
+        self.backend = backend
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _version_keys(self, namespace, buckets):
+        return [f"{self.prefix}:v:{namespace}"] + [f"{self.prefix}:v:{namespace}:{bucket}" for bucket in buckets]
+
+    def versions(self, namespace, buckets=()):
+        """Current version numbers for a namespace and buckets in it"""
+        keys = self._version_keys(namespace, buckets)
+        values = self.backend.get_many(keys)
+
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if missing:
+            # start at the current time, so a lost counter never repeats an old version
+            seed = int(time.time() * 1000)
+            for key in missing:
+                self.backend.add(key, seed)
+            values = self.backend.get_many(keys)
+
+        return [int(value) for value in values]
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) on a miss or backend error"""
+        try:
+            (raw,) = self.backend.get_many([key])
+        except Exception:
+            logger.exception("cache read failed")
+            self._count("errors")
+            return False, None
+
+        if raw is None:
+            self._count("misses")
+            return False, None
+
+        self._count("hits")
+        return True, loads(raw)
+
+    def set(self, key, value, ttl):
+        try:
+            self.backend.set(key, dumps(value), ttl)
+        except Exception:
+            logger.exception("cache write failed")
+            self._count("errors")
+
+    def invalidate(self, namespace, buckets=None):
+        """Bump versions so existing keys stop being used - just these buckets, or the whole namespace"""
+        if buckets:
+            keys = self._version_keys(namespace, buckets)[1:]
+        else:
+            keys = self._version_keys(namespace, [])
+
+        try:
+            for key in keys:
+                self.backend.incr(key)
+        except Exception:
+            logger.exception("cache invalidation failed")
+            self._count("errors")
+            return
+
+        with self._lock:
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def _make_backend():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(settings.CACHE_REDIS_URL)
+    return MemoryBackend(max_entries=settings.CACHE_MAX_ENTRIES, max_bytes=settings.CACHE_MAX_BYTES)
+
+
+# one cache front per worker process, the backend may be shared
+cache = Cache(_make_backend(), prefix=settings.CACHE_KEY_PREFIX)
+
+
+def month_buckets(date_ranges):
+    """Months touched by a list of (start, end) days, e.g. ["2024-01", "2024-02"]"""
+    months = set()
+    for start, end in date_ranges:
+        month = start.replace(day=1)
+        while month <= end:
+            months.add(month.strftime("%Y-%m"))
+            month = (month + timedelta(days=32)).replace(day=1)
+    return sorted(months)
+
+
+def cached(namespace, ttl, buckets=None):
+    """
+    Cache a service function's result keyed on its normalized arguments
+    buckets gets the bound arguments and returns the version buckets within
+    the namespace the result depends on (e.g. the months it covers)
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return fn(db, *args, **kwargs)
+
+            # same key whether arguments came positionally, by name or defaulted
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: value for name, value in bound.arguments.items() if name != "db"}
+            arguments_hash = hashlib.sha1(
+                repr(sorted((name, repr(value)) for name, value in arguments.items())).encode()
+            ).hexdigest()
+
+            try:
+                versions = cache.versions(namespace, buckets(arguments) if buckets else ())
+            except Exception:
+                logger.exception("cache version lookup failed")
+                return fn(db, *args, **kwargs)
+
+            version = hashlib.sha1(repr(versions).encode()).hexdigest()[:12]
+            key = f"{cache.prefix}:{namespace}:{fn.__name__}:{version}:{arguments_hash}"
+
+            found, value = cache.get(key)
+            if found:
+                return value
+
+            value = fn(db, *args, **kwargs)
+            cache.set(key, value, ttl)
+            return value
+
+        return wrapper
+    return decorator
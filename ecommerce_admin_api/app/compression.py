@@ -0,0 +1,161 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from ecommerce_admin_api.app.config import settings
+
+try:
+    import brotli  # optional - responses are gzipped without it
+except ImportError:
+    brotli = None
+
+# content types worth compressing - .gz exports and parquet files are compressed already
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# codings in the order they are preferred
+CODINGS = ("br", "gzip")
+
+
+def negotiate(accept_encoding: str):
+    """Best coding the client accepts (br needs the brotli package), None for identity"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in CODINGS:
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def _compressor(coding: str):
+    """(compress, finish) for a stream in the coding"""
+    if coding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    # wbits 31 - deflate in a gzip container
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _tag_etag(headers: MutableHeaders, coding: str):
+    # the compressed body is another representation, so it gets its own strong ETag ("abc-gzip")
+    etag = headers.get("etag")
+    if etag and etag.endswith('"'):
+        headers["etag"] = f'{etag[:-1]}-{coding}"'
+
+
+def _untag_etags(value: str):
+    """If-None-Match with the codings _tag_etag added taken off, and the coding found"""
+    tags = []
+    found = None
+    for tag in value.split(","):
+        tag = tag.strip()
+        for coding in CODINGS:
+            if tag.endswith(f'-{coding}"'):
+                tag = tag[:-len(coding) - 2] + '"'
+                found = coding
+                break
+        tags.append(tag)
+    return ", ".join(tags), found
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON and text responses of COMPRESSION_MINIMUM_SIZE or more - brotli
+    when installed and accepted, otherwise gzip. Streamed responses (exports) are
+    compressed chunk by chunk; responses that have a Content-Encoding or aren't a
+    compressible type pass through untouched
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        coding = negotiate(headers.get("accept-encoding", ""))
+        cached_coding = None  # coding of the copy the client revalidates
+        if "if-none-match" in headers:
+            if_none_match, cached_coding = _untag_etags(headers["if-none-match"])
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, if_none_match.encode("latin-1") if name == b"if-none-match" else value)
+                for name, value in scope["headers"]
+            ]
+
+        held = None  # response start, sent once the first body chunk shows the size
+        stream = None  # (compress, finish) once compressing
+
+        async def send_compressed(message):
+            nonlocal held, stream
+
+            if message["type"] == "http.response.start":
+                held = message
+                return
+            if message["type"] != "http.response.body":
+                if held is not None:
+                    await send(held)
+                    held = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if held is not None:
+                start, held = held, None
+                response_headers = MutableHeaders(scope=start)
+                content_type = response_headers.get("content-type", "")
+
+                if start["status"] == 304:
+                    # the client keeps its copy - same tag as the one it sent
+                    response_headers.add_vary_header("Accept-Encoding")
+                    if cached_coding:
+                        _tag_etag(response_headers, cached_coding)
+                elif "content-encoding" not in response_headers and content_type.startswith(COMPRESSIBLE_TYPES):
+                    response_headers.add_vary_header("Accept-Encoding")
+                    if coding and (more_body or len(body) >= settings.COMPRESSION_MINIMUM_SIZE):
+                        stream = _compressor(coding)
+                        response_headers["Content-Encoding"] = coding
+                        _tag_etag(response_headers, coding)
+                        if more_body:
+                            if "content-length" in response_headers:
+                                del response_headers["content-length"]
+                        else:
+                            compress, finish = stream
+                            body = compress(body) + finish()
+                            response_headers["Content-Length"] = str(len(body))
+                            await send(start)
+                            await send({"type": "http.response.body", "body": body})
+                            return
+                await send(start)
+
+            if stream is None:
+                await send(message)
+                return
+
+            compress, finish = stream
+            body = compress(body)
+            if not more_body:
+                body += finish()
+            elif not body:
+                # still buffering in the compressor
+                return
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseSettings
 
 
@@ -8,11 +9,106 @@ class Settings(BaseSettings):
     DB_USER: str = "root" 
     DB_PASSWORD: str = "password"  # remember to change this!
     DB_NAME: str = "ecommerce_admin"
+    DATABASE_URL: Optional[str] = None  # overrides the DB_* values, e.g. sqlite:///./dev.db
+    
+    # async stack - async engine/sessions and async route handlers
+    # uses aiomysql for mysql and aiosqlite for sqlite urls
+    DB_ASYNC: bool = False
+    
+    # connection pool - per worker process, so total = workers * (size + overflow)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 3600  # keep below MySQL's wait_timeout
+    DB_POOL_PRE_PING: bool = True  # check connections before use, drops stale ones
+    DB_STATEMENT_CACHE_SIZE: int = 500  # compiled SQL statements cached per engine
+    
+    # the schema is managed by scripts/migrate.py, run once per deploy - not by every worker
+    # turn this on to migrate when the app starts (single-process dev setups)
+    DB_MIGRATE_ON_STARTUP: bool = False
     
     # api config - might tweak this later
     API_PREFIX: str = "/api"
     APP_NAME: str = "E-commerce Admin API"
     
+    # analytics read from the sales_daily_rollup table instead of scanning sales
+    # scripts/migrate.py backfills it from existing sales, scripts/rebuild_rollup.py rebuilds it
+    USE_SALES_ROLLUP: bool = True
+    
+    # top sellers kept per rolling window (days before today, 30 is the /sales/by-product default)
+    # so those ranges read the first rows of an index, other ranges group the rollup
+    # windows are built from the rollup and moved to the new day by scripts/refresh_leaderboard.py,
+    # run it from cron just after midnight - until it has, those ranges group the rollup too
+    SALES_LEADERBOARD: bool = True
+    SALES_LEADERBOARD_WINDOWS: List[int] = [0, 7, 30, 90]
+    # sale writes don't lock the windows - after moving them the refresh waits this long, then
+    # recounts them from the rollup; keep it above the longest sale transaction (a POST /sales/bulk chunk)
+    SALES_LEADERBOARD_SETTLE_SECONDS: float = 5
+    
+    # cache for product reads and analytics results
+    # memory is per worker, redis is shared by every worker on every node
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "memory"  # memory or redis
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "ecommerce_admin"
+    CACHE_MAX_ENTRIES: int = 1024  # memory backend bounds
+    CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    ANALYTICS_CACHE_TTL: int = 60  # seconds
+    PRODUCT_CACHE_TTL: int = 300
+    
+    # sales take stock from inventory in the same transaction
+    # reject refuses a sale larger than the stock on hand, allow lets stock go negative (backorders)
+    INVENTORY_OVERSELL: str = "reject"  # reject or allow
+    
+    # inventory history - snapshot a product's level every N ledger movements
+    # scripts/snapshot_inventory.py takes them, run it from cron
+    INVENTORY_SNAPSHOT_EVERY: int = 500
+    
+    # low-stock change feed - events are served once they are this old, so a write that
+    # commits after a later one (and its higher id) isn't skipped by pollers already past it
+    # keep it above the longest inventory transaction (a POST /sales/bulk chunk)
+    LOW_STOCK_FEED_LAG_SECONDS: float = 5
+    
+    # product search index, one per worker (about 1.2 GB per million products)
+    # built on the first search - turn this on to build it on a thread at startup instead,
+    # which costs every worker a full products scan and the memory whether it searches or not,
+    # but also freezes the index out of the GC - a lazily built one is walked by every full collection
+    SEARCH_WARM_ON_STARTUP: bool = False
+    
+    # columnar analytics engine (needs numpy) - sales held as numpy columns in each worker,
+    # about 20 bytes a sale, so the sales analytics endpoints don't query the database
+    ANALYTICS_ENGINE: bool = False
+    ANALYTICS_ENGINE_REFRESH_SECONDS: float = 1.0  # how often new sales are pulled in
+    
+    # rows per transaction for POST /sales/bulk
+    SALES_BULK_CHUNK_SIZE: int = 1000
+    
+    # adjustments per transaction for POST /inventory/bulk
+    INVENTORY_BULK_CHUNK_SIZE: int = 1000
+    
+    # products per upsert statement for POST /products/bulk
+    PRODUCTS_BULK_CHUNK_SIZE: int = 1000
+    
+    # rows fetched per round trip by GET /sales/export
+    SALES_EXPORT_BATCH_SIZE: int = 1000
+    
+    # gzip for JSON and text responses (brotli when the brotli package is installed)
+    COMPRESSION: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes, smaller bodies go out as they are
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 11, the brotli default, is too slow for live responses
+    
+    # ETags on product/sales listings and sales analytics - If-None-Match gets a 304 without running the query
+    # with the memory cache backend and several workers, a product deleted through another worker
+    # keeps old ETags valid until the next product write (use redis, as for the cache)
+    ETAGS: bool = True
+    
+    # request instrumentation - SQL statements and db time per request, by route
+    # prometheus text format at /api/metrics/prometheus, per worker process
+    QUERY_INSTRUMENTATION: bool = True
+    SLOW_QUERY_MS: float = 250  # log statements slower than this (0 = off), values redacted
+    DEBUG: bool = False  # Server-Timing headers and a per-request SQL summary in the log
+    
     class Config:
         env_file = ".env"
 
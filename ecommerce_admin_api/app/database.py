@@ -1,23 +1,154 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 
 from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.instrumentation import instrument
 
 # construct db url - standard stuff
-db_url = f"mysql+mysqlconnector://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+db_url = settings.DATABASE_URL or f"mysql+mysqlconnector://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+# same database through an async driver
+async_drivers = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+_url = make_url(db_url)
+async_db_url = _url.set(drivername=async_drivers.get(_url.get_backend_name(), _url.drivername))
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that also counts connects, checkouts and waits for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+
+    def _create_connection(self):
+        with self._stats_lock:
+            self.connects += 1
+        return super()._create_connection()
+
+    def _do_get(self):
+        # nothing idle and no overflow left - this checkout has to wait
+        exhausted = self.checkedin() == 0 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            if exhausted:
+                with self._stats_lock:
+                    self.waits += 1
+                    self.wait_time += time.perf_counter() - start
+
+        with self._stats_lock:
+            self.checkouts += 1
+        return connection
+
+
+def _engine_options(url, is_async=False):
+    """Engine/pool arguments from config"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+    if make_url(url).get_backend_name() == "sqlite":
+        # local dev/testing - sqlite picks its own pool
+        options["connect_args"] = {"check_same_thread": False}
+        return options
+
+    if not is_async:
+        # async engines need their own async-adapted pool
+        options["poolclass"] = MonitoredQueuePool
+
+    options.update({
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    })
+    return options
+
+
+class LazySessionmaker(sessionmaker):
+    """sessionmaker that creates its engine when the first session is made"""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
+
+
+# engines are created on first use (the app's lifespan hook, a script, a request),
+# not at import - importing the app opens no connections and loads no driver
+engine = None
+async_engine = None
+AsyncSessionLocal = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """The sync engine, with pool settings from config"""
+    global engine
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                created = create_engine(db_url, **_engine_options(db_url))
+                instrument(created)
+                engine = created
+    return engine
+
+
+def get_async_engine():
+    """The async engine (needs the async drivers), its session factory is made with it"""
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        with _engine_lock:
+            if async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+                created = create_async_engine(async_db_url, **_engine_options(async_db_url, is_async=True))
+                instrument(created.sync_engine)
+                # no expiry on commit - expired attributes can't lazy load outside the session
+                AsyncSessionLocal = async_sessionmaker(created, autoflush=False, expire_on_commit=False)
+                async_engine = created
+    return async_engine
+
+
+async def dispose_engines():
+    """Close pooled connections (app shutdown)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
 
-# create engine with some decent defaults
-engine = create_engine(db_url)
 
 # session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = LazySessionmaker(get_engine, autocommit=False, autoflush=False)
 
 # base class for all models
 Base = declarative_base()
 
 
 # db session getter
-def get_db():
+def get_sync_db():
     # get a new session
     db = SessionLocal()
     try:
@@ -28,4 +159,99 @@ def get_db():
         raise
     finally:
         # always close the session
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    # same as get_sync_db but with an AsyncSession
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except:
+            await db.rollback()
+            raise
+
+
+# the dependency routers use - picks the stack from config
+get_db = get_async_db if settings.DB_ASYNC else get_sync_db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run a (sync) service function with the request's session
+    AsyncSession: runs it through the async driver with run_sync
+    Session: runs it in the threadpool, like a plain def route would
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
+
+
+def upsert(db, table, rows, index_elements, set_):
+    """
+    Insert rows, updating the existing row on a unique key conflict
+    set_ gets the proposed row (VALUES() / excluded) and returns the columns to update
+    """
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(**set_(stmt.inserted))
+    elif dialect == "sqlite":
+        # sqlite for local dev/testing
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded))
+    else:
+        raise NotImplementedError(f"upsert not supported on {dialect}")
+
+    # executemany - one round trip for all rows
+    return db.execute(stmt, rows)
+
+
+def update_returning(db, table, where, values, columns):
+    """
+    Update rows and read back columns of the updated rows
+    One statement where the database has UPDATE ... RETURNING (sqlite, postgres),
+    mysql reads the rows back after the update, inside the same transaction
+    Returns a list of row mappings, empty when nothing matched
+    """
+    stmt = update(table).where(where).values(**values).execution_options(synchronize_session=False)
+
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(*columns)).mappings().all()
+
+    # rowcount is matched rows (the mysql dialects connect with FOUND_ROWS)
+    if not db.execute(stmt).rowcount:
+        return []
+    return db.execute(select(*columns).where(where)).mappings().all()
+
+
+def get_pool_stats(bind=None):
+    """Connection pool usage for sizing pools from real traffic"""
+    if bind is None:
+        bind = get_async_engine().sync_engine if settings.DB_ASYNC else get_engine()
+    pool = bind.pool
+    stats = {
+        "pool_class": type(pool).__name__,
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout": pool.timeout() if hasattr(pool, "timeout") else None,
+    }
+
+    # counters only exist on the monitored pool
+    if isinstance(pool, MonitoredQueuePool):
+        stats.update({
+            "connects": pool.connects,
+            "checkouts": pool.checkouts,
+            "waits": pool.waits,
+            "wait_time_ms": round(pool.wait_time * 1000, 3),
+            "timeouts": pool.timeouts,
+        })
+
+    return stats
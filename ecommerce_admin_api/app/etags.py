@@ -0,0 +1,76 @@
+import hashlib
+import logging
+from datetime import date
+
+from fastapi import Response, status
+from sqlalchemy import func, select
+
+from ecommerce_admin_api.app.cache import cache, month_buckets
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import run_db
+from ecommerce_admin_api.app.models.product import Product
+from ecommerce_admin_api.app.models.sale import Sale
+
+logger = logging.getLogger(__name__)
+
+# newest change in each table, each read off one end of an index
+# updated_at is whole seconds - a second change in the same second moves the cache version instead
+MARKERS = {
+    "products": (func.max(Product.id), func.max(Product.updated_at)),
+    "sales": (func.max(Sale.id),),
+}
+
+
+def current_etag(db, key: str, tables, date_ranges=()):
+    """
+    Strong ETag for a response built from tables, None when it can't be worked out
+    Made of each table's newest change, the cache versions every write bumps (for sales,
+    those of the months in date_ranges, or this month) and today's date, which moves
+    default "last 30 days" ranges
+    """
+    today = date.today()
+    markers = [select(column).scalar_subquery() for table in tables for column in MARKERS[table]]
+    parts = [key, today.isoformat(), tuple(db.execute(select(*markers)).one())]
+
+    try:
+        for table in tables:
+            buckets = month_buckets(date_ranges or [(today, today)]) if table == "sales" else ()
+            parts.append(cache.versions(table, buckets))
+    except Exception:
+        logger.exception("cache version lookup failed")
+        return None
+
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+
+def matches(if_none_match, etag) -> bool:
+    """The client's copy is current - If-None-Match has the ETag (weak comparison) or *"""
+    if not if_none_match or not etag:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+def etag_headers(etag):
+    """ETag for a response, browsers keep it and revalidate every time"""
+    return {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+
+
+async def conditional(request, db, tables, date_ranges=()):
+    """
+    (etag, 304 response) for a GET - the 304 is None unless the client's copy is current,
+    in which case the handler returns it without running its query
+    """
+    if not settings.ETAGS:
+        return None, None
+
+    key = repr((request.url.path, sorted(request.query_params.multi_items())))
+    etag = await run_db(db, current_etag, key, tables, date_ranges)
+    if matches(request.headers.get("if-none-match"), etag):
+        return etag, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    return etag, None
@@ -0,0 +1,284 @@
+import re
+import time
+import uuid
+import logging
+import threading
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from ecommerce_admin_api.app.config import settings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("ecommerce_admin_api.slow_queries")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# statements kept per request for the debug summary
+SLOWEST_KEPT = 5
+# longest statement text written to the logs
+MAX_STATEMENT_CHARS = 1000
+
+# a caller's request id is echoed back only if it looks like one
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestStats:
+    """SQL statements run while handling one request"""
+
+    def __init__(self, request_id: str, scope=None):
+        self.request_id = request_id
+        self.scope = scope  # the router adds the matched route to it
+        self.statements = 0
+        self.db_time = 0.0  # seconds
+        self.slowest = []  # (seconds, statement), slowest first
+        self._lock = threading.Lock()  # threadpool work of one request can overlap
+
+    def record(self, statement: str, elapsed: float):
+        with self._lock:
+            self.statements += 1
+            self.db_time += elapsed
+            if len(self.slowest) < SLOWEST_KEPT or elapsed > self.slowest[-1][0]:
+                self.slowest.append((elapsed, statement))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[SLOWEST_KEPT:]
+
+    @property
+    def route(self):
+        return _route(self.scope) if self.scope is not None else "unmatched"
+
+    def server_timing(self, total: float):
+        """Server-Timing header value, durations in ms"""
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.statements} statements", '
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+# stats of the request being handled, None outside requests (scripts, background threads)
+# threadpool calls run in a copy of the context, so they add to the same object
+_current: ContextVar = ContextVar("request_stats", default=None)
+
+
+def current_stats():
+    """Stats of the request being handled, None outside a request"""
+    return _current.get()
+
+
+def redact(statement: str, parameters) -> str:
+    """Statement text for logs - whitespace collapsed, bound parameter values never included"""
+    text = " ".join(statement.split())
+    if len(text) > MAX_STATEMENT_CHARS:
+        text = text[:MAX_STATEMENT_CHARS] + "..."
+    return f"{text} [parameters redacted]" if parameters else text
+
+
+# -- SQLAlchemy hooks
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        request_id = stats.request_id if stats is not None else "-"
+        route = stats.route if stats is not None else "-"
+        slow_query_logger.warning(
+            "slow query %.1f ms request=%s route=%s: %s",
+            elapsed * 1000, request_id, route, redact(statement, parameters)
+        )
+        if stats is not None:
+            slow_queries.inc(route=route)
+
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument(engine):
+    """Time every statement an engine runs (sync engines - pass async_engine.sync_engine)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# -- prometheus metrics, per worker process like the pool and cache stats
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Prometheus counter, one series per label set"""
+
+    def __init__(self, name: str, help: str, labels):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(zip(self.labels, key))} {value}")
+        return lines
+
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, one series per label set"""
+
+    def __init__(self, name: str, help: str, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                pairs = list(zip(self.labels, key))
+                # bucket counts are cumulative, observe adds to every bucket the value fits
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(pairs + [('le', repr(float(bound)))])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', '+Inf')])} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(pairs)} {series[-2]}")
+                lines.append(f"{self.name}_sum{_labels(pairs)} {series[-1]}")
+        return lines
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+requests_total = Counter(
+    "http_requests_total", "Requests handled, by route and status", ("method", "route", "status")
+)
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time to the response headers, by route", ("method", "route"), SECONDS_BUCKETS
+)
+request_db_time = Histogram(
+    "db_time_per_request_seconds", "SQL time spent by one request, by route", ("method", "route"), SECONDS_BUCKETS
+)
+request_statements = Histogram(
+    "db_statements_per_request", "SQL statements run by one request, by route", ("method", "route"), STATEMENT_BUCKETS
+)
+slow_queries = Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS, by route", ("route",)
+)
+
+METRICS = [requests_total, request_duration, request_db_time, request_statements, slow_queries]
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -- per-request middleware
+
+def _route(scope) -> str:
+    # the path template (/api/products/{product_id}), so ids don't explode the series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class InstrumentationMiddleware:
+    """
+    Gives every request an id and counts the SQL it runs
+    Adds X-Request-ID (and Server-Timing in DEBUG) to the response and feeds the route metrics
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        stats = RequestStats(request_id, scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        timings = {"status": 500, "elapsed": None}
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                # the handler is done (streamed bodies keep going after this)
+                elapsed = time.perf_counter() - start
+                timings["status"] = message["status"]
+                timings["elapsed"] = elapsed
+                headers = MutableHeaders(scope=message)
+                headers.append(REQUEST_ID_HEADER, request_id)
+                if settings.DEBUG:
+                    headers.append("Server-Timing", stats.server_timing(elapsed))
+            await send(message)
+
+        method = scope["method"]
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            route = stats.route
+            elapsed = timings["elapsed"] if timings["elapsed"] is not None else time.perf_counter() - start
+            requests_total.inc(method=method, route=route, status=str(timings["status"]))
+            request_duration.observe(elapsed, method=method, route=route)
+            request_db_time.observe(stats.db_time, method=method, route=route)
+            request_statements.observe(stats.statements, method=method, route=route)
+
+            if settings.DEBUG:
+                logger.info(
+                    "request=%s %s %s status=%s %.1f ms, %d statements in %.1f ms, slowest: %s",
+                    request_id, method, route, timings["status"], elapsed * 1000,
+                    stats.statements, stats.db_time * 1000,
+                    "; ".join(f"{seconds * 1000:.1f} ms {redact(statement, None)}" for seconds, statement in stats.slowest)
+                )
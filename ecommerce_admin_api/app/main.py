@@ -1,5 +1,7 @@
 import sys
 import os
+import threading
+from contextlib import asynccontextmanager
 
 # Add the project root to the Python path to make imports work
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -7,15 +9,41 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from ecommerce_admin_api.app.routers import products, inventory, sales
-from ecommerce_admin_api.app.models import product, inventory, sale
-from ecommerce_admin_api.app.database import engine, Base
+from ecommerce_admin_api.app.routers import products, inventory, sales, metrics
+from ecommerce_admin_api.app import models  # registers all tables on Base
+from ecommerce_admin_api.app.analytics_engine import sales_columns
+from ecommerce_admin_api.app.compression import CompressionMiddleware
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import SessionLocal, dispose_engines, get_async_engine, get_engine
+from ecommerce_admin_api.app.instrumentation import InstrumentationMiddleware, REQUEST_ID_HEADER
+from ecommerce_admin_api.app.search import product_index
+from ecommerce_admin_api.app.services.pagination import NEXT_CURSOR_HEADER
+
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # engines are made here, not at import - the schema comes from scripts/migrate.py
+    get_engine()
+    if settings.DB_ASYNC:
+        get_async_engine()
+    if settings.DB_MIGRATE_ON_STARTUP:
+        from ecommerce_admin_api.app.migrations import migrate
+        migrate(get_engine())
+    
+    # the search index and analytics columns take a while on big tables - build them off the request path
+    if settings.SEARCH_WARM_ON_STARTUP:
+        threading.Thread(target=product_index.warm_up, args=(SessionLocal,), daemon=True).start()
+    if settings.ANALYTICS_ENGINE:
+        threading.Thread(target=sales_columns.warm_up, args=(SessionLocal,), daemon=True).start()
+    
+    yield
+    
+    await dispose_engines()
 
-# create tables in database
-Base.metadata.create_all(bind=engine)
 
 # initialize app
-app = FastAPI(title="E-commerce Admin API")
+app = FastAPI(title="E-commerce Admin API", lifespan=lifespan)
 
 # setup CORS
 app.add_middleware(
@@ -24,12 +52,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER, "ETag"],  # lets browsers read the paging cursor, request id and etag
 )
 
+# gzip/brotli for JSON and text responses
+app.add_middleware(CompressionMiddleware)
+
+# request ids, SQL counts/timing per route and the slow-query log
+app.add_middleware(InstrumentationMiddleware)
+
 # include routers
 app.include_router(products.router, prefix="/api")
 app.include_router(inventory.router, prefix="/api")
 app.include_router(sales.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 
 @app.get("/")
@@ -0,0 +1,164 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, delete, func, inspect, select, text
+from sqlalchemy.schema import CreateColumn
+
+from ecommerce_admin_api.app.database import Base
+from ecommerce_admin_api.app import models  # registers all tables on Base
+
+# applied migrations are recorded here
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255)),
+    Column("applied_at", DateTime),
+)
+
+
+def _create_missing_indexes(conn, table):
+    """Create the model's indexes that the database doesn't have yet"""
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+
+
+def _add_missing_columns(conn, table):
+    """Add the model's columns that the database table doesn't have yet"""
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+# migrations - each step must be safe to run on a database that already has it
+# (the baseline creates tables from the current models)
+
+def _baseline(conn):
+    """Tables that don't exist yet"""
+    Base.metadata.create_all(bind=conn)
+
+
+def _sales_indexes(conn):
+    """Indexes for the sales filters used by services.sales"""
+    _create_missing_indexes(conn, models.Sale.__table__)
+
+
+def _inventory_ledger(conn):
+    """Movement ledger and snapshot tables for inventory history"""
+    for model in (models.InventoryMovement, models.InventorySnapshot):
+        model.__table__.create(bind=conn, checkfirst=True)
+        _create_missing_indexes(conn, model.__table__)
+
+
+def _low_stock_flag(conn):
+    """Maintained low-stock flag on inventory and the low-stock change feed"""
+    inventory = models.Inventory.__table__
+    _add_missing_columns(conn, inventory)
+    conn.execute(inventory.update().values(is_low_stock=inventory.c.quantity < inventory.c.reorder_level))
+    _create_missing_indexes(conn, inventory)
+    models.LowStockEvent.__table__.create(bind=conn, checkfirst=True)
+
+
+def _product_content_hash(conn):
+    """Content hash on products so bulk syncs can skip unchanged rows"""
+    from ecommerce_admin_api.app.services.products import HASHED_FIELDS, content_hash
+    
+    products = models.Product.__table__
+    _add_missing_columns(conn, products)
+    
+    # backfill in batches of ids
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(products.c.id, *(products.c[name] for name in HASHED_FIELDS))
+            .where(products.c.id > last_id, products.c.content_hash.is_(None))
+            .order_by(products.c.id).limit(1000)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            products.update().where(products.c.id == bindparam("product_id")).values(content_hash=bindparam("hash")),
+            [{"product_id": row.id, "hash": content_hash(row._asdict())} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def _products_updated_at_index(conn):
+    """Index for reading recently changed products"""
+    _create_missing_indexes(conn, models.Product.__table__)
+
+
+def _sales_leaderboard(conn):
+    """Top sellers per rolling window, built from the rollup by scripts/refresh_leaderboard.py"""
+    for model in (models.SalesLeaderboard, models.SalesLeaderboardWindow):
+        model.__table__.create(bind=conn, checkfirst=True)
+
+
+def _sales_rollup_backfill(conn):
+    """
+    Rollup rebuilt from sales - on databases that had sales before the rollup existed
+    it started empty, and analytics read it by default
+    """
+    from ecommerce_admin_api.app.services import sales_rollup
+
+    sales_rollup.rebuild(conn, commit=False)
+    # windows built from the partial rollup are built again by the next refresh
+    conn.execute(delete(models.SalesLeaderboard))
+    conn.execute(delete(models.SalesLeaderboardWindow))
+
+
+def _inventory_ledger_rows(conn):
+    """Ledger movements and snapshots tied to the inventory row (warehouse) they changed"""
+    inventory = models.Inventory.__table__
+    for model in (models.InventoryMovement, models.InventorySnapshot):
+        table = model.__table__
+        _add_missing_columns(conn, table)
+        # everything so far changed the product's oldest row
+        oldest = select(func.min(inventory.c.id)).where(inventory.c.product_id == table.c.product_id).scalar_subquery()
+        conn.execute(table.update().where(table.c.inventory_id.is_(None)).values(inventory_id=oldest))
+        _create_missing_indexes(conn, table)
+
+
+MIGRATIONS = [
+    (1, "baseline tables", _baseline),
+    (2, "sales indexes", _sales_indexes),
+    (3, "inventory ledger", _inventory_ledger),
+    (4, "low stock flag", _low_stock_flag),
+    (5, "product content hash", _product_content_hash),
+    (6, "products updated_at index", _products_updated_at_index),
+    (7, "sales leaderboard", _sales_leaderboard),
+    (8, "sales rollup backfill", _sales_rollup_backfill),
+    (9, "inventory ledger rows", _inventory_ledger_rows),
+]
+
+
+def applied_versions(engine):
+    """Versions already applied to the database"""
+    migration_metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def migrate(engine, target=None):
+    """Apply pending migrations in order, each in its own transaction"""
+    done = applied_versions(engine)
+    applied = []
+
+    for version, name, step in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                name=name,
+                applied_at=datetime.now()
+            ))
+        applied.append((version, name))
+
+    return applied
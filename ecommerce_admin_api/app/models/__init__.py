@@ -1,4 +1,9 @@
 # Import all models here for easier imports elsewhere
 from ecommerce_admin_api.app.models.product import Product
 from ecommerce_admin_api.app.models.inventory import Inventory
-from ecommerce_admin_api.app.models.sale import Sale
\ No newline at end of file
+from ecommerce_admin_api.app.models.sale import Sale
+from ecommerce_admin_api.app.models.sale_rollup import SaleDailyRollup
+from ecommerce_admin_api.app.models.inventory_movement import InventoryMovement
+from ecommerce_admin_api.app.models.inventory_snapshot import InventorySnapshot
+from ecommerce_admin_api.app.models.low_stock_event import LowStockEvent
+from ecommerce_admin_api.app.models.sales_leaderboard import SalesLeaderboard, SalesLeaderboardWindow
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Boolean, Index
+from sqlalchemy.sql import func, false
 from sqlalchemy.orm import relationship
 
 from ecommerce_admin_api.app.database import Base
@@ -8,6 +8,13 @@ from ecommerce_admin_api.app.database import Base
 class Inventory(Base):
     # inventory table
     __tablename__ = "inventory"
+    __table_args__ = (
+        # per-product lookups done by sales, restocks and the ledger
+        Index("ix_inventory_product_id", "product_id", "id"),
+        # low-stock listings, all warehouses or one, paged by id
+        Index("ix_inventory_low_stock", "is_low_stock", "id"),
+        Index("ix_inventory_warehouse_low_stock", "warehouse", "is_low_stock", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -15,6 +22,7 @@ class Inventory(Base):
     reorder_level = Column(Integer, default=10)  # when to reorder
     last_restock_date = Column(DateTime, nullable=True)
     warehouse = Column(String(100), default="main")  # storage location
+    is_low_stock = Column(Boolean, nullable=False, default=False, server_default=false())  # quantity < reorder_level, kept in step on every write
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # back reference to product
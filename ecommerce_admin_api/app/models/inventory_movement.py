@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, DateTime, String, Index
+from sqlalchemy.sql import func
+
+from ecommerce_admin_api.app.database import Base
+
+
+class InventoryMovement(Base):
+    # append-only stock ledger - one row per change, never updated or deleted
+    __tablename__ = "inventory_movements"
+    __table_args__ = (
+        # a product's ledger in order, and its movements up to a point in time
+        Index("ix_inventory_movements_product_id", "product_id", "id"),
+        Index("ix_inventory_movements_product_time", "product_id", "created_at"),
+        # one inventory row's (warehouse's) ledger - levels are worked out per row
+        Index("ix_inventory_movements_inventory_id", "inventory_id", "id"),
+        Index("ix_inventory_movements_inventory_time", "inventory_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)  # no FK - history outlives products
+    inventory_id = Column(Integer)  # the row it changed, no FK either
+    change = Column(Integer, nullable=False)  # units added (+) or taken (-)
+    reason = Column(String(20), nullable=False)  # sale, restock or adjustment
+    created_at = Column(DateTime, default=func.now())
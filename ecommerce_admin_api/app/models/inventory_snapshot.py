@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, Index
+from sqlalchemy.sql import func
+
+from ecommerce_admin_api.app.database import Base
+
+
+class InventorySnapshot(Base):
+    # stock level of an inventory row right after a ledger movement
+    # history reads start from the nearest snapshot instead of replaying the ledger
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        Index("ix_inventory_snapshots_product_movement", "product_id", "movement_id"),
+        Index("ix_inventory_snapshots_inventory_movement", "inventory_id", "movement_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
+    inventory_id = Column(Integer)
+    movement_id = Column(Integer, nullable=False)  # last movement included (0 = none)
+    quantity = Column(Integer, nullable=False)
+    taken_at = Column(DateTime, default=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, String, Boolean, Index
+from sqlalchemy.sql import func
+
+from ecommerce_admin_api.app.database import Base
+
+
+class LowStockEvent(Base):
+    # change feed - one row each time an inventory item goes below or back above its reorder level
+    __tablename__ = "low_stock_events"
+    __table_args__ = (
+        Index("ix_low_stock_events_warehouse", "warehouse", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    inventory_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    warehouse = Column(String(100))
+    is_low_stock = Column(Boolean, nullable=False)  # state after the crossing
+    quantity = Column(Integer)
+    reorder_level = Column(Integer)
+    created_at = Column(DateTime, default=func.now())
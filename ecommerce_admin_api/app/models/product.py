@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -8,6 +8,10 @@ from ecommerce_admin_api.app.database import Base
 class Product(Base):
     # table name
     __tablename__ = "products"
+    __table_args__ = (
+        # search index catch-up reads recently changed products
+        Index("ix_products_updated_at", "updated_at"),
+    )
     
     # basic product fields
     id = Column(Integer, primary_key=True, index=True)
@@ -16,6 +20,7 @@ class Product(Base):
     price = Column(Float)
     category = Column(String(100), index=True)
     sku = Column(String(50), unique=True)  # unique product code
+    content_hash = Column(String(40), nullable=True)  # sha1 of the editable fields, bulk syncs skip unchanged rows
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
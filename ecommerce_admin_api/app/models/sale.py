@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -8,6 +8,15 @@ from ecommerce_admin_api.app.database import Base
 class Sale(Base):
     # sales tracking
     __tablename__ = "sales"
+    __table_args__ = (
+        # date range scans and (sale_date, id) cursor paging
+        Index("ix_sales_sale_date", "sale_date"),
+        # product / channel filters narrowed by date
+        Index("ix_sales_product_date", "product_id", "sale_date"),
+        Index("ix_sales_channel_date", "channel", "sale_date"),
+        # analytics over raw sales answered from the index alone
+        Index("ix_sales_date_covering", "sale_date", "product_id", "channel", "total_amount", "quantity"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, Date, String, UniqueConstraint
+
+from ecommerce_admin_api.app.database import Base
+
+
+class SaleDailyRollup(Base):
+    # pre-aggregated sales per day/product/channel - kept in sync by create_sale
+    __tablename__ = "sales_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("day", "product_id", "channel", name="uq_sales_daily_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer)  # no FK - derived data, rebuilt from sales
+    channel = Column(String(50))
+    total_amount = Column(Float, default=0)
+    total_quantity = Column(Integer, default=0)
+    sale_count = Column(Integer, default=0)
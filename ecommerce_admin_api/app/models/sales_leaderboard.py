@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, Date, UniqueConstraint, Index
+
+from ecommerce_admin_api.app.database import Base
+
+
+class SalesLeaderboard(Base):
+    # sales per product over a rolling window ending today - kept in step by every sale write
+    # derived from the daily rollup like it, no FK
+    __tablename__ = "sales_leaderboard"
+    __table_args__ = (
+        UniqueConstraint("window_days", "product_id", name="uq_sales_leaderboard"),
+        # top sellers of a window read straight off the index
+        Index("ix_sales_leaderboard_window_sales", "window_days", "total_amount"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    window_days = Column(Integer, nullable=False)  # days before today the window starts
+    product_id = Column(Integer, nullable=False)
+    total_amount = Column(Float, default=0)
+    total_quantity = Column(Integer, default=0)
+    sale_count = Column(Integer, default=0)
+
+
+class SalesLeaderboardWindow(Base):
+    # one row per maintained window - the day its totals end on
+    __tablename__ = "sales_leaderboard_windows"
+
+    window_days = Column(Integer, primary_key=True, autoincrement=False)
+    as_of = Column(Date, nullable=False)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date, datetime
 
-from ecommerce_admin_api.app.database import get_db
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import get_db, run_db
 from ecommerce_admin_api.app.schemas import inventory as schemas
 from ecommerce_admin_api.app.services import inventory as service
+from ecommerce_admin_api.app.services.pagination import NEXT_CURSOR_HEADER, encode_cursor, next_cursor
 
 # setup router
 router = APIRouter(
@@ -14,42 +18,188 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[schemas.Inventory])
-def get_inventory(skip: int = 0, limit: int = 100, warehouse: str = None, db: Session = Depends(get_db)):
+async def get_inventory(
+    skip: int = 0,
+    limit: int = 100,
+    warehouse: str = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page (replaces skip)"),
+    db: Session = Depends(get_db)
+):
     """Get all inventory items, can filter by warehouse"""
-    return service.get_inventory(db=db, skip=skip, limit=limit, warehouse=warehouse)
+    try:
+        items = await run_db(db, service.get_inventory_rows, skip=skip, limit=limit, warehouse=warehouse, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # cursor for the next page, if there is one
+    headers = {}
+    page_cursor = next_cursor(items, limit, service.inventory_cursor_key)
+    if page_cursor:
+        headers[NEXT_CURSOR_HEADER] = page_cursor
+    
+    # rows are plain dicts - skip response_model validation, orjson encodes them directly
+    return ORJSONResponse(items, headers=headers)
 
 
 @router.get("/low-stock", response_model=List[schemas.Inventory])
-def get_low_stock(db: Session = Depends(get_db)):
-    """Get items with stock below reorder level"""
-    return service.get_low_stock(db=db)
+async def get_low_stock(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page (replaces skip)"),
+    db: Session = Depends(get_db)
+):
+    """Get items with stock below reorder level, can filter by warehouse"""
+    try:
+        items = await run_db(db, service.get_low_stock, skip=skip, limit=limit, warehouse=warehouse, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # cursor for the next page, if there is one
+    page_cursor = next_cursor(items, limit, service.inventory_cursor_key)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
+    return items
+
+
+@router.get("/low-stock/changes", response_model=List[schemas.LowStockEvent])
+async def get_low_stock_changes(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous poll (default: start of the feed)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Items that crossed their reorder level since the cursor, oldest first
+    X-Next-Cursor is always set - poll again with it to get only newer changes
+    """
+    try:
+        events = await run_db(db, service.get_low_stock_changes, limit=limit, warehouse=warehouse, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # nothing new - keep the caller where it was
+    if events:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(service.low_stock_event_cursor_key(events[-1]))
+    elif cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return events
 
 
 @router.put("/{product_id}", response_model=schemas.Inventory)
-def update_inventory(product_id: int, inventory: schemas.InventoryUpdate, db: Session = Depends(get_db)):
+async def update_inventory(product_id: int, inventory: schemas.InventoryUpdate, db: Session = Depends(get_db)):
     """Update inventory levels"""
-    db_inventory = service.get_inventory_by_product(db=db, product_id=product_id)
-    if not db_inventory:
+    db_inventory = await run_db(db, service.update_inventory, product_id=product_id, inventory=inventory)
+    if db_inventory is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Inventory for this product not found"
         )
-    return service.update_inventory(db=db, product_id=product_id, inventory=inventory)
+    return db_inventory
+
+
+@router.post("/bulk", response_model=schemas.InventoryBulkResult)
+async def adjust_inventory_bulk(
+    adjustments: List[schemas.InventoryAdjustment],
+    warehouse: Optional[str] = Query(None, description="only adjust inventory rows in this warehouse"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=50000, description="adjustments per transaction"),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply many stock adjustments at once, e.g. a warehouse cycle count
+    Each item sets a counted quantity or adds a delta; chunks are applied in
+    their own transactions and bad items are reported without failing the rest
+    """
+    chunk_size = chunk_size or settings.INVENTORY_BULK_CHUNK_SIZE
+    results = []
+    errors = []
+    
+    # rows are numbered from 1, like POST /sales/bulk
+    numbered = list(enumerate(adjustments, start=1))
+    for start in range(0, len(numbered), chunk_size):
+        applied, failed = await run_db(
+            db, service.adjust_inventory_bulk, numbered[start:start + chunk_size], warehouse=warehouse
+        )
+        results.extend(applied)
+        errors.extend(failed)
+    
+    results.sort(key=lambda result: result["row"])
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "received": len(adjustments),
+        "applied": len(results),
+        "failed": len(errors),
+        "results": results,
+        "errors": errors
+    }
 
 
 @router.post("/restock", response_model=schemas.Inventory)
-def restock_inventory(restock: schemas.InventoryUpdate, product_id: int, db: Session = Depends(get_db)):
+async def restock_inventory(restock: schemas.InventoryUpdate, product_id: int, db: Session = Depends(get_db)):
     """Record inventory restock"""
-    db_inventory = service.get_inventory_by_product(db=db, product_id=product_id)
-    if not db_inventory:
+    db_inventory = await run_db(db, service.restock_inventory, product_id=product_id, restock=restock)
+    if db_inventory is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Inventory for this product not found"
         )
-    return service.restock_inventory(db=db, product_id=product_id, restock=restock)
+    return db_inventory
+
+
+@router.get("/history/{product_id}", response_model=List[schemas.InventoryMovement])
+async def get_inventory_history(
+    product_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    """Get inventory change history for a product, newest first"""
+    try:
+        history = await run_db(
+            db, service.get_inventory_history,
+            product_id=product_id, limit=limit, start_date=start_date, end_date=end_date, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # cursor for the next page, if there is one
+    page_cursor = next_cursor(history, limit, service.history_cursor_key)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
+    return history
 
 
-@router.get("/history/{product_id}")
-def get_inventory_history(product_id: int, db: Session = Depends(get_db)):
-    """Get inventory change history for a product"""
-    return service.get_inventory_history(db=db, product_id=product_id)
\ No newline at end of file
+@router.get("/history/{product_id}/level", response_model=schemas.InventoryLevel)
+async def get_stock_level(
+    product_id: int,
+    at: Optional[datetime] = Query(None, description="point in time (default: now)"),
+    warehouse: Optional[str] = Query(None, description="only the stock in this warehouse (default: all of them)"),
+    db: Session = Depends(get_db)
+):
+    """Get the stock level of a product at a point in time"""
+    level = await run_db(
+        db, service.get_stock_level, product_id=product_id, at=at or datetime.now(), warehouse=warehouse
+    )
+    if level is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Inventory for this product not found"
+        )
+    return level
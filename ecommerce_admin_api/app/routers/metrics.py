@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ecommerce_admin_api.app.cache import cache
+from ecommerce_admin_api.app.database import get_pool_stats
+from ecommerce_admin_api.app.instrumentation import render_metrics
+from ecommerce_admin_api.app.schemas import metrics as schemas
+
+# setup router
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+
+@router.get("/pool", response_model=schemas.PoolStats)
+def pool_stats():
+    """Connection pool usage for this worker process"""
+    return get_pool_stats()
+
+
+
+@router.get("/cache", response_model=schemas.CacheStats)
+def cache_stats():
+    """Cache hit/miss counters for this worker process"""
+    return cache.stats()
+
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Request and SQL metrics by route for this worker process, Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from ecommerce_admin_api.app.database import get_db
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import get_db, run_db
+from ecommerce_admin_api.app.etags import conditional, etag_headers
 from ecommerce_admin_api.app.schemas import products as schemas
 from ecommerce_admin_api.app.services import products as service
+from ecommerce_admin_api.app.services.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 # setup router
 router = APIRouter(
@@ -14,21 +18,82 @@ router = APIRouter(
 
 
 @router.post("/", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
+async def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
     """Add a new product to the system"""
-    return service.create_product(db=db, product=product)
+    existing = await run_db(db, service.get_product_by_sku, sku=product.sku)
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A product with this SKU already exists"
+        )
+    return await run_db(db, service.create_product, product=product)
+
+
+@router.post("/bulk", response_model=schemas.ProductBulkResult)
+async def upsert_products(
+    products: List[schemas.ProductCreate],
+    chunk_size: Optional[int] = Query(None, ge=1, le=50000, description="products per upsert statement"),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or update many products at once, matched on SKU
+    Products whose details haven't changed are counted but not written
+    """
+    return await run_db(
+        db,
+        service.upsert_products,
+        products=products,
+        chunk_size=chunk_size or settings.PRODUCTS_BULK_CHUNK_SIZE
+    )
 
 
 @router.get("/", response_model=List[schemas.Product])
-def get_products(skip: int = 0, limit: int = 100, category: str = None, db: Session = Depends(get_db)):
+async def get_products(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    category: str = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page (replaces skip)"),
+    db: Session = Depends(get_db)
+):
     """Get all products, can filter by category"""
-    return service.get_products(db=db, skip=skip, limit=limit, category=category)
+    # nothing changed since the caller's copy - 304 without running the query
+    etag, not_modified = await conditional(request, db, ("products",))
+    if not_modified:
+        return not_modified
+    
+    try:
+        products = await run_db(db, service.get_products_data, skip=skip, limit=limit, category=category, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # cursor for the next page, if there is one
+    headers = etag_headers(etag)
+    page_cursor = next_cursor(products, limit, service.product_cursor_key)
+    if page_cursor:
+        headers[NEXT_CURSOR_HEADER] = page_cursor
+    
+    # rows are plain dicts - skip response_model validation, orjson encodes them directly
+    return ORJSONResponse(products, headers=headers)
+
+
+@router.get("/search", response_model=List[schemas.ProductSearchHit])
+async def search_products(
+    q: str = Query(..., min_length=1, description="words to find, each can be a word prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Search products by name, description, SKU and category, best match first"""
+    return await run_db(db, service.search_products, q=q, limit=limit)
 
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get a specific product by ID"""
-    product = service.get_product(db=db, product_id=product_id)
+    product = await run_db(db, service.get_product_data, product_id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -38,25 +103,25 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{product_id}", response_model=schemas.Product)
-def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
+async def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
     """Update product details"""
-    db_product = service.get_product(db=db, product_id=product_id)
-    if not db_product:
+    # one conditional update, nothing matched means there is no such product
+    db_product = await run_db(db, service.update_product, product_id=product_id, product=product)
+    if db_product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return service.update_product(db=db, product_id=product_id, product=product)
+    return db_product
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+async def delete_product(product_id: int, db: Session = Depends(get_db)):
     """Remove a product"""
-    db_product = service.get_product(db=db, product_id=product_id)
-    if not db_product:
+    deleted = await run_db(db, service.delete_product, product_id=product_id)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    service.delete_product(db=db, product_id=product_id)
     return None
\ No newline at end of file
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+import csv
+import json
+import codecs
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 
-from ecommerce_admin_api.app.database import get_db
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import SessionLocal, get_db, run_db
+from ecommerce_admin_api.app.etags import conditional, etag_headers
 from ecommerce_admin_api.app.schemas import sales as schemas
+from ecommerce_admin_api.app.services import export
 from ecommerce_admin_api.app.services import sales as service
+from ecommerce_admin_api.app.services.inventory import InsufficientStock
+from ecommerce_admin_api.app.services.pagination import NEXT_CURSOR_HEADER, next_cursor
 
 # setup router
 router = APIRouter(
@@ -15,13 +26,164 @@ router = APIRouter(
 
 
 @router.post("/", response_model=schemas.Sale, status_code=status.HTTP_201_CREATED)
-def record_sale(sale: schemas.SaleCreate, db: Session = Depends(get_db)):
-    """Record a new sale"""
-    return service.create_sale(db=db, sale=sale)
+async def record_sale(sale: schemas.SaleCreate, db: Session = Depends(get_db)):
+    """Record a new sale, taking the units from stock"""
+    try:
+        return await run_db(db, service.create_sale, sale=sale)
+    except InsufficientStock as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+
+# body formats accepted by POST /sales/bulk (anything else is read as a JSON array)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+async def _read_lines(request: Request):
+    """Stream the request body line by line"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def _read_bulk_rows(request: Request, content_type: str):
+    """Yield (row number, row dict or error message) pairs from a bulk upload"""
+    row = 0
+    
+    if content_type in NDJSON_TYPES:
+        # one JSON object per line
+        async for line in _read_lines(request):
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except ValueError as e:
+                yield row, f"invalid JSON: {e}"
+    
+    elif content_type in CSV_TYPES:
+        # header line first, quoted values may span lines
+        header = None
+        pending = ""
+        async for line in _read_lines(request):
+            pending = f"{pending}\n{line}" if pending else line
+            if pending.count('"') % 2:
+                continue
+            
+            record, pending = pending, ""
+            if not record.strip():
+                continue
+            
+            values = next(csv.reader([record]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            
+            row += 1
+            # empty cells count as missing (e.g. no sale_date)
+            yield row, {name: value for name, value in zip(header, values) if value != ""}
+        
+        if pending:
+            yield row + 1, "unterminated quoted value"
+    
+    else:
+        # plain JSON array - not streamed
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Body is not valid JSON"
+            )
+        
+        if not isinstance(data, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of sales"
+            )
+        
+        for item in data:
+            row += 1
+            yield row, item
+
+
+def _validation_message(error: ValidationError):
+    """Flatten a pydantic error into one line"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+@router.post("/bulk", response_model=schemas.SaleBulkResult)
+async def record_sales_bulk(
+    request: Request,
+    chunk_size: Optional[int] = Query(None, ge=1, le=50000, description="rows per transaction"),
+    db: Session = Depends(get_db)
+):
+    """
+    Record many sales at once from a JSON array, NDJSON or CSV body
+    Rows are validated as they stream in and saved in chunks, one transaction
+    per chunk; bad rows are reported without failing the rest of the upload
+    """
+    chunk_size = chunk_size or settings.SALES_BULK_CHUNK_SIZE
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    
+    received = 0
+    inserted = 0
+    errors = []
+    chunk = []
+    
+    async def flush():
+        # hand the chunk to the db (threadpool or async driver)
+        batch = chunk[:]
+        chunk.clear()
+        chunk_errors = await run_db(db, service.create_sales_bulk, batch)
+        errors.extend(chunk_errors)
+        return len(batch) - len(chunk_errors)
+    
+    async for row, data in _read_bulk_rows(request, content_type):
+        received += 1
+        
+        if isinstance(data, str):
+            errors.append({"row": row, "error": data})
+            continue
+        
+        try:
+            chunk.append((row, schemas.SaleCreate.parse_obj(data)))
+        except ValidationError as e:
+            errors.append({"row": row, "error": _validation_message(e)})
+            continue
+        
+        if len(chunk) >= chunk_size:
+            inserted += await flush()
+    
+    if chunk:
+        inserted += await flush()
+    
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "received": received,
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors
+    }
 
 
 @router.get("/", response_model=List[schemas.Sale])
-def get_sales(
+async def get_sales(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     start_date: Optional[date] = None,
@@ -29,25 +191,105 @@ def get_sales(
     product_id: Optional[int] = None,
     category: Optional[str] = None,
     channel: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page (replaces skip)"),
     db: Session = Depends(get_db)
 ):
     """
-    Get sales with various filters
+    Get sales with various filters, ordered by sale date
+    """
+    # nothing changed since the caller's copy - 304 without running the query
+    date_ranges = [(start_date, end_date or datetime.now().date())] if start_date else []
+    etag, not_modified = await conditional(request, db, ("sales", "products"), date_ranges)
+    if not_modified:
+        return not_modified
+    
+    try:
+        sales = await run_db(
+            db,
+            service.get_sales_rows,
+            skip=skip, 
+            limit=limit, 
+            start_date=start_date,
+            end_date=end_date,
+            product_id=product_id,
+            category=category,
+            channel=channel,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # cursor for the next page, if there is one
+    headers = etag_headers(etag)
+    page_cursor = next_cursor(sales, limit, service.sale_cursor_key)
+    if page_cursor:
+        headers[NEXT_CURSOR_HEADER] = page_cursor
+    
+    # rows are plain dicts - skip response_model validation, orjson encodes them directly
+    return ORJSONResponse(sales, headers=headers)
+
+
+@router.get("/export")
+async def export_sales(
+    export_format: str = Query("csv", alias="format", description="csv, ndjson or parquet"),
+    gzip: bool = Query(False, description="gzip the file on the fly"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[int] = None,
+    category: Optional[str] = None,
+    channel: Optional[str] = None
+):
+    """
+    Download every sale matching the GET /sales filters as one file
+    Streamed in keyset-paged batches, memory stays flat
     """
-    return service.get_sales(
-        db=db, 
-        skip=skip, 
-        limit=limit, 
+    try:
+        export.check_format(export_format)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    filters = dict(
         start_date=start_date,
         end_date=end_date,
         product_id=product_id,
         category=category,
         channel=channel
     )
+    
+    def batches():
+        # own session - the stream outlives this handler (iterated on a worker thread)
+        db = SessionLocal()
+        try:
+            yield from service.export_sales(db, batch_size=settings.SALES_EXPORT_BATCH_SIZE, **filters)
+        finally:
+            db.close()
+    
+    chunks = export.encode(export_format, service.EXPORT_COLUMNS, batches())
+    filename = f"sales.{export_format}"
+    media_type = export.FORMATS[export_format]
+    
+    if gzip:
+        chunks = export.gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/analytics/revenue", response_model=schemas.SaleAnalytics)
-def get_revenue_analytics(
+async def get_revenue_analytics(
+    request: Request,
+    response: Response,
     period: str = Query(..., description="daily, weekly, monthly, or yearly"),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
@@ -65,8 +307,15 @@ def get_revenue_analytics(
     if not end_date:
         end_date = datetime.now().date()
         
-    return service.get_revenue_analytics(
-        db=db,
+    # nothing changed since the caller's copy - 304 without running the query
+    etag, not_modified = await conditional(request, db, ("sales", "products"), [(start_date, end_date)])
+    if not_modified:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    
+    return await run_db(
+        db,
+        service.get_revenue_analytics,
         period=period,
         start_date=start_date,
         end_date=end_date,
@@ -75,32 +324,124 @@ def get_revenue_analytics(
     )
 
 
-@router.get("/analytics/compare", response_model=List[schemas.SaleAnalytics])
-def compare_revenue(
-    period1_start: date,
-    period1_end: date,
-    period2_start: date,
-    period2_end: date,
+@router.get("/analytics/timeseries", response_model=schemas.RevenueTimeSeries)
+async def get_revenue_timeseries(
+    request: Request,
+    response: Response,
+    period: str = Query(..., description="daily, weekly, monthly, or yearly"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     category: Optional[str] = None,
     channel: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Compare revenue between two periods
+    Get revenue per period bucket, all buckets in one response
     """
-    return service.compare_revenue(
-        db=db,
-        period1_start=period1_start,
-        period1_end=period1_end,
-        period2_start=period2_start,
-        period2_end=period2_end,
+    if period not in service.PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"period must be one of {', '.join(service.PERIODS)}"
+        )
+    
+    if not start_date:
+        # default to last 30 days if not specified
+        start_date = datetime.now().date() - timedelta(days=30)
+    
+    if not end_date:
+        end_date = datetime.now().date()
+        
+    # nothing changed since the caller's copy - 304 without running the query
+    etag, not_modified = await conditional(request, db, ("sales", "products"), [(start_date, end_date)])
+    if not_modified:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    
+    return await run_db(
+        db,
+        service.get_revenue_timeseries,
+        period=period,
+        start_date=start_date,
+        end_date=end_date,
+        category=category,
+        channel=channel
+    )
+
+
+# most periods one compare request may ask for
+MAX_COMPARE_PERIODS = 60
+
+
+def _parse_period(value: str):
+    """'YYYY-MM-DD:YYYY-MM-DD' -> (start, end)"""
+    try:
+        start, end = (date.fromisoformat(part.strip()) for part in value.split(":"))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid period '{value}', expected start:end like 2024-01-01:2024-01-31"
+        )
+    
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Period '{value}' ends before it starts"
+        )
+    return start, end
+
+
+@router.get("/analytics/compare", response_model=List[schemas.PeriodComparison])
+async def compare_revenue(
+    request: Request,
+    response: Response,
+    periods: Optional[List[str]] = Query(None, description="repeatable start:end pairs, e.g. 2024-01-01:2024-01-31"),
+    period1_start: Optional[date] = None,
+    period1_end: Optional[date] = None,
+    period2_start: Optional[date] = None,
+    period2_end: Optional[date] = None,
+    category: Optional[str] = None,
+    channel: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Compare revenue across periods, each against the one before it
+    Pass any number of ?periods=start:end, or the older period1_*/period2_* pair
+    """
+    if periods:
+        parsed = [_parse_period(period) for period in periods]
+    elif period1_start and period1_end and period2_start and period2_end:
+        parsed = [(period1_start, period1_end), (period2_start, period2_end)]
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give periods=start:end, or all of period1_start, period1_end, period2_start, period2_end"
+        )
+    
+    if len(parsed) > MAX_COMPARE_PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_COMPARE_PERIODS} periods per request"
+        )
+    
+    # nothing changed since the caller's copy - 304 without running the query
+    etag, not_modified = await conditional(request, db, ("sales", "products"), parsed)
+    if not_modified:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    
+    return await run_db(
+        db,
+        service.compare_revenue,
+        periods=parsed,
         category=category,
         channel=channel
     )
 
 
 @router.get("/by-product", response_model=List[schemas.SaleAnalytics])
-def get_sales_by_product(
+async def get_sales_by_product(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     limit: int = 10,
@@ -116,8 +457,15 @@ def get_sales_by_product(
     if not end_date:
         end_date = datetime.now().date()
         
-    return service.get_sales_by_product(
-        db=db,
+    # nothing changed since the caller's copy - 304 without running the query
+    etag, not_modified = await conditional(request, db, ("sales", "products"), [(start_date, end_date)])
+    if not_modified:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    
+    return await run_db(
+        db,
+        service.get_sales_by_product,
         start_date=start_date,
         end_date=end_date,
         limit=limit
@@ -125,7 +473,9 @@ def get_sales_by_product(
 
 
 @router.get("/by-category", response_model=List[schemas.SaleAnalytics])
-def get_sales_by_category(
+async def get_sales_by_category(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     db: Session = Depends(get_db)
@@ -140,8 +490,15 @@ def get_sales_by_category(
     if not end_date:
         end_date = datetime.now().date()
         
-    return service.get_sales_by_category(
-        db=db,
+    # nothing changed since the caller's copy - 304 without running the query
+    etag, not_modified = await conditional(request, db, ("sales", "products"), [(start_date, end_date)])
+    if not_modified:
+        return not_modified
+    response.headers.update(etag_headers(etag))
+    
+    return await run_db(
+        db,
+        service.get_sales_by_category,
         start_date=start_date,
         end_date=end_date
     )
\ No newline at end of file
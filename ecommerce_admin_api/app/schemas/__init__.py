@@ -1,4 +1,5 @@
 # Import all schemas for easier access
 from ecommerce_admin_api.app.schemas import products
 from ecommerce_admin_api.app.schemas import inventory
-from ecommerce_admin_api.app.schemas import sales
\ No newline at end of file
+from ecommerce_admin_api.app.schemas import sales
+from ecommerce_admin_api.app.schemas import metrics
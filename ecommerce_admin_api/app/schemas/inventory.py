@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
 
 class InventoryBase(BaseModel):
@@ -16,17 +16,88 @@ class InventoryCreate(InventoryBase):
 
 
 class InventoryUpdate(BaseModel):
-    # partial updates
+    # partial updates - leave a field out to keep it, null isn't a value for any of them
     quantity: Optional[int] = None
     reorder_level: Optional[int] = None
     warehouse: Optional[str] = None
+    
+    @validator("quantity", "reorder_level", "warehouse", pre=True)
+    def not_null(cls, value, field):
+        if value is None:
+            raise ValueError(f"{field.name} can't be null, leave it out to keep the current value")
+        return value
 
 
 class Inventory(InventoryBase):
     # complete inventory with id and timestamps
     id: int
     last_restock_date: Optional[datetime] = None
+    is_low_stock: bool = False
     updated_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class InventoryMovement(BaseModel):
+    # one ledger entry of the inventory history
+    id: int
+    product_id: int
+    inventory_id: Optional[int] = None  # the inventory row (warehouse) it changed
+    change: int
+    reason: str
+    created_at: datetime
+    quantity_after: Optional[int] = None  # that row's stock level right after this change
+
+
+class InventoryLevel(BaseModel):
+    # stock level at a point in time
+    product_id: int
+    at: datetime
+    quantity: int
+
+
+class LowStockEvent(BaseModel):
+    # an item going below (is_low_stock) or back above its reorder level
+    id: int
+    inventory_id: int
+    product_id: int
+    warehouse: Optional[str] = None
+    is_low_stock: bool
+    quantity: Optional[int] = None
+    reorder_level: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
+
+
+
+class InventoryAdjustment(BaseModel):
+    # one line of a cycle count - give quantity or delta
+    product_id: int
+    quantity: Optional[int] = None  # counted stock, replaces the current quantity
+    delta: Optional[int] = None  # units to add (+) or take away (-)
+
+
+class InventoryAdjustmentResult(BaseModel):
+    # an applied adjustment (1-based row number)
+    row: int
+    product_id: int
+    quantity: int  # stock right after this row
+
+
+class InventoryBulkError(BaseModel):
+    # a rejected adjustment (1-based row number)
+    row: int
+    product_id: int
+    error: str
+
+
+class InventoryBulkResult(BaseModel):
+    # summary of a bulk adjustment
+    received: int
+    applied: int
+    failed: int
+    results: List[InventoryAdjustmentResult]
+    errors: List[InventoryBulkError]
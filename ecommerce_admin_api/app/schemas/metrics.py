@@ -0,0 +1,33 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    # connection pool usage for this worker
+    pool_class: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    
+    # counters since the worker started
+    connects: Optional[int] = None
+    checkouts: Optional[int] = None
+    waits: Optional[int] = None
+    wait_time_ms: Optional[float] = None
+    timeouts: Optional[int] = None
+
+
+
+class CacheStats(BaseModel):
+    # cache counters for this worker (entries/bytes only for the memory backend)
+    backend: str
+    hits: int
+    misses: int
+    invalidations: int
+    errors: int
+    entries: Optional[int] = None
+    bytes: Optional[int] = None
+    evictions: Optional[int] = None
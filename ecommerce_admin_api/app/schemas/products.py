@@ -31,4 +31,17 @@ class Product(ProductBase):
     updated_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class ProductSearchHit(Product):
+    # product search result, best first
+    score: float
+
+
+class ProductBulkResult(BaseModel):
+    # outcome of POST /products/bulk
+    received: int
+    created: int
+    updated: int
+    unchanged: int  # content hash matched, not written
@@ -1,5 +1,5 @@
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 from pydantic import BaseModel
 
 
@@ -12,7 +12,7 @@ class SaleBase(BaseModel):
 
 class SaleCreate(SaleBase):
     # for creating sales records
-    pass
+    sale_date: Optional[datetime] = None  # defaults to now, set when importing past orders
 
 
 class Sale(SaleBase):
@@ -29,4 +29,45 @@ class SaleAnalytics(BaseModel):
     # for returning sales analytics
     total_sales: float
     total_quantity: int
-    period: str
\ No newline at end of file
+    period: str
+
+
+class RevenueBucket(BaseModel):
+    # one point of a revenue time series
+    bucket_start: date
+    total_sales: float
+    total_quantity: int
+
+
+class RevenueTimeSeries(BaseModel):
+    # revenue broken down by period bucket
+    period: str
+    start_date: date
+    end_date: date
+    buckets: List[RevenueBucket]
+
+
+
+class SaleBulkError(BaseModel):
+    # a rejected row in a bulk upload (1-based row number)
+    row: int
+    error: str
+
+
+class SaleBulkResult(BaseModel):
+    # summary of a bulk upload
+    received: int
+    inserted: int
+    failed: int
+    errors: List[SaleBulkError]
+
+
+
+class PeriodComparison(SaleAnalytics):
+    # one period of a revenue comparison, deltas are against the previous period
+    start_date: date
+    end_date: date
+    delta_sales: Optional[float] = None
+    delta_quantity: Optional[int] = None
+    pct_change_sales: Optional[float] = None
+    pct_change_quantity: Optional[float] = None
@@ -0,0 +1,1071 @@
+import sys
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import Base
+from ecommerce_admin_api.app.models.product import Product
+from ecommerce_admin_api.app.models.sale import Sale
+from ecommerce_admin_api.app.services import sales as sales_service
+from ecommerce_admin_api.app.services import sales_rollup
+
+channels = ["Amazon", "Walmart", "Direct", "eBay"]
+categories = ["Electronics", "Clothing", "Footwear", "Kitchen", "Fitness"]
+
+
+def make_session(url="sqlite://"):
+    """Fresh database for a benchmark run (in-memory sqlite by default)"""
+    if url == "sqlite://":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db, products=100, days=365, sales_per_day=200):
+    """Bulk load synthetic products and sales"""
+    db.execute(insert(Product), [
+        {
+            "name": f"Product {i}",
+            "price": round(random.uniform(5, 200), 2),
+            "category": categories[i % len(categories)],
+            "sku": f"BENCH-{i:06d}"
+        }
+        for i in range(products)
+    ])
+
+    today = datetime.now()
+    rows = []
+    for day in range(days):
+        sale_date = today - timedelta(days=day)
+        for _ in range(sales_per_day):
+            quantity = random.randint(1, 5)
+            unit_price = round(random.uniform(5, 200), 2)
+            rows.append({
+                "product_id": random.randint(1, products),
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "total_amount": quantity * unit_price,
+                "sale_date": sale_date,
+                "channel": random.choice(channels)
+            })
+    db.execute(insert(Sale), rows)
+    db.commit()
+    sales_rollup.rebuild(db)
+    return len(rows)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def timed(fn, repeat=3):
+    """Best wall time of a few runs, in ms"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_timeseries(args):
+    """One request per day (old dashboard pattern) vs a single time series query"""
+    db = make_session()
+    rows = seed(db, days=args.days, sales_per_day=args.sales_per_day)
+    end = datetime.now().date()
+    start = end - timedelta(days=args.days - 1)
+
+    def per_day():
+        day = start
+        while day <= end:
+            sales_service.get_revenue_analytics(db, period="daily", start_date=day, end_date=day)
+            day += timedelta(days=1)
+
+    def single():
+        sales_service.get_revenue_timeseries(db, period="daily", start_date=start, end_date=end)
+
+    print(f"{rows} sales over {args.days} days")
+    for use_rollup in (False, True):
+        settings.USE_SALES_ROLLUP = use_rollup
+        source = "rollup" if use_rollup else "raw sales"
+        print(f"[{source}] {args.days} requests: {timed(per_day):.1f} ms")
+        print(f"[{source}] 1 time series query: {timed(single):.1f} ms")
+
+
+def bench_load(args):
+    """
+    Sync (threadpool) vs async (aiosqlite) stack under a mixed load: cheap
+    product lookups while slow analytics queries run alongside them
+    """
+    import httpx
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from ecommerce_admin_api.app import database
+    from ecommerce_admin_api.app.routers import products, sales
+
+    path = os.path.join(tempfile.mkdtemp(), "load.db")
+    db = make_session(f"sqlite:///{path}")
+    seed(db, days=args.days, sales_per_day=args.sales_per_day)
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    db.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def sync_db():
+        session = SyncSession()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    # analytics on raw sales so they are actually slow
+    settings.USE_SALES_ROLLUP = False
+
+    async def run(get_db, concurrency):
+        app = FastAPI()
+        app.include_router(products.router, prefix="/api")
+        app.include_router(sales.router, prefix="/api")
+        app.dependency_overrides[database.get_db] = get_db
+
+        latencies = {"lookup": [], "analytics": []}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def worker(n):
+                for i in range(args.requests // concurrency):
+                    # one in ten requests is a heavy analytics query
+                    if (n + i) % 10 == 0:
+                        kind, url = "analytics", "/api/sales/by-category?start_date=2000-01-01"
+                    else:
+                        kind, url = "lookup", f"/api/products/{random.randint(1, 100)}"
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    latencies[kind].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(n) for n in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        total = sum(len(values) for values in latencies.values())
+        return total / elapsed, latencies
+
+    for concurrency in args.concurrency:
+        for mode, get_db in (("sync", sync_db), ("async", async_db)):
+            throughput, latencies = asyncio.run(run(get_db, concurrency))
+            lookups = latencies["lookup"]
+            print(
+                f"[{mode:5}] concurrency={concurrency:<4} {throughput:8.1f} req/s  "
+                f"lookup p50={percentile(lookups, 50):7.1f} ms p99={percentile(lookups, 99):7.1f} ms  "
+                f"analytics p99={percentile(latencies['analytics'], 99):7.1f} ms"
+            )
+
+
+def bench_pagination(args):
+    """Page fetch time at increasing depth, offset vs cursor"""
+    from ecommerce_admin_api.app.services.pagination import encode_cursor
+
+    db = make_session()
+    rows = seed(db, days=args.days, sales_per_day=args.sales_per_day)
+    print(f"{rows} sales, pages of {args.page_size}")
+
+    depth = args.page_size
+    while depth < rows:
+        # cursor pointing at the row just before this depth (not timed)
+        sale = db.query(Sale).order_by(Sale.sale_date, Sale.id).offset(depth - 1).first()
+        cursor = encode_cursor(sales_service.sale_cursor_key(sale))
+
+        offset_ms = timed(lambda: sales_service.get_sales(db, skip=depth, limit=args.page_size))
+        cursor_ms = timed(lambda: sales_service.get_sales(db, limit=args.page_size, cursor=cursor))
+        print(f"depth {depth:>9}: offset {offset_ms:8.2f} ms  cursor {cursor_ms:8.2f} ms")
+        depth *= 4
+
+
+def bench_compare(args):
+    """N monthly periods: one revenue query per period vs one grouped query"""
+    db = make_session()
+    rows = seed(db, days=args.days, sales_per_day=args.sales_per_day)
+    end = datetime.now().date()
+    print(f"{rows} sales over {args.days} days")
+
+    for count in (2, 6, 12):
+        periods = []
+        for month in range(count):
+            period_end = end - timedelta(days=30 * month)
+            periods.append((period_end - timedelta(days=29), period_end))
+
+        def separate():
+            for start, stop in periods:
+                sales_service.get_revenue_analytics(db, period="compare", start_date=start, end_date=stop)
+
+        def combined():
+            sales_service.compare_revenue(db, periods)
+
+        for use_rollup in (False, True):
+            settings.USE_SALES_ROLLUP = use_rollup
+            source = "rollup" if use_rollup else "raw sales"
+            print(
+                f"[{source}] {count:>2} periods: separate {timed(separate):8.1f} ms  "
+                f"combined {timed(combined):8.1f} ms"
+            )
+
+
+def bench_stock(args):
+    """
+    Threads selling and restocking one product at once: the old read-modify-write
+    against the atomic conditional UPDATE, checked for lost or oversold units
+    """
+    import threading
+    from ecommerce_admin_api.app.models.inventory import Inventory
+    from ecommerce_admin_api.app.schemas.inventory import InventoryUpdate
+    from ecommerce_admin_api.app.schemas.sales import SaleCreate
+    from ecommerce_admin_api.app.services import inventory as inventory_service
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stock.db')}"
+    connect_args = {"check_same_thread": False, "timeout": 60} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.threads)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    settings.INVENTORY_OVERSELL = "reject"
+
+    def read_modify_write_sale(db, product_id):
+        # what sales and restocks used to do - read, change in python, write back
+        db_inventory = inventory_service.get_inventory_by_product(db, product_id)
+        if db_inventory.quantity < 1:
+            db.rollback()
+            return False
+        db_inventory.quantity -= 1
+        db.commit()
+        return True
+
+    def read_modify_write_restock(db, product_id):
+        db_inventory = inventory_service.get_inventory_by_product(db, product_id)
+        db_inventory.quantity += args.restock
+        db.commit()
+
+    def atomic_sale(db, product_id):
+        try:
+            sales_service.create_sale(db, SaleCreate(product_id=product_id, quantity=1, unit_price=1.0, channel="Direct"))
+            return True
+        except inventory_service.InsufficientStock:
+            return False
+
+    def atomic_restock(db, product_id):
+        inventory_service.restock_inventory(db, product_id, InventoryUpdate(quantity=args.restock))
+
+    for mode, sell, restock in (
+        ("read-modify-write", read_modify_write_sale, read_modify_write_restock),
+        ("atomic", atomic_sale, atomic_restock),
+    ):
+        db = Session()
+        product = Product(name=f"Stock {mode}", price=1.0, category="Bench", sku=f"STOCK-{mode}")
+        db.add(product)
+        db.flush()
+        db.add(Inventory(product_id=product.id, quantity=args.stock))
+        db.commit()
+        product_id = product.id
+        db.close()
+
+        counts = {"sold": 0, "rejected": 0, "restocked": 0}
+        lock = threading.Lock()
+
+        def worker(n):
+            db = Session()
+            try:
+                for i in range(args.requests // args.threads):
+                    # one in ten operations is a restock
+                    if (n + i) % 10 == 0:
+                        restock(db, product_id)
+                        key = "restocked"
+                    else:
+                        key = "sold" if sell(db, product_id) else "rejected"
+                    with lock:
+                        counts[key] += 1
+            finally:
+                db.close()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        db = Session()
+        final = db.query(Inventory.quantity).filter(Inventory.product_id == product_id).scalar()
+        db.close()
+        expected = args.stock + counts["restocked"] * args.restock - counts["sold"]
+        print(
+            f"[{mode:17}] {args.threads} threads {(sum(counts.values())) / elapsed:8.1f} ops/s  "
+            f"sold={counts['sold']} rejected={counts['rejected']} restocks={counts['restocked']}  "
+            f"stock={final} expected={expected} drift={final - expected}"
+        )
+        if mode == "atomic" and (final != expected or final < 0):
+            raise SystemExit("atomic stock updates lost or oversold units")
+
+
+def bench_export(args):
+    """Export every sale: paging GET /sales-style ORM pages vs the streaming export"""
+    import tracemalloc
+    from ecommerce_admin_api.app.schemas.sales import Sale as SaleSchema
+    from ecommerce_admin_api.app.services import export
+    from ecommerce_admin_api.app.services.pagination import encode_cursor
+
+    path = os.path.join(tempfile.mkdtemp(), "export.db")
+    db = make_session(f"sqlite:///{path}")
+    rows = seed(db, days=args.days, sales_per_day=args.sales_per_day)
+    print(f"{rows} sales")
+
+    def paged():
+        # what exports did before - 100-row pages of ORM objects and pydantic models
+        size, cursor = 0, None
+        while True:
+            page = sales_service.get_sales(db, limit=args.page_size, cursor=cursor)
+            size += sum(len(SaleSchema.from_orm(sale).json()) for sale in page)
+            db.expunge_all()
+            if len(page) < args.page_size:
+                return size
+            cursor = encode_cursor(sales_service.sale_cursor_key(page[-1]))
+
+    def streamed(export_format):
+        batches = sales_service.export_sales(db, batch_size=1000)
+        return sum(len(chunk) for chunk in export.encode(export_format, sales_service.EXPORT_COLUMNS, batches))
+
+    runs = [("paged ORM + pydantic", paged)]
+    for export_format in export.FORMATS:
+        try:
+            export.check_format(export_format)
+        except ValueError as e:
+            print(f"[{export_format}] skipped: {e}")
+            continue
+        runs.append((f"stream {export_format}", lambda export_format=export_format: streamed(export_format)))
+
+    for name, fn in runs:
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"[{name:20}] {rows / elapsed:10.0f} rows/s  {size / 1e6:7.1f} MB out  peak memory {peak / 1e6:6.1f} MB")
+
+
+def bench_serialize(args):
+    """Rows/s for 10k-row list responses: ORM objects + response_model vs column rows + orjson"""
+    import httpx
+    from typing import List
+    from fastapi import Depends, FastAPI
+    from ecommerce_admin_api.app import database
+    from ecommerce_admin_api.app.models.inventory import Inventory
+    from ecommerce_admin_api.app.routers import inventory, products, sales
+    from ecommerce_admin_api.app.schemas import inventory as inventory_schemas
+    from ecommerce_admin_api.app.schemas import products as product_schemas
+    from ecommerce_admin_api.app.schemas import sales as sale_schemas
+    from ecommerce_admin_api.app.services import inventory as inventory_service
+    from ecommerce_admin_api.app.services import products as product_service
+
+    rows = args.rows
+    db = make_session()
+    seed(db, products=rows, days=1, sales_per_day=rows)
+    db.execute(insert(Inventory), [
+        {"product_id": i + 1, "quantity": random.randint(0, 100), "reorder_level": 10, "warehouse": "main"}
+        for i in range(rows)
+    ])
+    db.commit()
+
+    def get_db():
+        yield db
+
+    app = FastAPI()
+    for router in (products.router, inventory.router, sales.router):
+        app.include_router(router, prefix="/api")
+    app.dependency_overrides[database.get_db] = get_db
+
+    # the list endpoints as they were - ORM objects validated through response_model
+    @app.get("/old/products", response_model=List[product_schemas.Product])
+    def old_products(limit: int, db=Depends(database.get_db)):
+        return product_service.get_products(db, limit=limit)
+
+    @app.get("/old/inventory", response_model=List[inventory_schemas.Inventory])
+    def old_inventory(limit: int, db=Depends(database.get_db)):
+        return inventory_service.get_inventory(db, limit=limit)
+
+    @app.get("/old/sales", response_model=List[sale_schemas.Sale])
+    def old_sales(limit: int, db=Depends(database.get_db)):
+        return sales_service.get_sales(db, limit=limit)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in ("products", "inventory", "sales"):
+                results = []
+                for url in (f"/old/{name}", f"/api/{name}/"):
+                    best = None
+                    for _ in range(3):
+                        db.expunge_all()
+                        start = time.perf_counter()
+                        response = await client.get(url, params={"limit": rows})
+                        response.raise_for_status()
+                        elapsed = time.perf_counter() - start
+                        best = elapsed if best is None else min(best, elapsed)
+                    assert len(response.json()) == rows
+                    results.append(rows / best)
+                print(
+                    f"[{name:9}] {rows} rows: ORM + pydantic {results[0]:9.0f} rows/s  "
+                    f"rows + orjson {results[1]:9.0f} rows/s  ({results[1] / results[0]:.1f}x)"
+                )
+
+    asyncio.run(run())
+
+
+def bench_search(args):
+    """Product search latency over a large catalog, in-process index"""
+    import resource
+    from ecommerce_admin_api.app.search import ProductSearchIndex
+    from ecommerce_admin_api.app.services import products as product_service
+
+    adjectives = ["wireless", "ergonomic", "compact", "premium", "classic", "smart", "portable", "heavy", "light", "waterproof"]
+    nouns = ["mouse", "keyboard", "shoe", "jacket", "blender", "kettle", "dumbbell", "mat", "lamp", "speaker", "cable", "charger"]
+    vocabulary = [f"{a}{b}" for a in "bcdfghklmnprst" for b in ("ane", "ore", "ix", "ula", "en", "ast", "ine", "oro")]
+
+    db = make_session()
+    batch = []
+    for i in range(args.products):
+        batch.append({
+            "name": f"{random.choice(adjectives)} {random.choice(nouns)} {random.choice(vocabulary)}",
+            "description": " ".join(random.choices(vocabulary, k=8)),
+            "price": round(random.uniform(5, 200), 2),
+            "category": categories[i % len(categories)],
+            "sku": f"SKU-{i:07d}"
+        })
+        if len(batch) == 50000:
+            db.execute(insert(Product), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Product), batch)
+    db.commit()
+
+    index = ProductSearchIndex()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index._build(db)
+    build = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"{args.products} products: built in {build:.1f} s, {len(index.vocabulary)} words, "
+        f"~{(rss_after - rss_before) / 1024:.0f} MB"
+    )
+
+    # the same hooks the service uses, against this index
+    product_service.product_index = index
+    index.version = None
+    index.sync = lambda db: None
+
+    queries = {
+        "sku prefix": lambda: f"sku-{random.randint(0, args.products - 1):07d}"[:10],
+        "exact sku": lambda: f"SKU-{random.randint(0, args.products - 1):07d}",
+        "two words": lambda: f"{random.choice(adjectives)} {random.choice(nouns)}",
+        "three words": lambda: f"{random.choice(adjectives)} {random.choice(nouns)} {random.choice(vocabulary)}",
+        "word prefix": lambda: random.choice(vocabulary)[:3],
+        "rare + prefix": lambda: f"{random.choice(vocabulary)} {random.choice(nouns)[:3]}",
+        "category": lambda: random.choice(categories),
+    }
+    for name, make_query in queries.items():
+        latencies = []
+        for _ in range(50):
+            q = make_query()
+            start = time.perf_counter()
+            product_service.search_products(db, q=q, limit=20)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"[{name:13}] p50={percentile(latencies, 50):7.2f} ms  p99={percentile(latencies, 99):7.2f} ms")
+
+
+def bench_adjust(args):
+    """Cycle-count throughput: one PUT /inventory/{id} per item against POST /inventory/bulk"""
+    import httpx
+    from fastapi import FastAPI
+    from ecommerce_admin_api.app import database
+    from ecommerce_admin_api.app.models.inventory import Inventory
+    from ecommerce_admin_api.app.models.inventory_movement import InventoryMovement
+    from ecommerce_admin_api.app.routers import inventory
+
+    rows = args.rows
+    db = make_session(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'adjust.db')}")
+    seed(db, products=rows, days=1, sales_per_day=1)
+    db.execute(insert(Inventory), [
+        {"product_id": i + 1, "quantity": 50, "reorder_level": 10, "warehouse": "main"}
+        for i in range(rows)
+    ])
+    db.commit()
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    db.close()
+
+    def get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(inventory.router, prefix="/api")
+    app.dependency_overrides[database.get_db] = get_db
+
+    # same counts both ways, some of them dropping items below their reorder level
+    counts = {product_id: random.randint(0, 100) for product_id in range(1, rows + 1)}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            for product_id, quantity in counts.items():
+                response = await client.put(f"/api/inventory/{product_id}", json={"quantity": quantity})
+                response.raise_for_status()
+            per_item = time.perf_counter() - start
+
+            # count back to the starting stock so the bulk run changes every row too
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/inventory/bulk", json=[{"product_id": product_id, "quantity": 50} for product_id in counts]
+            )
+            response.raise_for_status()
+            bulk = time.perf_counter() - start
+            result = response.json()
+            assert result["applied"] == rows and not result["errors"], result["errors"][:5]
+
+        print(
+            f"{rows} adjustments: per-item {rows / per_item:9.0f} items/s  "
+            f"bulk {rows / bulk:9.0f} items/s  ({per_item / bulk:.1f}x)"
+        )
+
+    asyncio.run(run())
+
+    # every adjustment is in the ledger and the flags agree with the counts
+    db = Session()
+    movements = db.query(InventoryMovement).count()
+    wrong_flags = db.query(Inventory).filter(Inventory.is_low_stock != (Inventory.quantity < Inventory.reorder_level)).count()
+    db.close()
+    print(f"ledger movements={movements}  stale low-stock flags={wrong_flags}")
+    if wrong_flags:
+        raise SystemExit("bulk adjustments left stale low-stock flags")
+
+
+# most SQL statements each write endpoint may run, on sqlite - MySQL has no UPDATE ... RETURNING,
+# so PUT /products/{id} reads the row back in one more there (the rest don't use RETURNING)
+QUERY_BUDGETS = {
+    "PUT /products/{id} (every field)": 1,
+    "PUT /products/{id} (price only)": 2,
+    "PUT /products/{id} (missing)": 1,
+    "DELETE /products/{id}": 6,
+    "DELETE /products/{id} (missing)": 1,
+    "PUT /inventory/{id} (quantity)": 3,
+    "PUT /inventory/{id} (crosses reorder level)": 5,
+    "PUT /inventory/{id} (missing)": 1,
+    "POST /inventory/restock": 3,
+    "POST /inventory/restock (missing)": 1,
+}
+
+
+def bench_queries(args):
+    """SQL statements per write endpoint, checked against QUERY_BUDGETS"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from fastapi import FastAPI
+    from ecommerce_admin_api.app import database
+    from ecommerce_admin_api.app.models.inventory import Inventory
+    from ecommerce_admin_api.app.routers import inventory, products
+
+    db = make_session()
+    seed(db, products=10, days=1, sales_per_day=20)
+    db.execute(insert(Inventory), [
+        {"product_id": i + 1, "quantity": 50, "reorder_level": 10, "warehouse": "main"}
+        for i in range(10)
+    ])
+    db.commit()
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    db.close()
+
+    def get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(products.router, prefix="/api")
+    app.include_router(inventory.router, prefix="/api")
+    app.dependency_overrides[database.get_db] = get_db
+    client = TestClient(app)
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Session.kw["bind"], "before_cursor_execute", count)
+
+    requests = {
+        "PUT /products/{id} (every field)": (
+            "put", "/api/products/1",
+            {"name": "Renamed", "description": "New", "price": 9.5, "category": "Kitchen"}, 200
+        ),
+        "PUT /products/{id} (price only)": ("put", "/api/products/2", {"price": 12.5}, 200),
+        "PUT /products/{id} (missing)": ("put", "/api/products/999", {"price": 1.0}, 404),
+        "DELETE /products/{id}": ("delete", "/api/products/3", None, 204),
+        "DELETE /products/{id} (missing)": ("delete", "/api/products/999", None, 404),
+        "PUT /inventory/{id} (quantity)": ("put", "/api/inventory/4", {"quantity": 40}, 200),
+        "PUT /inventory/{id} (crosses reorder level)": ("put", "/api/inventory/4", {"quantity": 5}, 200),
+        "PUT /inventory/{id} (missing)": ("put", "/api/inventory/999", {"quantity": 5}, 404),
+        "POST /inventory/restock": ("post", "/api/inventory/restock?product_id=5", {"quantity": 10}, 200),
+        "POST /inventory/restock (missing)": ("post", "/api/inventory/restock?product_id=999", {"quantity": 10}, 404),
+    }
+
+    over = []
+    for name, (method, url, body, expected_status) in requests.items():
+        statements.clear()
+        response = client.request(method, url, json=body)
+        assert response.status_code == expected_status, (name, response.status_code, response.text)
+        budget = QUERY_BUDGETS[name]
+        print(f"[{name:43}] {len(statements)} statements (budget {budget})")
+        if args.verbose:
+            for statement in statements:
+                print(f"    {' '.join(statement.split())[:120]}")
+        if len(statements) > budget:
+            over.append(name)
+
+    if over:
+        raise SystemExit(f"over the statement budget: {', '.join(over)}")
+
+
+def _analytics_calls(rng, first_day, last_day):
+    """A mix of analytics calls over random ranges and filters"""
+    calls = []
+    for _ in range(20):
+        start = first_day + timedelta(days=rng.randint(0, (last_day - first_day).days))
+        end = min(last_day, start + timedelta(days=rng.choice([0, 6, 30, 90, 365])))
+        category = rng.choice([None, None, rng.choice(categories), "No Such Category"])
+        channel = rng.choice([None, None, rng.choice(channels), "No Such Channel"])
+        calls += [
+            ("get_revenue_analytics", dict(period="range", start_date=start, end_date=end, category=category, channel=channel)),
+            ("get_revenue_timeseries", dict(period=rng.choice(["daily", "weekly", "monthly", "yearly"]),
+                                            start_date=start, end_date=end, category=category, channel=channel)),
+            ("compare_revenue", dict(periods=[(start, end), (start - timedelta(days=40), start - timedelta(days=10))],
+                                     category=category, channel=channel)),
+            ("get_sales_by_product", dict(start_date=start, end_date=end, limit=rng.choice([1, 10, 50]))),
+            ("get_sales_by_category", dict(start_date=start, end_date=end)),
+        ]
+    return calls
+
+
+def _same(a, b, path="result"):
+    """Compare analytics results, floats to a relative 1e-9 (sums add up in a different order)"""
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None or abs(a - b) > 1e-9 * max(abs(a), abs(b), 1):
+            return f"{path}: {a!r} != {b!r}"
+        return None
+    if isinstance(a, dict) and isinstance(b, dict):
+        if set(a) != set(b):
+            return f"{path}: keys {sorted(a)} != {sorted(b)}"
+        for key in a:
+            difference = _same(a[key], b[key], f"{path}.{key}")
+            if difference:
+                return difference
+        return None
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return f"{path}: {len(a)} rows != {len(b)} rows"
+        for i, (x, y) in enumerate(zip(a, b)):
+            difference = _same(x, y, f"{path}[{i}]")
+            if difference:
+                return difference
+        return None
+    return None if a == b else f"{path}: {a!r} != {b!r}"
+
+
+def _check_parity(db, engine_columns, calls, label):
+    """Every call answered by SQL (rollup and raw sales) and by the columns, failing on any difference"""
+    for name, kwargs in calls:
+        fn = getattr(sales_service, name).__wrapped__
+        answers = {}
+        settings.ANALYTICS_ENGINE = False
+        for rollup in (True, False):
+            settings.USE_SALES_ROLLUP = rollup
+            answers["rollup" if rollup else "sales"] = fn(db, **kwargs)
+        settings.ANALYTICS_ENGINE = True
+        engine_columns.touch()
+        answers["engine"] = fn(db, **kwargs)
+        settings.ANALYTICS_ENGINE = False
+        for source in ("rollup", "engine"):
+            difference = _same(answers["sales"], answers[source])
+            if difference:
+                raise SystemExit(f"[{label}] {name}({kwargs}) sql vs {source}: {difference}")
+    print(f"[{label}] {len(calls)} calls: SQL (rollup and raw sales) and columns agree")
+
+
+def bench_analytics(args):
+    """
+    Columnar analytics engine: parity with the SQL paths (including sales added,
+    back-dated and orphaned after loading), then query latency against SQL and on
+    --rows synthetic sales held in memory (run it with --rows 50000000)
+    """
+    import numpy as np
+    from ecommerce_admin_api.app import analytics_engine
+    from ecommerce_admin_api.app.schemas.products import ProductUpdate
+    from ecommerce_admin_api.app.schemas.sales import SaleCreate
+    from ecommerce_admin_api.app.scripts.populate_db import generate
+    from ecommerce_admin_api.app.services import products as product_service
+
+    settings.INVENTORY_OVERSELL = "allow"
+    rng = random.Random(42)
+
+    # -- parity on a generated dataset
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'analytics.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    end = datetime(2024, 12, 31)
+    generate(url, products=2000, sales=200000, days=730, warehouses=1, zipf=1.1, end=end)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    first_day, last_day = (end - timedelta(days=730)).date(), end.date()
+
+    columns = analytics_engine.sales_columns
+    columns.clear()
+    settings.ANALYTICS_ENGINE = True
+    start = time.perf_counter()
+    columns.sync(db)
+    print(f"loaded 200000 sales from sqlite in {time.perf_counter() - start:.2f} s")
+    _check_parity(db, columns, _analytics_calls(rng, first_day, last_day), "loaded")
+
+    # writes after the load - new and back-dated sales, a new channel, a moved category, a deleted product
+    for i in range(300):
+        sales_service.create_sale(db, SaleCreate(
+            product_id=rng.randint(1, 2000), quantity=rng.randint(1, 5), unit_price=round(rng.uniform(5, 200), 2),
+            channel=rng.choice(channels + ["Marketplace"]),
+            sale_date=datetime.combine(first_day + timedelta(days=rng.randint(0, 730)), datetime.min.time()) + timedelta(hours=12)
+        ))
+    product_service.update_product(db, 5, ProductUpdate(category="Garden"))
+    product_service.delete_product(db, 7)
+    # big enough to be merged into the sorted columns
+    analytics_engine.MERGE_AT = 200
+    _check_parity(db, columns, _analytics_calls(rng, first_day, last_day), "after writes")
+    db.close()
+
+    # -- latency against SQL on the same data
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    calls = _analytics_calls(random.Random(7), first_day, last_day)
+    for mode in ("sql rollup", "sql sales", "columns"):
+        settings.ANALYTICS_ENGINE = mode == "columns"
+        settings.USE_SALES_ROLLUP = mode == "sql rollup"
+        latencies = {}
+        for name, kwargs in calls:
+            fn = getattr(sales_service, name).__wrapped__
+            start = time.perf_counter()
+            fn(db, **kwargs)
+            latencies.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        print(f"[{mode:10}] 200k sales  " + "  ".join(
+            f"{name.replace('get_', '').replace('sales_', '')} p50={percentile(values, 50):.2f}ms"
+            for name, values in latencies.items()
+        ))
+    db.close()
+
+    # -- --rows synthetic sales straight into the columns (loading that many through sqlite takes hours)
+    rows = args.rows
+    state = np.random.default_rng(42)
+    products = 1000000
+    popularity = 1 / np.arange(1, products + 1) ** 1.1
+    days = (first_day - analytics_engine.EPOCH).days
+    main = {
+        "product": (state.choice(products, size=rows, p=popularity / popularity.sum()) + 1).astype("int32"),
+        "channel": state.integers(0, len(channels), size=rows, dtype="int16"),
+        "day": np.sort(state.integers(days, days + 731, size=rows, dtype="int32")),
+        "quantity": state.integers(1, 6, size=rows, dtype="int64"),
+        "total": state.uniform(5, 1000, size=rows),
+    }
+    big = analytics_engine.SalesColumns()
+    big.main = main
+    big.delta = {name: column[:0] for name, column in main.items()}
+    big.channels = {channel: code for code, channel in enumerate(channels)}
+    big.channel_names = list(channels)
+    big.categories = {category: code for code, category in enumerate(categories)}
+    big.category_names = list(categories)
+    big.product_category = np.concatenate([[-1], np.arange(products) % len(categories)]).astype("int32")
+    big.ready = True
+    print(f"{rows} sales in memory: {sum(column.nbytes for column in main.values()) / 2 ** 20:.0f} MB of columns")
+
+    queries = {
+        "revenue 30d": lambda s, e: big.totals(e - timedelta(days=30), e),
+        "revenue 1y + category + channel": lambda s, e: big.totals(s, e, category="Kitchen", channel="Amazon"),
+        "timeseries daily 90d": lambda s, e: big.daily(e - timedelta(days=90), e),
+        "timeseries 2y + category": lambda s, e: big.daily(s, e, category="Fitness"),
+        "by-product 30d": lambda s, e: big.by_product(e - timedelta(days=30), e, 10),
+        "by-product 2y": lambda s, e: big.by_product(s, e, 10),
+        "by-category 2y": lambda s, e: big.by_category(s, e),
+    }
+    for name, query in queries.items():
+        best = timed(lambda: query(first_day, last_day), repeat=5)
+        print(f"[{name:32}] {best:9.1f} ms")
+
+
+def bench_leaderboard(args):
+    """
+    Top sellers for the maintained windows: parity with grouping the rollup
+    (after new, back-dated and future-dated sales and as the refresh moves the days on),
+    then the read time of both
+    """
+    from ecommerce_admin_api.app.schemas.sales import SaleCreate
+    from ecommerce_admin_api.app.scripts.populate_db import generate
+    from ecommerce_admin_api.app.services import sales_leaderboard
+
+    settings.INVENTORY_OVERSELL = "allow"
+    settings.USE_SALES_ROLLUP = True
+    rng = random.Random(42)
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'leaderboard.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    products = 20000
+    counts = generate(url, products=products, sales=args.rows * 50, days=365, warehouses=1, zipf=1.1)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    today = datetime.now().date()
+    print(f"{counts['sales']} sales of {products} products over 365 days, windows {settings.SALES_LEADERBOARD_WINDOWS}")
+
+    def check(day, label):
+        for window_days in settings.SALES_LEADERBOARD_WINDOWS:
+            start = day - timedelta(days=window_days)
+            maintained = sales_leaderboard.top_products(db, start, day, 50, today=day)
+            grouped = sales_service._sales_by_product_query(db, start, day).limit(50).all()
+            difference = _same(
+                [[product_id, sales, quantity] for product_id, sales, quantity in maintained],
+                [[product_id, sales, quantity] for product_id, sales, quantity in grouped]
+            )
+            if difference:
+                raise SystemExit(f"[{label}] window {window_days}: {difference}")
+        print(f"[{label}] top 50 of every window matches the rollup")
+
+    def refresh(day):
+        # reads fall back to the rollup until the refresh has moved the windows to the day
+        if sales_leaderboard.top_products(db, day - timedelta(days=30), day, 50, today=day) is not None:
+            raise SystemExit(f"[{day}] window read before the refresh moved it there")
+        sales_leaderboard.refresh(db, today=day, settle=0)
+
+    def sell(count, first, last):
+        for _ in range(count):
+            day = first + timedelta(days=rng.randint(0, (last - first).days))
+            sales_service.create_sale(db, SaleCreate(
+                product_id=rng.randint(1, 50), quantity=rng.randint(1, 5), unit_price=round(rng.uniform(5, 200), 2),
+                channel=rng.choice(channels), sale_date=datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+            ))
+
+    # generate() built the windows at today
+    check(today, "built")
+    sell(200, today - timedelta(days=100), today)
+    check(today, "after 200 sales")
+
+    # read time, windows already at the day asked for
+    for window_days in settings.SALES_LEADERBOARD_WINDOWS:
+        start = today - timedelta(days=window_days)
+        grouped = timed(lambda: sales_service._sales_by_product_query(db, start, today).limit(10).all(), repeat=5)
+        maintained = timed(lambda: sales_leaderboard.top_products(db, start, today, 10, today=today), repeat=5)
+        print(f"[window {window_days:3} days] rollup group by {grouped:8.2f} ms   leaderboard {maintained:6.2f} ms")
+
+    # the days move on - sales dated ahead of the windows are added when they get there
+    sell(50, today + timedelta(days=1), today + timedelta(days=3))
+    for ahead in (1, 3, 40, 200):
+        refresh(today + timedelta(days=ahead))
+        check(today + timedelta(days=ahead), f"{ahead} days later")
+        sell(20, today + timedelta(days=ahead - 20), today + timedelta(days=ahead))
+
+    db.close()
+
+
+def bench_conditional(args):
+    """
+    Bytes on the wire and time per request for big listing/analytics responses:
+    uncompressed, gzip, brotli (when installed) and a 304 revalidation
+    """
+    import httpx
+    from ecommerce_admin_api.app import compression
+    from ecommerce_admin_api.app.scripts.load_test import build_app
+    from ecommerce_admin_api.app.scripts.populate_db import generate
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'conditional.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    generate(url, products=20000, sales=args.rows * 20, days=365)
+    app = build_app(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    # results cached by the service layer would hide the query a 304 skips
+    settings.CACHE_ENABLED = False
+
+    start_date = (datetime.now() - timedelta(days=364)).date()
+    paths = [
+        "/api/products/?limit=5000",
+        "/api/sales/?limit=5000",
+        f"/api/sales/by-product?start_date={start_date}&limit=5000",
+        f"/api/sales/analytics/timeseries?period=daily&start_date={start_date}",
+    ]
+    codings = ["identity", "gzip"] + (["br"] if compression.brotli else [])
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in paths:
+                print(path)
+                for coding in codings:
+                    sizes = []
+                    latencies = []
+                    etag = None
+                    for _ in range(5):
+                        start = time.perf_counter()
+                        # raw bytes - what went over the wire, before decoding
+                        async with client.stream("GET", path, headers={"Accept-Encoding": coding}) as response:
+                            sizes.append(len(b"".join([chunk async for chunk in response.aiter_raw()])))
+                            etag = response.headers.get("etag")
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    print(f"  [{coding:8}] 200: {sizes[0] / 1024:9.1f} KB  p50={percentile(latencies, 50):7.1f} ms")
+
+                    latencies = []
+                    for _ in range(20):
+                        start = time.perf_counter()
+                        response = await client.get(path, headers={"Accept-Encoding": coding, "If-None-Match": etag})
+                        assert response.status_code == 304, response.status_code
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    print(f"  [{coding:8}] 304: {len(response.content) / 1024:9.1f} KB  p50={percentile(latencies, 50):7.1f} ms")
+
+    asyncio.run(run())
+
+
+# run in a fresh interpreter per measurement - imports must be cold
+STARTUP_PROBE = """
+import sys, json, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+from ecommerce_admin_api.app import database, main
+result = {"import_ms": (time.perf_counter() - start) * 1000, "engine_at_import": database.engine is not None}
+if sys.argv[2] == "serve":
+    from fastapi.testclient import TestClient
+    start = time.perf_counter()
+    with TestClient(main.app) as client:
+        result["lifespan_ms"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        client.get("/api/products/?limit=1").raise_for_status()
+        result["first_request_ms"] = (time.perf_counter() - start) * 1000
+        result["connections"] = database.engine.pool.checkedin()
+elif sys.argv[2] == "create_all":
+    from ecommerce_admin_api.app.database import Base, get_engine
+    start = time.perf_counter()
+    Base.metadata.create_all(bind=get_engine())
+    result["create_all_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(result))
+"""
+
+
+def bench_startup(args):
+    """
+    Worker boot: importing the app (no engine, no connection, no schema check),
+    the lifespan hook and the first request, each in a fresh interpreter
+    create_all is timed too - every worker used to run it at import
+    """
+    import json
+    import subprocess
+    from ecommerce_admin_api.app.migrations import migrate
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    migrate(create_engine(f"sqlite:///{path}"))
+
+    def probe(mode, url):
+        env = dict(os.environ, SEARCH_WARM_ON_STARTUP="false")
+        if url:
+            env["DATABASE_URL"] = url
+        else:
+            env.pop("DATABASE_URL", None)
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, root, mode], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    runs = 5
+    for mode, url, label in (
+        ("serve", f"sqlite:///{path}", "sqlite, migrated"),
+        ("import", None, "default mysql url, no server running"),
+        ("create_all", f"sqlite:///{path}", "sqlite, schema check"),
+    ):
+        results = [probe(mode, url) for _ in range(runs)]
+        line = [f"import p50={percentile([r['import_ms'] for r in results], 50):6.1f} ms"]
+        line.append("engine at import: " + ("yes" if any(r["engine_at_import"] for r in results) else "no"))
+        for key, name in (("lifespan_ms", "lifespan"), ("first_request_ms", "first request"), ("create_all_ms", "create_all")):
+            if key in results[0]:
+                line.append(f"{name} p50={percentile([r[key] for r in results], 50):6.1f} ms")
+        if "connections" in results[0]:
+            line.append(f"pooled connections: {results[0]['connections']}")
+        print(f"[{label:38}] " + "  ".join(line))
+
+
+BENCHMARKS = {
+    "timeseries": bench_timeseries,
+    "load": bench_load,
+    "pagination": bench_pagination,
+    "compare": bench_compare,
+    "stock": bench_stock,
+    "export": bench_export,
+    "serialize": bench_serialize,
+    "search": bench_search,
+    "adjust": bench_adjust,
+    "queries": bench_queries,
+    "analytics": bench_analytics,
+    "leaderboard": bench_leaderboard,
+    "conditional": bench_conditional,
+    "startup": bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API hot paths against a throwaway sqlite database")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sales-per-day", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per load test run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--products", type=int, default=1000000, help="catalog size for the search benchmark")
+    parser.add_argument("--rows", type=int, default=10000, help="rows per response for the serialize benchmark, items for adjust, sales for analytics (x50 for leaderboard, x20 for conditional)")
+    parser.add_argument("--threads", type=int, default=32, help="threads for the stock stress test")
+    parser.add_argument("--stock", type=int, default=500, help="starting stock for the stock stress test")
+    parser.add_argument("--restock", type=int, default=5, help="units per restock in the stock stress test")
+    parser.add_argument("--url", help="database url for the stock stress test (default: temporary sqlite file)")
+    parser.add_argument("--verbose", action="store_true", help="print the statements the queries benchmark counts")
+    args = parser.parse_args()
+
+    # measure the queries, not the analytics cache
+    settings.CACHE_ENABLED = False
+    random.seed(42)
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
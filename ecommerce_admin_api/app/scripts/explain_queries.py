@@ -0,0 +1,108 @@
+import sys
+import os
+import argparse
+from datetime import date, datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from sqlalchemy import event
+
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import SessionLocal, get_engine
+from ecommerce_admin_api.app.services import sales as sales_service
+from ecommerce_admin_api.app.services.pagination import encode_cursor
+
+# tables that must never be read with a full scan
+checked_tables = ("sales", "sales_daily_rollup")
+
+
+def service_queries():
+    """The service calls whose SQL gets checked"""
+    today = date.today()
+    start = today - timedelta(days=30)
+    cursor = encode_cursor([datetime.now().isoformat(), 0])
+
+    return [
+        ("get_sales by date", lambda db: sales_service.get_sales(db, start_date=start, end_date=today)),
+        ("get_sales by product", lambda db: sales_service.get_sales(db, start_date=start, end_date=today, product_id=1)),
+        ("get_sales by channel", lambda db: sales_service.get_sales(db, start_date=start, end_date=today, channel="Amazon")),
+        ("get_sales by cursor", lambda db: sales_service.get_sales(db, cursor=cursor)),
+        ("get_revenue_analytics", lambda db: sales_service.get_revenue_analytics(db, "daily", start, today)),
+        ("get_revenue_analytics by channel", lambda db: sales_service.get_revenue_analytics(db, "daily", start, today, channel="Amazon")),
+        ("get_revenue_analytics by category", lambda db: sales_service.get_revenue_analytics(db, "daily", start, today, category="Electronics")),
+        ("get_revenue_timeseries", lambda db: sales_service.get_revenue_timeseries(db, "weekly", start, today)),
+        ("compare_revenue", lambda db: sales_service.compare_revenue(db, [(start - timedelta(days=30), start), (start, today)])),
+        ("get_sales_by_product", lambda db: sales_service.get_sales_by_product(db, start, today)),
+        ("get_sales_by_category", lambda db: sales_service.get_sales_by_category(db, start, today)),
+    ]
+
+
+def full_scans(conn, statement, parameters):
+    """Plan steps that read a checked table without an index"""
+    if conn.dialect.name == "sqlite":
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return [
+            row[-1] for row in plan
+            if row[-1].startswith("SCAN") and "USING" not in row[-1]
+            and row[-1].split()[1] in checked_tables
+        ]
+
+    if conn.dialect.name == "mysql":
+        plan = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+        return [
+            f"type=ALL on {row['table']}" for row in plan
+            if row["type"] == "ALL" and row["table"] in checked_tables
+        ]
+
+    raise NotImplementedError(f"no EXPLAIN support for {conn.dialect.name}")
+
+
+def check(use_rollup):
+    """Run every service query and EXPLAIN what it sent, returns the failures"""
+    settings.USE_SALES_ROLLUP = use_rollup
+    settings.CACHE_ENABLED = False  # every call must reach the database
+    failures = []
+    engine = get_engine()
+
+    for name, call in service_queries():
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        db = SessionLocal()
+        try:
+            call(db)
+        finally:
+            db.close()
+            event.remove(engine, "before_cursor_execute", capture)
+
+        with engine.connect() as conn:
+            scans = [scan for statement, parameters in statements for scan in full_scans(conn, statement, parameters)]
+
+        source = "rollup" if use_rollup else "sales"
+        if scans:
+            failures.append((name, scans))
+            print(f"FAIL [{source}] {name}: {'; '.join(scans)}")
+        else:
+            print(f"ok   [{source}] {name}")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the sales service queries and fail on full table scans")
+    parser.parse_args()
+
+    failures = check(use_rollup=False) + check(use_rollup=True)
+    if failures:
+        print(f"{len(failures)} queries do a full table scan")
+        sys.exit(1)
+    print("All sales queries use an index")
+
+
+if __name__ == "__main__":
+    main()
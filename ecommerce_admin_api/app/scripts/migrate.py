@@ -0,0 +1,34 @@
+import sys
+import os
+import argparse
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from ecommerce_admin_api.app.database import get_engine
+from ecommerce_admin_api.app import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied")
+    args = parser.parse_args()
+    engine = get_engine()
+
+    if args.status:
+        done = migrations.applied_versions(engine)
+        for version, name, _ in migrations.MIGRATIONS:
+            state = "applied" if version in done else "pending"
+            print(f"{version:>4}  {state:8} {name}")
+        return
+
+    applied = migrations.migrate(engine, target=args.target)
+    for version, name in applied:
+        print(f"Applied {version}: {name}")
+    if not applied:
+        print("Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
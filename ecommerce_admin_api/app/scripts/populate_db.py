@@ -1,19 +1,24 @@
 import sys
 import os
 import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
-from sqlalchemy.orm import Session
-from ecommerce_admin_api.app.database import SessionLocal, engine, Base
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from ecommerce_admin_api.app import migrations
+from ecommerce_admin_api.app.database import SessionLocal, get_engine, db_url
 from ecommerce_admin_api.app.models.product import Product
 from ecommerce_admin_api.app.models.inventory import Inventory
 from ecommerce_admin_api.app.models.sale import Sale
-
-# create tables
-Base.metadata.create_all(bind=engine)
+from ecommerce_admin_api.app.models.sale_rollup import SaleDailyRollup
+from ecommerce_admin_api.app.services import sales_leaderboard, sales_rollup
+from ecommerce_admin_api.app.services.products import content_hash
 
 # sample data
 products = [
@@ -94,6 +99,9 @@ channels = ["Amazon", "Walmart", "Direct", "eBay"]
 
 # function to populate database
 def populate_db():
+    # create tables, recorded as migrated so scripts/migrate.py doesn't redo them
+    migrations.migrate(get_engine())
+    
     db = SessionLocal()
     try:
         # check if products already exist
@@ -105,7 +113,7 @@ def populate_db():
         # add products
         db_products = []
         for product_data in products:
-            product = Product(**product_data)
+            product = Product(**product_data, content_hash=content_hash(product_data))
             db.add(product)
             db_products.append(product)
         
@@ -114,11 +122,14 @@ def populate_db():
         
         # add inventory for each product
         for product in db_products:
+            quantity = random.randint(10, 100)
+            reorder_level = random.randint(5, 20)
             inventory = Inventory(
                 product_id=product.id,
-                quantity=random.randint(10, 100),
-                reorder_level=random.randint(5, 20),
-                warehouse="main"
+                quantity=quantity,
+                reorder_level=reorder_level,
+                warehouse="main",
+                is_low_stock=quantity < reorder_level
             )
             db.add(inventory)
         
@@ -148,6 +159,10 @@ def populate_db():
         
         # final commit
         db.commit()
+        
+        # sales were added directly, so backfill the analytics rollup and leaderboard
+        sales_rollup.rebuild(db)
+        sales_leaderboard.rebuild(db)
         print("Database populated successfully!")
         
     except Exception as e:
@@ -157,6 +172,192 @@ def populate_db():
         db.close()
 
 
+# -- generated datasets, for load tests and benchmarks at realistic sizes
+
+adjectives = ["wireless", "ergonomic", "compact", "premium", "classic", "smart", "portable", "heavy", "light", "waterproof"]
+nouns = ["mouse", "keyboard", "shoe", "jacket", "blender", "kettle", "dumbbell", "mat", "lamp", "speaker", "cable", "charger"]
+vocabulary = [f"{a}{b}" for a in "bcdfghklmnprst" for b in ("ane", "ore", "ix", "ula", "en", "ast", "ine", "oro")]
+categories = ["Electronics", "Clothing", "Footwear", "Kitchen", "Fitness"]
+
+# per worker process - engine and the zipf tables are built once, not per chunk
+_worker_state = {}
+
+
+def warehouse_names(count: int):
+    """Warehouse names, the first is "main" like the sample data"""
+    return ["main"] + [f"warehouse-{n}" for n in range(2, count + 1)]
+
+
+def product_price(product_id: int):
+    """List price of a generated product, derived from its id so any worker can work it out"""
+    return round(5 + (product_id * 7919) % 19500 / 100, 2)
+
+
+def _worker_engine(url: str):
+    if url not in _worker_state:
+        # sqlite has one writer at a time - wait for it rather than fail
+        connect_args = {"check_same_thread": False, "timeout": 300} if url.startswith("sqlite") else {}
+        _worker_state[url] = create_engine(url, connect_args=connect_args)
+    return _worker_state[url]
+
+
+def _popularity(products: int, zipf: float, seed: int):
+    """Product ids by popularity rank and their cumulative zipf weights"""
+    key = ("zipf", products, zipf, seed)
+    if key not in _worker_state:
+        ranked = list(range(1, products + 1))
+        # popularity is spread over the catalog, not bunched at the low ids
+        random.Random(f"{seed}-popularity").shuffle(ranked)
+        weights = itertools.accumulate(1 / rank ** zipf for rank in range(1, products + 1))
+        _worker_state[key] = (ranked, list(weights))
+    return _worker_state[key]
+
+
+def _product_rows(start: int, stop: int, options: dict):
+    rng = random.Random(f"{options['seed']}-products-{start}")
+    for product_id in range(start + 1, stop + 1):
+        product = {
+            "id": product_id,
+            "name": f"{rng.choice(adjectives)} {rng.choice(nouns)} {rng.choice(vocabulary)}",
+            "description": " ".join(rng.choices(vocabulary, k=8)),
+            "price": product_price(product_id),
+            "category": categories[product_id % len(categories)],
+            "sku": f"GEN-{product_id:08d}"
+        }
+        product["content_hash"] = content_hash(product)
+        yield product
+
+
+def _inventory_rows(start: int, stop: int, options: dict):
+    rng = random.Random(f"{options['seed']}-inventory-{start}")
+    warehouses = warehouse_names(options["warehouses"])
+    for product_id in range(start + 1, stop + 1):
+        for n, warehouse in enumerate(warehouses):
+            quantity = rng.randint(0, 200)
+            reorder_level = rng.randint(5, 20)
+            yield {
+                # main first, it's the row sales and restocks use
+                "id": (product_id - 1) * len(warehouses) + n + 1,
+                "product_id": product_id,
+                "quantity": quantity,
+                "reorder_level": reorder_level,
+                "warehouse": warehouse,
+                "is_low_stock": quantity < reorder_level
+            }
+
+
+def _sale_rows(start: int, stop: int, options: dict):
+    rng = random.Random(f"{options['seed']}-sales-{start}")
+    ranked, weights = _popularity(options["products"], options["zipf"], options["seed"])
+    first_day = datetime.fromisoformat(options["end"]) - timedelta(days=options["days"])
+    seconds = options["days"] * 86400
+    product_ids = rng.choices(ranked, cum_weights=weights, k=stop - start)
+    for sale_id, product_id in zip(range(start + 1, stop + 1), product_ids):
+        quantity = rng.randint(1, 5)
+        unit_price = round(product_price(product_id) * (1 - rng.uniform(0, 0.2)), 2)  # random discount
+        yield {
+            "id": sale_id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_amount": quantity * unit_price,
+            "sale_date": first_day + timedelta(seconds=rng.randrange(seconds)),
+            "channel": rng.choice(channels)
+        }
+
+
+_ROWS = {
+    "products": (Product, _product_rows),
+    "inventory": (Inventory, _inventory_rows),
+    "sales": (Sale, _sale_rows),
+}
+
+
+def _insert_chunk(url: str, kind: str, start: int, stop: int, options: dict):
+    """Build rows start..stop of a table and insert them (runs in a worker process)"""
+    model, make_rows = _ROWS[kind]
+    rows = list(make_rows(start, stop, options))
+    with _worker_engine(url).begin() as conn:
+        # core executemany - skips the ORM's per-row bookkeeping
+        conn.execute(insert(model.__table__), rows)
+    return len(rows)
+
+
+def generate(
+    url: str,
+    products: int = 1000,
+    sales: int = 100000,
+    days: int = 365,
+    warehouses: int = 1,
+    zipf: float = 1.1,
+    chunk_size: int = 20000,
+    workers: int = 1,
+    seed: int = 42,
+    end: datetime = None
+):
+    """
+    Bulk load a synthetic dataset into an empty database
+    Product popularity follows a zipf distribution (a few products get most sales),
+    every product has a row per warehouse. Chunks are built and inserted by worker
+    processes with their own seeds and explicit ids, so a seed gives the same data
+    whatever the worker count
+    """
+    options = {
+        "products": products,
+        "days": days,
+        "warehouses": warehouses,
+        "zipf": zipf,
+        "seed": seed,
+        "end": (end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)).isoformat()
+    }
+    counts = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # products first - inventory and sales point at them
+        for kind, total in (("products", products), ("inventory", products), ("sales", sales)):
+            futures = [
+                pool.submit(_insert_chunk, url, kind, start, min(start + chunk_size, total), options)
+                for start in range(0, total, chunk_size)
+            ]
+            counts[kind] = sum(future.result() for future in futures)
+    
+    # sales went in directly, so backfill the analytics rollup and leaderboard
+    db = sessionmaker(bind=_worker_engine(url))()
+    try:
+        sales_rollup.rebuild(db)
+        sales_leaderboard.rebuild(db)
+    finally:
+        db.close()
+    return counts
+
+
 if __name__ == "__main__":
-    print("Populating database with sample data...")
-    populate_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fill the database with sample data, or a generated dataset of any size")
+    parser.add_argument("--products", type=int, help="generate this many products (default: the small sample catalog)")
+    parser.add_argument("--sales", type=int, default=100000, help="generated sales")
+    parser.add_argument("--days", type=int, default=365, help="days of sales history, ending today")
+    parser.add_argument("--warehouses", type=int, default=1, help="inventory rows per product")
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of product popularity (0 = uniform)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="rows per insert")
+    parser.add_argument("--workers", type=int, default=1, help="processes building and inserting chunks")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", default=db_url, help="database url (default: from config)")
+    args = parser.parse_args()
+    
+    if args.products is None:
+        print("Populating database with sample data...")
+        populate_db()
+    else:
+        target = create_engine(args.url)
+        migrations.migrate(target)
+        with Session(target) as db:
+            if db.query(Product).first():
+                raise SystemExit("Database already contains data. Skipping population.")
+        target.dispose()
+        
+        start = datetime.now()
+        counts = generate(
+            args.url, products=args.products, sales=args.sales, days=args.days, warehouses=args.warehouses,
+            zipf=args.zipf, chunk_size=args.chunk_size, workers=args.workers, seed=args.seed
+        )
+        elapsed = (datetime.now() - start).total_seconds()
+        print(f"Generated {counts} in {elapsed:.1f} s ({sum(counts.values()) / elapsed:.0f} rows/s)")
\ No newline at end of file
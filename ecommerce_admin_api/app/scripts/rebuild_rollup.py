@@ -0,0 +1,45 @@
+import sys
+import os
+import argparse
+from datetime import date
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from ecommerce_admin_api.app.database import SessionLocal, get_engine
+from ecommerce_admin_api.app import migrations
+from ecommerce_admin_api.app.services import sales_leaderboard, sales_rollup
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or verify the sales_daily_rollup table")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day (default: first sale)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day (default: last sale)")
+    parser.add_argument("--chunk-days", type=int, default=31, help="days rebuilt per transaction")
+    parser.add_argument("--check", action="store_true", help="only compare rollup with raw sales")
+    args = parser.parse_args()
+
+    # schema up to date (rollup table on existing databases), recorded like scripts/migrate.py does
+    migrations.migrate(get_engine())
+
+    db = SessionLocal()
+    try:
+        if not args.check:
+            rows = sales_rollup.rebuild(db, start_date=args.start, end_date=args.end, chunk_days=args.chunk_days)
+            print(f"Rebuilt rollup: {rows} rows")
+            # the leaderboard windows are sums of rollup days
+            sales_leaderboard.rebuild(db)
+            print("Rebuilt sales leaderboard")
+
+        mismatches = sales_rollup.check_consistency(db, start_date=args.start, end_date=args.end)
+        if mismatches:
+            print(f"Rollup is inconsistent: {len(mismatches)} mismatched buckets")
+            for mismatch in mismatches[:20]:
+                print(mismatch)
+            sys.exit(1)
+        print("Rollup matches raw sales")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
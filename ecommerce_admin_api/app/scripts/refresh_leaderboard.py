@@ -0,0 +1,37 @@
+import sys
+import os
+import argparse
+from datetime import date
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import SessionLocal
+from ecommerce_admin_api.app.services import sales_leaderboard
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the sales leaderboard windows and move them to today - run from cron just after midnight"
+    )
+    parser.add_argument("--today", type=date.fromisoformat, help="day to move the windows to (default: today)")
+    parser.add_argument(
+        "--settle", type=float, default=settings.SALES_LEADERBOARD_SETTLE_SECONDS,
+        help="seconds to wait for sale writes in flight before recounting the moved windows"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        moved = sales_leaderboard.refresh(db, today=args.today, settle=args.settle)
+        if moved:
+            print(f"Moved windows {moved} to {args.today or date.today()}")
+        else:
+            print("Sales leaderboard is up to date")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import SessionLocal
+from ecommerce_admin_api.app.services import inventory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot inventory levels so history reads replay a short ledger tail")
+    parser.add_argument(
+        "--every", type=int, default=settings.INVENTORY_SNAPSHOT_EVERY,
+        help="snapshot inventory rows with at least this many movements since their last snapshot"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        taken = inventory.take_snapshots(db, every=args.every)
+        print(f"Took {taken} inventory snapshots")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
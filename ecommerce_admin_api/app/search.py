@@ -0,0 +1,300 @@
+import gc
+import re
+import sys
+import math
+import heapq
+import logging
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import func
+
+from ecommerce_admin_api.app.cache import cache
+from ecommerce_admin_api.app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric words"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class ProductSearchIndex:
+    """
+    In-process inverted index over product name, description, sku and category
+    Terms match whole words or word prefixes; hits are ranked by field weight
+    times idf, and every query term has to match
+    Writes in this worker update it directly, writes elsewhere (other workers,
+    bulk upserts) are caught up on the next search after the products cache
+    namespace version moves
+    """
+
+    # a word in the sku or name says more about a product than one in its description
+    FIELD_WEIGHTS = {"sku": 4, "name": 3, "category": 2, "description": 1}
+    PREFIX_FACTOR = 0.5  # prefix matches rank below whole-word matches
+    MAX_PREFIX_EXPANSIONS = 50  # words a short prefix can expand to
+    MAX_COMBINATIONS = 256  # above this, score the intersected candidates directly
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            # word -> {weight: product ids} - ids grouped by how strongly the word matches them,
+            # so ranking works on whole sets (intersected in C) instead of product by product
+            self.postings = {}
+            self.documents = {}  # product id -> its words
+            self.id_sum = 0  # of the indexed product ids, with the count it tells deletes apart from creates
+            self.vocabulary = []  # sorted words, for prefix lookups
+            self.ready = False
+            self.version = None
+            self.synced_at = None
+
+    # -- writes
+
+    def _words(self, product):
+        weights = {}
+        for name, weight in self.FIELD_WEIGHTS.items():
+            value = product[name] if isinstance(product, dict) else getattr(product, name)
+            for word in set(tokenize(value)):
+                # one string object per word, shared by every product that has it
+                word = sys.intern(word)
+                weights[word] = weights.get(word, 0) + weight
+        return weights
+
+    def _remove(self, product_id):
+        words = self.documents.pop(product_id, None)
+        if words is None:
+            return
+        self.id_sum -= product_id
+        for word in words:
+            classes = self.postings[word]
+            for weight, ids in classes.items():
+                if product_id in ids:
+                    ids.discard(product_id)
+                    if not ids:
+                        del classes[weight]
+                    break
+            if not classes:
+                del self.postings[word]
+                del self.vocabulary[bisect_left(self.vocabulary, word)]
+
+    def _add(self, product_id, product):
+        self._remove(product_id)
+        weights = self._words(product)
+        for word, weight in weights.items():
+            classes = self.postings.get(word)
+            if classes is None:
+                classes = self.postings[word] = {}
+                self.vocabulary.insert(bisect_left(self.vocabulary, word), word)
+            classes.setdefault(weight, set()).add(product_id)
+        self.documents[product_id] = tuple(weights)
+        self.id_sum += product_id
+
+    def add(self, product):
+        """Index (or re-index) a product, a no-op until the index is built"""
+        with self._lock:
+            if self.ready:
+                product_id = product["id"] if isinstance(product, dict) else product.id
+                self._add(product_id, product)
+
+    def remove(self, product_id):
+        """Drop a product from the index"""
+        with self._lock:
+            if self.ready:
+                self._remove(product_id)
+
+    # -- keeping up with the database
+
+    def sync(self, db):
+        """Build on first use, then catch up when some worker changed products"""
+        try:
+            (version,) = cache.versions("products")
+        except Exception:
+            logger.exception("products version lookup failed, search may be stale")
+            version = self.version
+
+        if self.ready and version == self.version:
+            return
+
+        with self._sync_lock:
+            if not self.ready:
+                self._build(db)
+            elif version != self.version:
+                self._catch_up(db)
+            self.version = version
+
+    def warm_up(self, session_factory):
+        """Build the index now (e.g. on a startup thread) so the first search doesn't wait for it"""
+        db = session_factory()
+        try:
+            self.sync(db)
+        except Exception:
+            logger.exception("search index warm-up failed, it will be built on the first search")
+            return
+        finally:
+            db.close()
+
+        # millions of long-lived sets - a full collection walking them all stalls whatever search it
+        # lands on, so move them out of the collector's reach. Only here at startup, after clearing
+        # out the garbage, never on a request: anything alive at this point is frozen for good
+        gc.collect()
+        gc.freeze()
+
+    def _rows(self, db):
+        return db.query(
+            Product.id, Product.name, Product.description, Product.sku, Product.category, Product.updated_at
+        )
+
+    def _build(self, db):
+        postings = {}
+        documents = {}
+        synced_at = None
+
+        for row in self._rows(db).execution_options(yield_per=5000):
+            weights = self._words(row._asdict())
+            for word, weight in weights.items():
+                classes = postings.get(word)
+                if classes is None:
+                    classes = postings[word] = {}
+                ids = classes.get(weight)
+                if ids is None:
+                    ids = classes[weight] = set()
+                ids.add(row.id)
+            documents[row.id] = tuple(weights)
+            if row.updated_at and (synced_at is None or row.updated_at > synced_at):
+                synced_at = row.updated_at
+
+        with self._lock:
+            self.postings = postings
+            self.documents = documents
+            self.id_sum = sum(documents)
+            self.vocabulary = sorted(postings)
+            self.synced_at = synced_at
+            self.ready = True
+
+    def _catch_up(self, db):
+        query = self._rows(db)
+
+        # new and changed products - same second again, updated_at isn't finer than that
+        if self.synced_at is not None:
+            query = query.filter(Product.updated_at >= self.synced_at)
+        for row in query:
+            with self._lock:
+                self._add(row.id, row._asdict())
+            if row.updated_at and (self.synced_at is None or row.updated_at > self.synced_at):
+                self.synced_at = row.updated_at
+
+        # deleted products - only compare ids when the count or the id sum says something is off.
+        # Ids only ever grow, so a delete plus a create leaves the count alone but not the sum
+        count, id_sum = db.query(func.count(Product.id), func.coalesce(func.sum(Product.id), 0)).one()
+        if count != len(self.documents) or id_sum != self.id_sum:
+            ids = {product_id for (product_id,) in db.query(Product.id)}
+            with self._lock:
+                for product_id in [product_id for product_id in self.documents if product_id not in ids]:
+                    self._remove(product_id)
+                missing = ids.difference(self.documents)
+            if missing:
+                for row in self._rows(db).filter(Product.id.in_(missing)):
+                    with self._lock:
+                        self._add(row.id, row._asdict())
+
+    # -- reads
+
+    def _buckets(self, term):
+        """(score, product ids) groups matching a query term, best first"""
+        total = len(self.documents) or 1
+        words = [(term, 1.0)] if term in self.postings else []
+
+        start = bisect_left(self.vocabulary, term)
+        for word in self.vocabulary[start:start + self.MAX_PREFIX_EXPANSIONS + 1]:
+            if not word.startswith(term):
+                break
+            if word != term:
+                words.append((word, self.PREFIX_FACTOR))
+
+        buckets = []
+        for word, factor in words:
+            classes = self.postings[word]
+            idf = math.log(1 + total / sum(len(ids) for ids in classes.values()))
+            buckets.extend((weight * idf * factor, ids) for weight, ids in classes.items())
+        buckets.sort(key=lambda bucket: bucket[0], reverse=True)
+        return buckets
+
+    def _top_by_combination(self, per_term, limit):
+        """
+        Walk bucket combinations best total first - each is one set intersection,
+        and a product is scored by the first (best) combination it shows up in
+        """
+        hits = []
+        seen = set()
+        start = (0,) * len(per_term)
+        heap = [(-sum(buckets[0][0] for buckets in per_term), start)]
+        queued = {start}
+
+        while heap and len(hits) < limit:
+            negative_score, combination = heapq.heappop(heap)
+            sets = sorted((per_term[term][index][1] for term, index in enumerate(combination)), key=len)
+            matched = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+            if seen:
+                matched = matched - seen
+            if matched:
+                # ties go to the older product
+                wanted = limit - len(hits)
+                chosen = heapq.nsmallest(wanted, matched) if len(matched) > 4 * wanted else sorted(matched)[:wanted]
+                hits.extend((product_id, -negative_score) for product_id in chosen)
+                seen.update(chosen)
+
+            for term, index in enumerate(combination):
+                if index + 1 < len(per_term[term]):
+                    following = combination[:term] + (index + 1,) + combination[term + 1:]
+                    if following not in queued:
+                        queued.add(following)
+                        score = sum(per_term[t][i][0] for t, i in enumerate(following))
+                        heapq.heappush(heap, (-score, following))
+        return hits
+
+    def _top_by_candidates(self, per_term, limit):
+        """Intersect every term's matches first, then score only what is left"""
+        term_sets = [set().union(*(ids for _, ids in buckets)) for buckets in per_term]
+        term_sets.sort(key=len)
+        candidates = term_sets[0].intersection(*term_sets[1:])
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for buckets in per_term:
+            # best bucket first, so each product takes its best score for the term
+            remaining = set(candidates)
+            for score, ids in buckets:
+                matched = remaining & ids
+                for product_id in matched:
+                    scores[product_id] += score
+                remaining -= matched
+                if not remaining:
+                    break
+
+        # ties go to the older product
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def search(self, query, limit=20):
+        """Top (product id, score) pairs for a query, best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            per_term = [self._buckets(term) for term in terms]
+            if not all(per_term):
+                return []
+
+            if math.prod(len(buckets) for buckets in per_term) <= self.MAX_COMBINATIONS:
+                return self._top_by_combination(per_term, limit)
+            return self._top_by_candidates(per_term, limit)
+
+
+# one index per worker process
+product_index = ProductSearchIndex()
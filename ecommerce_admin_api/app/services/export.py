@@ -0,0 +1,123 @@
+import io
+import csv
+import json
+import zlib
+from datetime import date, datetime
+
+# export formats and their content types
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def check_format(export_format: str):
+    """Raise ValueError for formats that can't be exported here"""
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format, use one of: {', '.join(FORMATS)}")
+    
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow)")
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def csv_chunks(columns, batches):
+    """CSV with a header line, one chunk of bytes per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # header only, when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(columns, batches):
+    """One JSON object per line, one chunk of bytes per batch of rows"""
+    names = [name for name, _ in columns]
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default) + "\n"
+            for row in batch
+        ).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    # write-only file that hands back what was written since the last take()
+    
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def parquet_chunks(columns, batches):
+    """Parquet file, one row group (and chunk of bytes) per batch of rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    
+    for batch in batches:
+        values = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(values, schema)],
+            schema=schema
+        ))
+        yield sink.take()
+    
+    # footer
+    writer.close()
+    yield sink.take()
+
+
+def encode(export_format: str, columns, batches):
+    """
+    Bytes of an export, produced batch by batch so memory stays flat
+    columns are (name, arrow type) pairs, batches are lists of row tuples
+    """
+    encoders = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+    return encoders[export_format](columns, batches)
+
+
+def gzip_chunks(chunks, level: int = 6):
+    """Gzip a stream of bytes on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
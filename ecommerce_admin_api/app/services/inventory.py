@@ -1,87 +1,612 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
-from datetime import datetime
+from sqlalchemy import and_, case, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 
+from ecommerce_admin_api.app.config import settings
 from ecommerce_admin_api.app.models.inventory import Inventory
+from ecommerce_admin_api.app.models.inventory_movement import InventoryMovement
+from ecommerce_admin_api.app.models.inventory_snapshot import InventorySnapshot
+from ecommerce_admin_api.app.models.low_stock_event import LowStockEvent
 from ecommerce_admin_api.app.schemas import inventory as schemas
+from ecommerce_admin_api.app.services.pagination import decode_cursor, field
+
+
+class InsufficientStock(Exception):
+    """A sale asked for more units than the product has in stock"""
+    
+    def __init__(self, product_id: int, requested: int):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f"Insufficient stock for product {product_id}: {requested} requested")
+
+
+def inventory_cursor_key(inventory):
+    """Sort key inventory is paged by"""
+    return [field(inventory, "id")]
 
 
 def get_inventory_by_product(db: Session, product_id: int):
     """Get inventory for a specific product"""
-    return db.query(Inventory).filter(Inventory.product_id == product_id).first()
+    # oldest row first - the one sales, restocks and the ledger all work on
+    return db.query(Inventory).filter(Inventory.product_id == product_id).order_by(Inventory.id).first()
+
+
+# listing columns, in schemas.Inventory field order
+INVENTORY_COLUMNS = [
+    Inventory.product_id, Inventory.quantity, Inventory.reorder_level, Inventory.warehouse,
+    Inventory.id, Inventory.last_restock_date, Inventory.is_low_stock, Inventory.updated_at
+]
+
+
+def _inventory_page(
+    query,
+    skip: int = 0,
+    limit: int = 100,
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """One page of a query over Inventory, filtered and ordered like GET /inventory"""
+    if warehouse:
+        query = query.filter(Inventory.warehouse == warehouse)
+    
+    # stable order so pages don't overlap
+    query = query.order_by(Inventory.id)
+    
+    if cursor:
+        # keyset - seek past the last row instead of skipping rows
+        (last_id,) = decode_cursor(cursor)
+        return query.filter(Inventory.id > last_id).limit(limit)
+        
+    return query.offset(skip).limit(limit)
 
 
 def get_inventory(
     db: Session, 
     skip: int = 0, 
     limit: int = 100, 
-    warehouse: Optional[str] = None
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get inventory with optional warehouse filter
+    Pages by cursor (keyset on id) when one is given, otherwise by offset
+    """
+    return _inventory_page(db.query(Inventory), skip=skip, limit=limit, warehouse=warehouse, cursor=cursor).all()
+
+
+def get_inventory_rows(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100, 
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
-    """Get inventory with optional warehouse filter"""
-    query = db.query(Inventory)
+    """get_inventory as plain dicts - columns straight from the cursor, no ORM objects"""
+    page = _inventory_page(db.query(*INVENTORY_COLUMNS), skip=skip, limit=limit, warehouse=warehouse, cursor=cursor)
+    return [row._asdict() for row in page]
+
+
+def get_low_stock(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get items with stock below reorder level
+    Reads the maintained is_low_stock flag (indexed) instead of comparing every row
+    """
+    query = db.query(Inventory).filter(Inventory.is_low_stock.is_(True))
     
     if warehouse:
         query = query.filter(Inventory.warehouse == warehouse)
-        
+    
+    # stable order so pages don't overlap
+    query = query.order_by(Inventory.id)
+    
+    if cursor:
+        # keyset - seek past the last row instead of skipping rows
+        (last_id,) = decode_cursor(cursor)
+        return query.filter(Inventory.id > last_id).limit(limit).all()
+    
     return query.offset(skip).limit(limit).all()
 
 
-def get_low_stock(db: Session):
-    """Get items with stock below reorder level"""
-    return db.query(Inventory).filter(
-        Inventory.quantity < Inventory.reorder_level
-    ).all()
+def low_stock_event_cursor_key(event):
+    """Position in the low-stock change feed"""
+    return [field(event, "id")]
+
+
+def get_low_stock_changes(
+    db: Session,
+    limit: int = 100,
+    warehouse: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Items that went below or back above their reorder level after the cursor, oldest first
+    Events younger than LOW_STOCK_FEED_LAG_SECONDS are held back - ids are handed out
+    at insert but show up at commit, so a lower id can appear after a higher one and a
+    poller that had moved past it would never see it
+    """
+    query = db.query(LowStockEvent)
+    
+    if warehouse:
+        query = query.filter(LowStockEvent.warehouse == warehouse)
+    
+    if cursor:
+        (last_id,) = decode_cursor(cursor)
+        query = query.filter(LowStockEvent.id > last_id)
+    
+    # database clock, the one created_at is stamped with
+    settled = db.scalar(select(func.now())) - timedelta(seconds=settings.LOW_STOCK_FEED_LAG_SECONDS)
+    events = query.order_by(LowStockEvent.id).limit(limit).all()
+    
+    # stop at the first unsettled event, later ids wait for it
+    for index, event in enumerate(events):
+        if event.created_at > settled:
+            return events[:index]
+    return events
+
+
+# what _flip_low_stock needs to know about a row
+LOW_STOCK_COLUMNS = [
+    Inventory.id, Inventory.product_id, Inventory.warehouse, Inventory.quantity,
+    Inventory.reorder_level, Inventory.is_low_stock
+]
+
+
+def _sync_low_stock(db: Session, inventory_ids: List[int]):
+    """
+    Bring is_low_stock in line with quantity after a write, inside the caller's transaction
+    Items that crossed their reorder level are flipped and added to the change feed
+    """
+    if not inventory_ids:
+        return
+    
+    is_low = Inventory.quantity < Inventory.reorder_level
+    # plain columns, not entities - the session may hold rows loaded before the write
+    crossed = db.query(*LOW_STOCK_COLUMNS).filter(Inventory.id.in_(inventory_ids), Inventory.is_low_stock != is_low).all()
+    _flip_low_stock(db, crossed)
+
+
+def _flip_low_stock(db: Session, rows):
+    """
+    Flip is_low_stock on rows (LOW_STOCK_COLUMNS, as they are after the write)
+    that crossed their reorder level and add them to the change feed
+    Lets a write that already read its row back skip _sync_low_stock's SELECT
+    """
+    crossed = [
+        row for row in rows
+        if field(row, "is_low_stock") != (field(row, "quantity") < field(row, "reorder_level"))
+    ]
+    if not crossed:
+        return
+    
+    db.execute(
+        update(Inventory).where(Inventory.id.in_([field(row, "id") for row in crossed]))
+        .values(is_low_stock=Inventory.quantity < Inventory.reorder_level)
+        .execution_options(synchronize_session=False)
+    )
+    # created_at is left to the column default - the database clock the feed's lag is measured on
+    db.execute(insert(LowStockEvent), [
+        {
+            "inventory_id": field(row, "id"),
+            "product_id": field(row, "product_id"),
+            "warehouse": field(row, "warehouse"),
+            "is_low_stock": field(row, "quantity") < field(row, "reorder_level"),
+            "quantity": field(row, "quantity"),
+            "reorder_level": field(row, "reorder_level")
+        }
+        for row in crossed
+    ])
+
+
+def _record_movements(db: Session, changes: Dict[Tuple[int, int], int], reason: str):
+    """
+    Append stock changes, keyed (product id, inventory id), to the ledger
+    inside the caller's transaction
+    """
+    # python clock, same as the times history queries are asked for
+    now = datetime.now()
+    rows = [
+        {"product_id": product_id, "inventory_id": inventory_id, "change": change, "reason": reason, "created_at": now}
+        for (product_id, inventory_id), change in changes.items() if change
+    ]
+    if rows:
+        db.execute(insert(InventoryMovement), rows)
+
+
+def take_stock(db: Session, quantities: Dict[int, int]):
+    """
+    Take stock for sales, inside the caller's transaction (nothing is committed)
+    Each product is one conditional UPDATE (quantity = quantity - n where
+    quantity >= n), so concurrent sales can't both take the last units
+    Products without an inventory row aren't stock tracked and are skipped
+    Returns the product ids that are short of stock, none are taken for those
+    """
+    if not quantities:
+        return []
+    
+    # the row get_inventory_by_product returns for each product
+    rows = dict(
+        db.query(Inventory.product_id, Inventory.id)
+        .filter(Inventory.product_id.in_(quantities))
+        .order_by(Inventory.id.desc())
+        .all()
+    )
+    
+    short = []
+    # same lock order in every transaction, avoids deadlocks between bulk loads
+    for product_id in sorted(rows):
+        quantity = quantities[product_id]
+        statement = update(Inventory).where(Inventory.id == rows[product_id])
+        
+        if settings.INVENTORY_OVERSELL == "reject":
+            statement = statement.where(Inventory.quantity >= quantity)
+        
+        result = db.execute(
+            statement.values(quantity=Inventory.quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            short.append(product_id)
+    
+    taken = [product_id for product_id in rows if product_id not in short]
+    _record_movements(db, {(product_id, rows[product_id]): -quantities[product_id] for product_id in taken}, "sale")
+    _sync_low_stock(db, [rows[product_id] for product_id in taken])
+    
+    return short
+
+
+def _locked_inventory(db: Session, product_id: int):
+    """
+    The row get_inventory_by_product returns, as listed (INVENTORY_COLUMNS) and locked
+    until commit, with the database clock as "now" - None if the product has no inventory
+    """
+    row = (
+        db.query(*INVENTORY_COLUMNS, func.now().label("now")).filter(Inventory.product_id == product_id)
+        .order_by(Inventory.id).with_for_update().first()
+    )
+    return row._asdict() if row else None
+
+
+def _write_inventory(db: Session, current: dict, changes: dict, added: int = 0):
+    """
+    Write changes (and added units) to a row read by _locked_inventory and return it as
+    listed, low-stock flag and change feed included - the row is locked, so what it looks
+    like after the UPDATE is worked out here instead of read back
+    """
+    db_inventory = dict(current)
+    now = db_inventory.pop("now")
+    db_inventory.update(changes)
+    values = dict(changes)
+    if added:
+        # added by the database - sqlite takes no row locks
+        values["quantity"] = Inventory.quantity + added
+        db_inventory["quantity"] += added
+    if not values:
+        return db_inventory
+    
+    values["updated_at"] = db_inventory["updated_at"] = now
+    db.execute(
+        update(Inventory).where(Inventory.id == current["id"]).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    _flip_low_stock(db, [db_inventory])
+    
+    # the flag as _flip_low_stock left it
+    db_inventory["is_low_stock"] = db_inventory["quantity"] < db_inventory["reorder_level"]
+    return db_inventory
 
 
 def update_inventory(db: Session, product_id: int, inventory: schemas.InventoryUpdate):
-    """Update inventory details"""
-    # get inventory
-    db_inventory = get_inventory_by_product(db, product_id)
+    """
+    Update inventory details, None if the product has no inventory
+    A new quantity goes in the ledger as an adjustment
+    One locked read (the adjustment is worked out from the current quantity) and one UPDATE
+    """
+    current = _locked_inventory(db, product_id)
+    if current is None:
+        db.rollback()
+        return None
     
     # update fields that are set
     update_data = inventory.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_inventory, key, value)
+    if update_data.get("quantity") is not None:
+        _record_movements(db, {(product_id, current["id"]): update_data["quantity"] - current["quantity"]}, "adjustment")
     
-    # save changes
+    db_inventory = _write_inventory(db, current, update_data)
     db.commit()
-    db.refresh(db_inventory)
     
     return db_inventory
 
 
-def restock_inventory(db: Session, product_id: int, restock: schemas.InventoryUpdate):
-    """Record inventory restock"""
-    # get inventory
-    db_inventory = get_inventory_by_product(db, product_id)
+def adjust_inventory_bulk(
+    db: Session,
+    adjustments: List[Tuple[int, schemas.InventoryAdjustment]],
+    warehouse: Optional[str] = None
+):
+    """
+    Apply a chunk of stock adjustments in one transaction (absolute counts or deltas)
+    Takes (row number, adjustment) pairs; rows are locked and read once, then
+    written with a single UPDATE, one ledger insert and one low-stock check
+    Returns (applied, errors) - applied rows carry the quantity after them
+    """
+    applied = []
+    errors = []
+    valid = []
+    for row, adjustment in adjustments:
+        if (adjustment.quantity is None) == (adjustment.delta is None):
+            errors.append({"row": row, "product_id": adjustment.product_id, "error": "Give either quantity or delta"})
+        elif adjustment.quantity is not None and adjustment.quantity < 0:
+            errors.append({"row": row, "product_id": adjustment.product_id, "error": "Quantity can't be negative"})
+        else:
+            valid.append((row, adjustment))
     
-    # increment quantity if provided
-    if restock.quantity:
-        db_inventory.quantity += restock.quantity
+    if not valid:
+        return applied, errors
+    
+    try:
+        # the row get_inventory_by_product returns for each product, locked until commit
+        query = db.query(Inventory.product_id, Inventory.id, Inventory.quantity).filter(
+            Inventory.product_id.in_({adjustment.product_id for _, adjustment in valid})
+        )
+        if warehouse:
+            query = query.filter(Inventory.warehouse == warehouse)
+        rows = {
+            product_id: (inventory_id, quantity)
+            for product_id, inventory_id, quantity in query.order_by(Inventory.id.desc()).with_for_update()
+        }
+        
+        # work out every quantity in order, a product may be adjusted more than once
+        quantities = {product_id: quantity for product_id, (_, quantity) in rows.items()}
+        for row, adjustment in valid:
+            product_id = adjustment.product_id
+            if product_id not in quantities:
+                errors.append({"row": row, "product_id": product_id, "error": "Inventory for this product not found"})
+                continue
+            
+            quantity = adjustment.quantity if adjustment.quantity is not None else quantities[product_id] + adjustment.delta
+            if quantity < 0 and settings.INVENTORY_OVERSELL == "reject":
+                errors.append({"row": row, "product_id": product_id, "error": "Adjustment would take stock below zero"})
+                continue
+            
+            quantities[product_id] = quantity
+            applied.append({"row": row, "product_id": product_id, "quantity": quantity})
+        
+        changed = {
+            product_id: quantity for product_id, quantity in quantities.items()
+            if quantity != rows[product_id][1]
+        }
+        if changed:
+            # one UPDATE for the chunk - quantity = CASE id WHEN ... THEN ... END
+            inventory_ids = {rows[product_id][0]: quantity for product_id, quantity in changed.items()}
+            db.execute(
+                update(Inventory).where(Inventory.id.in_(inventory_ids))
+                .values(quantity=case(inventory_ids, value=Inventory.id), updated_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            _record_movements(
+                db,
+                {(product_id, rows[product_id][0]): quantity - rows[product_id][1] for product_id, quantity in changed.items()},
+                "adjustment"
+            )
+            _sync_low_stock(db, list(inventory_ids))
+        
+        db.commit()
+    except SQLAlchemyError as e:
+        # the chunk is all or nothing, report every row in it
+        db.rollback()
+        error = str(getattr(e, "orig", None) or e)
+        failed = {row for row, _ in valid}
+        errors = [item for item in errors if item["row"] not in failed]
+        errors += [{"row": row, "product_id": adjustment.product_id, "error": error} for row, adjustment in valid]
+        return [], errors
+    
+    return applied, errors
+
+
+def restock_inventory(db: Session, product_id: int, restock: schemas.InventoryUpdate):
+    """
+    Record inventory restock, None if the product has no inventory
+    Stock is added by the database (quantity = quantity + n) so a restock
+    racing with sales or other restocks never loses units
+    One locked read and one UPDATE, like update_inventory
+    """
+    current = _locked_inventory(db, product_id)
+    if current is None:
+        db.rollback()
+        return None
     
     # update last restock date
-    db_inventory.last_restock_date = datetime.now()
+    changes = {"last_restock_date": datetime.now()}
     
     # update other fields if provided
     if restock.reorder_level:
-        db_inventory.reorder_level = restock.reorder_level
+        changes["reorder_level"] = restock.reorder_level
     
     if restock.warehouse:
-        db_inventory.warehouse = restock.warehouse
+        changes["warehouse"] = restock.warehouse
     
-    # save changes
+    # save changes, quantity incremented if provided
+    db_inventory = _write_inventory(db, current, changes, added=restock.quantity or 0)
+    if restock.quantity:
+        _record_movements(db, {(product_id, current["id"]): restock.quantity}, "restock")
     db.commit()
-    db.refresh(db_inventory)
     
     return db_inventory
 
 
-def get_inventory_history(db: Session, product_id: int):
+def _change_sum(inventory_id: int, after: int, upto: Optional[int] = None):
+    """Net ledger change of an inventory row for movements after one id, up to and including another"""
+    query = select(func.coalesce(func.sum(InventoryMovement.change), 0)).where(
+        InventoryMovement.inventory_id == inventory_id,
+        InventoryMovement.id > after
+    )
+    if upto is not None:
+        query = query.where(InventoryMovement.id <= upto)
+    return query.scalar_subquery()
+
+
+def _level_after(db: Session, inventory_id: int, movement_id: int):
     """
-    Get inventory change history
-    Note: This would require a separate table to track history
-    For now, returning placeholder
+    Stock level of an inventory row right after a ledger movement (0 = before the first one)
+    Starts from the nearest snapshot and only replays the movements in between
     """
-    # TODO: Implement inventory history tracking
-    return {"message": "Inventory history tracking to be implemented"}
\ No newline at end of file
+    # latest snapshot at or before the movement - add what came after it
+    snapshot = db.query(InventorySnapshot).filter(
+        InventorySnapshot.inventory_id == inventory_id,
+        InventorySnapshot.movement_id <= movement_id
+    ).order_by(InventorySnapshot.movement_id.desc()).first()
+    if snapshot:
+        return snapshot.quantity + db.scalar(select(_change_sum(inventory_id, snapshot.movement_id, movement_id)))
+    
+    # before the first snapshot - take back what came before it
+    snapshot = db.query(InventorySnapshot).filter(
+        InventorySnapshot.inventory_id == inventory_id,
+        InventorySnapshot.movement_id > movement_id
+    ).order_by(InventorySnapshot.movement_id).first()
+    if snapshot:
+        return snapshot.quantity - db.scalar(select(_change_sum(inventory_id, movement_id, snapshot.movement_id)))
+    
+    # never snapshotted - take back from the live level, read in the same statement
+    row = db.query(Inventory.quantity, _change_sum(inventory_id, movement_id)).filter(
+        Inventory.id == inventory_id
+    ).first()
+    if row is None:
+        return None
+    return row[0] - row[1]
+
+
+def get_stock_level(db: Session, product_id: int, at: datetime, warehouse: Optional[str] = None):
+    """
+    Stock level of a product at a point in time, summed over its inventory rows
+    (or the one in a warehouse), None if it has no inventory
+    """
+    query = db.query(Inventory.id).filter(Inventory.product_id == product_id)
+    if warehouse:
+        query = query.filter(Inventory.warehouse == warehouse)
+    inventory_ids = [inventory_id for (inventory_id,) in query.order_by(Inventory.id)]
+    if not inventory_ids:
+        return None
+    
+    quantity = 0
+    for inventory_id in inventory_ids:
+        last_movement = db.query(func.coalesce(func.max(InventoryMovement.id), 0)).filter(
+            InventoryMovement.inventory_id == inventory_id,
+            InventoryMovement.created_at <= at
+        ).scalar()
+        quantity += _level_after(db, inventory_id, last_movement) or 0
+    return {"product_id": product_id, "at": at, "quantity": quantity}
+
+
+def history_cursor_key(movement):
+    """Sort key inventory history is paged by"""
+    return [field(movement, "id")]
+
+
+def get_inventory_history(
+    db: Session,
+    product_id: int,
+    limit: int = 100,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get inventory change history from the movement ledger, newest first
+    Each entry carries the stock level after it; pages by cursor (keyset on id)
+    """
+    query = db.query(InventoryMovement).filter(InventoryMovement.product_id == product_id)
+    
+    # apply date range filter
+    if start_date:
+        query = query.filter(InventoryMovement.created_at >= start_date)
+    
+    if end_date:
+        # include the entire end date
+        query = query.filter(InventoryMovement.created_at < end_date + timedelta(days=1))
+    
+    if cursor:
+        # keyset - continue below the last movement of the previous page
+        (last_id,) = decode_cursor(cursor)
+        query = query.filter(InventoryMovement.id < last_id)
+    
+    movements = query.order_by(InventoryMovement.id.desc()).limit(limit).all()
+    if not movements:
+        return []
+    
+    # each row's level after its newest movement on the page, then walk back through the page
+    levels = {}
+    for movement in movements:
+        if movement.inventory_id is not None and movement.inventory_id not in levels:
+            levels[movement.inventory_id] = _level_after(db, movement.inventory_id, movement.id)
+    
+    history = []
+    for movement in movements:
+        level = levels.get(movement.inventory_id)
+        history.append({
+            "id": movement.id,
+            "product_id": movement.product_id,
+            "inventory_id": movement.inventory_id,
+            "change": movement.change,
+            "reason": movement.reason,
+            "created_at": movement.created_at,
+            "quantity_after": level
+        })
+        if level is not None:
+            levels[movement.inventory_id] = level - movement.change
+    
+    return history
+
+
+def take_snapshots(db: Session, every: Optional[int] = None):
+    """
+    Snapshot every inventory row with at least `every` ledger movements since its last snapshot
+    Run periodically (scripts/snapshot_inventory.py) so history reads replay a bounded tail
+    Returns the number of snapshots taken
+    """
+    every = every or settings.INVENTORY_SNAPSHOT_EVERY
+    
+    last_snapshot = db.query(
+        InventorySnapshot.inventory_id,
+        func.max(InventorySnapshot.movement_id).label("movement_id")
+    ).group_by(InventorySnapshot.inventory_id).subquery()
+    
+    due = db.query(InventoryMovement.inventory_id).outerjoin(
+        last_snapshot, last_snapshot.c.inventory_id == InventoryMovement.inventory_id
+    ).filter(
+        InventoryMovement.inventory_id.isnot(None),
+        InventoryMovement.id > func.coalesce(last_snapshot.c.movement_id, 0)
+    ).group_by(InventoryMovement.inventory_id).having(func.count() >= every)
+    
+    taken = 0
+    for (inventory_id,) in due.all():
+        # level and last movement from one locked read, so no sale slips in between
+        last_movement = select(func.coalesce(func.max(InventoryMovement.id), 0)).where(
+            InventoryMovement.inventory_id == inventory_id
+        ).scalar_subquery()
+        row = db.query(Inventory.product_id, Inventory.quantity, last_movement).filter(
+            Inventory.id == inventory_id
+        ).with_for_update().first()
+        
+        # inventory row is gone or lost its product, its history stays as it is
+        if row is None or row[0] is None:
+            db.rollback()
+            continue
+        
+        db.add(InventorySnapshot(
+            product_id=row[0],
+            inventory_id=inventory_id,
+            movement_id=row[2],
+            quantity=row[1],
+            taken_at=datetime.now()
+        ))
+        db.commit()
+        taken += 1
+    
+    return taken
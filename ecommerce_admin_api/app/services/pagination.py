@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+
+# response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values):
+    """Opaque cursor holding the sort key of the last row on a page"""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 1):
+    """Sort key values back from a cursor, ValueError if it is not one of ours"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def field(row, name):
+    """Read a column from an ORM object or a row dict"""
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def next_cursor(items, limit: int, key):
+    """Cursor for the page after items, None when this is the last page"""
+    if limit <= 0 or len(items) < limit:
+        return None
+    return encode_cursor(key(items[-1]))
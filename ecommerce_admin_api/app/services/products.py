@@ -1,8 +1,37 @@
+import json
+import hashlib
+
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from ecommerce_admin_api.app.cache import cache, cached
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import update_returning, upsert
+from ecommerce_admin_api.app.models.inventory import Inventory
 from ecommerce_admin_api.app.models.product import Product
+from ecommerce_admin_api.app.models.sale import Sale
+from ecommerce_admin_api.app.models.sale_rollup import SaleDailyRollup
+from ecommerce_admin_api.app.models.sales_leaderboard import SalesLeaderboard
 from ecommerce_admin_api.app.schemas import products as schemas
+from ecommerce_admin_api.app.search import product_index
+from ecommerce_admin_api.app.services.pagination import decode_cursor, field
+
+
+# fields a catalog sync can change - sku is the key, not content
+HASHED_FIELDS = ("name", "description", "price", "category")
+
+
+def content_hash(product):
+    """Hash of a product's editable fields (dict or object)"""
+    values = [field(product, name) for name in HASHED_FIELDS]
+    values[2] = float(values[2]) if values[2] is not None else None
+    return hashlib.sha1(json.dumps(values).encode()).hexdigest()
+
+
+def product_cursor_key(product):
+    """Sort key products are paged by"""
+    return [field(product, "id")]
 
 
 def get_product(db: Session, product_id: int):
@@ -15,19 +44,102 @@ def get_product_by_sku(db: Session, sku: str):
     return db.query(Product).filter(Product.sku == sku).first()
 
 
+# listing columns, in schemas.Product field order
+PRODUCT_COLUMNS = [
+    Product.name, Product.description, Product.price, Product.category, Product.sku,
+    Product.id, Product.created_at, Product.updated_at
+]
+
+
+def _products_page(
+    query,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """One page of a query over Product, filtered and ordered like GET /products"""
+    if category:
+        query = query.filter(Product.category == category)
+    
+    # stable order so pages don't overlap
+    query = query.order_by(Product.id)
+    
+    if cursor:
+        # keyset - seek past the last row instead of skipping rows
+        (last_id,) = decode_cursor(cursor)
+        return query.filter(Product.id > last_id).limit(limit)
+        
+    return query.offset(skip).limit(limit)
+
+
 def get_products(
     db: Session, 
     skip: int = 0, 
     limit: int = 100, 
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
-    """Get products with optional category filter"""
-    query = db.query(Product)
-    
-    if category:
-        query = query.filter(Product.category == category)
+    """
+    Get products with optional category filter
+    Pages by cursor (keyset on id) when one is given, otherwise by offset
+    """
+    return _products_page(db.query(Product), skip=skip, limit=limit, category=category, cursor=cursor).all()
+
+
+def get_products_rows(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100, 
+    category: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """get_products as plain dicts - columns straight from the cursor, no ORM objects"""
+    page = _products_page(db.query(*PRODUCT_COLUMNS), skip=skip, limit=limit, category=category, cursor=cursor)
+    return [row._asdict() for row in page]
+
+
+@cached("products", ttl=settings.PRODUCT_CACHE_TTL)
+def get_product_data(db: Session, product_id: int):
+    """Cached product as a plain dict, None if it doesn't exist"""
+    product = get_product(db, product_id)
+    return schemas.Product.from_orm(product).dict() if product else None
+
+
+@cached("products", ttl=settings.PRODUCT_CACHE_TTL)
+def get_products_data(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100, 
+    category: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """Cached product listing as plain dicts"""
+    return get_products_rows(db, skip=skip, limit=limit, category=category, cursor=cursor)
+
+
+def search_products(db: Session, q: str, limit: int = 20):
+    """
+    Ranked product search over name, description, sku and category
+    Words match whole or as prefixes, every word in q has to match
+    """
+    product_index.sync(db)
+    rows = {}
+    while True:
+        hits = product_index.search(q, limit)
+        wanted = [product_id for product_id, _ in hits if product_id not in rows]
+        if wanted:
+            rows.update((row.id, row._asdict()) for row in db.query(*PRODUCT_COLUMNS).filter(Product.id.in_(wanted)))
         
-    return query.offset(skip).limit(limit).all()
+        # deleted since the index last caught up - drop them so the next hits fill their slots
+        stale = [product_id for product_id, _ in hits if product_id not in rows]
+        if not stale:
+            break
+        for product_id in stale:
+            product_index.remove(product_id)
+    
+    # best first
+    return [dict(rows[product_id], score=round(score, 4)) for product_id, score in hits]
 
 
 def create_product(db: Session, product: schemas.ProductCreate):
@@ -38,7 +150,8 @@ def create_product(db: Session, product: schemas.ProductCreate):
         description=product.description,
         price=product.price,
         category=product.category,
-        sku=product.sku
+        sku=product.sku,
+        content_hash=content_hash(product)
     )
     
     # add to db
@@ -46,28 +159,149 @@ def create_product(db: Session, product: schemas.ProductCreate):
     db.commit()
     db.refresh(db_product)
     
+    # listings in every worker are now stale
+    cache.invalidate("products")
+    product_index.add(db_product)
+    
     return db_product
 
 
 def update_product(db: Session, product_id: int, product: schemas.ProductUpdate):
-    """Update a product's details"""
-    # get the product
-    db_product = get_product(db, product_id)
-    
-    # update fields that are set
+    """
+    Update a product's details, None if it doesn't exist
+    One UPDATE ... RETURNING where the database has it (sqlite) - MySQL has no
+    UPDATE ... RETURNING, so update_returning reads the row back in a second statement
+    A partial edit of the hashed fields needs the stored ones for the content hash,
+    which is written by one more statement
+    """
     update_data = product.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_product, key, value)
+    if not update_data:
+        # nothing to change, just the product as it is
+        row = db.query(*PRODUCT_COLUMNS).filter(Product.id == product_id).first()
+        return row._asdict() if row else None
     
-    # save changes
+    if set(HASHED_FIELDS) <= set(update_data):
+        # every hashed field is given - hash up front
+        update_data["content_hash"] = content_hash(update_data)
+    
+    where = Product.id == product_id
+    rows = update_returning(db, Product.__table__, where, update_data, PRODUCT_COLUMNS + [Product.content_hash])
+    if not rows:
+        db.rollback()
+        return None
+    
+    db_product = dict(rows[0])
+    stored_hash = db_product.pop("content_hash")
+    new_hash = content_hash(db_product)
+    if new_hash != stored_hash:
+        # keep updated_at from the first statement
+        db.execute(
+            update(Product).where(where).values(content_hash=new_hash, updated_at=Product.updated_at)
+            .execution_options(synchronize_session=False)
+        )
     db.commit()
-    db.refresh(db_product)
+    
+    cache.invalidate("products")
+    product_index.add(db_product)
+    if "category" in update_data:
+        # sales by category moved too
+        cache.invalidate("sales")
     
     return db_product
 
 
+def upsert_products(db: Session, products: List[schemas.ProductCreate], chunk_size: int = 1000):
+    """
+    Create or update products matched on SKU, one upsert statement per chunk
+    Rows whose content hash matches the stored one aren't written at all
+    A SKU repeated in the input counts once, the last row wins
+    """
+    latest = {product.sku: product for product in products}
+    items = list(latest.values())
+    result = {"received": len(products), "created": 0, "updated": 0, "unchanged": 0}
+    category_changed = False
+    
+    table = Product.__table__
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        
+        # what the chunk's SKUs look like now
+        existing = {
+            row.sku: row
+            for row in db.query(Product.sku, Product.content_hash, Product.category)
+            .filter(Product.sku.in_([product.sku for product in chunk]))
+        }
+        
+        rows = []
+        for product in chunk:
+            row = product.dict()
+            row["content_hash"] = content_hash(row)
+            
+            current = existing.get(product.sku)
+            if current is None:
+                result["created"] += 1
+            elif current.content_hash == row["content_hash"]:
+                result["unchanged"] += 1
+                continue
+            else:
+                result["updated"] += 1
+                category_changed = category_changed or current.category != product.category
+            rows.append(row)
+        
+        if rows:
+            # INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT on sqlite)
+            upsert(
+                db,
+                table,
+                rows,
+                index_elements=["sku"],
+                set_=lambda new: {
+                    "name": new.name,
+                    "description": new.description,
+                    "price": new.price,
+                    "category": new.category,
+                    "content_hash": new.content_hash,
+                    "updated_at": func.now()
+                }
+            )
+            db.commit()
+    
+    if result["created"] or result["updated"]:
+        cache.invalidate("products")
+    if category_changed:
+        # sales by category moved too
+        cache.invalidate("sales")
+    
+    return result
+
+
 def delete_product(db: Session, product_id: int):
-    """Remove a product"""
-    db_product = get_product(db, product_id)
-    db.delete(db_product)
-    db.commit()
\ No newline at end of file
+    """
+    Remove a product, False if it doesn't exist
+    A missing product costs one locking read; an existing one that read, four
+    statements moving its sales, inventory and analytics rows off it, and the DELETE
+    """
+    # the lock also holds off sales for it until the delete commits - a sale
+    # inserted after its sales were unlinked would block the delete on the foreign key
+    if db.execute(select(Product.id).where(Product.id == product_id).with_for_update()).first() is None:
+        db.rollback()
+        return False
+    
+    # its sales and inventory lose their product link, like the ORM delete did
+    # and the rollup follows its sales - they add up under no product from now on
+    for model in (Sale, Inventory, SaleDailyRollup):
+        db.execute(
+            update(model).where(model.product_id == product_id).values(product_id=None)
+            .execution_options(synchronize_session=False)
+        )
+    # the leaderboard only ranks products
+    db.execute(delete(SalesLeaderboard).where(SalesLeaderboard.product_id == product_id))
+    
+    db.execute(Product.__table__.delete().where(Product.id == product_id))
+    db.commit()
+    
+    # its sales lose their product link, so analytics change as well
+    cache.invalidate("products")
+    cache.invalidate("sales")
+    product_index.remove(product_id)
+    return True
@@ -1,15 +1,91 @@
+from bisect import bisect_left, bisect_right
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_
-from typing import List, Optional
-from datetime import date, timedelta
+from sqlalchemy import func, extract, and_, or_, insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from typing import List, NamedTuple, Optional, Tuple
+from datetime import date, datetime, timedelta
 
+from ecommerce_admin_api.app.analytics_engine import columns_for, sales_columns
+from ecommerce_admin_api.app.cache import cache, cached, month_buckets
+from ecommerce_admin_api.app.config import settings
 from ecommerce_admin_api.app.models.sale import Sale
+from ecommerce_admin_api.app.models.sale_rollup import SaleDailyRollup
 from ecommerce_admin_api.app.models.product import Product
 from ecommerce_admin_api.app.schemas import sales as schemas
+from ecommerce_admin_api.app.services import inventory, sales_leaderboard, sales_rollup
+from ecommerce_admin_api.app.services.pagination import decode_cursor, field
+
+
+class _AnalyticsSource(NamedTuple):
+    # table and columns the analytics queries aggregate over
+    table: object
+    product_id: object
+    channel: object
+    total_amount: object
+    quantity: object
+    day: object
+    date_filter: object
+    in_range: object  # (start, end) -> condition for another whole-day range
+
+
+def _rollup_in_range(start_date: date, end_date: date):
+    return and_(
+        SaleDailyRollup.day >= start_date,
+        SaleDailyRollup.day <= end_date
+    )
+
+
+def _sales_in_range(start_date: date, end_date: date):
+    # include the entire end date
+    next_day = end_date + timedelta(days=1)
+    return and_(
+        Sale.sale_date >= start_date,
+        Sale.sale_date < next_day
+    )
+
+
+def _analytics_source(start_date: date, end_date: date):
+    """Pick the daily rollup or the raw sales table for a whole-day range"""
+    if settings.USE_SALES_ROLLUP:
+        return _AnalyticsSource(
+            table=SaleDailyRollup,
+            product_id=SaleDailyRollup.product_id,
+            channel=SaleDailyRollup.channel,
+            total_amount=SaleDailyRollup.total_amount,
+            quantity=SaleDailyRollup.total_quantity,
+            day=SaleDailyRollup.day,
+            date_filter=_rollup_in_range(start_date, end_date),
+            in_range=_rollup_in_range
+        )
+
+    return _AnalyticsSource(
+        table=Sale,
+        product_id=Sale.product_id,
+        channel=Sale.channel,
+        total_amount=Sale.total_amount,
+        quantity=Sale.quantity,
+        day=func.date(Sale.sale_date),
+        date_filter=_sales_in_range(start_date, end_date),
+        in_range=_sales_in_range
+    )
+
+
+def _date_range_months(args):
+    """Cache buckets for results over start_date..end_date"""
+    return month_buckets([(args["start_date"], args["end_date"])])
 
 
 def create_sale(db: Session, sale: schemas.SaleCreate):
-    """Record a new sale"""
+    """
+    Record a new sale
+    Stock is taken in the same transaction, raises InsufficientStock when
+    the product is short and overselling is rejected
+    """
+    # take stock first, nothing has been written if this fails
+    if inventory.take_stock(db, {sale.product_id: sale.quantity}):
+        db.rollback()
+        raise inventory.InsufficientStock(sale.product_id, sale.quantity)
+    
     # calculate total
     total_amount = sale.quantity * sale.unit_price
     
@@ -22,28 +98,111 @@ def create_sale(db: Session, sale: schemas.SaleCreate):
         channel=sale.channel
     )
     
+    # keep the original date when importing past orders
+    if sale.sale_date:
+        db_sale.sale_date = sale.sale_date
+    
     # add to db
     db.add(db_sale)
+    db.flush()
+    db.refresh(db_sale)  # sale_date is set by the database
+    
+    # keep the daily rollup and the leaderboard in step, same transaction
+    sales_rollup.record_sales(db, [db_sale])
+    sales_leaderboard.record_sales(db, [db_sale])
+    
     db.commit()
     db.refresh(db_sale)
     
+    # cached analytics covering this month are now stale, in every worker
+    day = db_sale.sale_date.date()
+    cache.invalidate("sales", month_buckets([(day, day)]))
+    sales_columns.touch()
+    
     return db_sale
 
 
-def get_sales(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+def create_sales_bulk(db: Session, sales: List[Tuple[int, schemas.SaleCreate]]):
+    """
+    Record a chunk of already validated sales in one transaction
+    Takes (row number, sale) pairs, returns errors for rows that were not saved
+    Rows for a product that is short of stock are all rejected, the rest are saved
+    A chunk the database refuses (a constraint, a deadlock) is tried again row by row,
+    so only the rows that fail on their own are reported
+    """
+    if not sales:
+        return []
+    
+    # units per product for the whole chunk
+    quantities = {}
+    for _, sale in sales:
+        quantities[sale.product_id] = quantities.get(sale.product_id, 0) + sale.quantity
+    
+    try:
+        short = set(inventory.take_stock(db, quantities))
+    except SQLAlchemyError as e:
+        db.rollback()
+        return _retry_rows(db, sales, e)
+    
+    errors = [
+        {"row": row, "error": f"Insufficient stock for product {sale.product_id}"}
+        for row, sale in sales if sale.product_id in short
+    ]
+    sales = [(row, sale) for row, sale in sales if sale.product_id not in short]
+    if not sales:
+        db.rollback()
+        return errors
+    
+    # sale date is set here so the rollup knows the day without reading rows back
+    # database clock, like the column default create_sale relies on
+    now = db.scalar(select(func.now())) if any(sale.sale_date is None for _, sale in sales) else None
+    rows = [
+        {
+            "product_id": sale.product_id,
+            "quantity": sale.quantity,
+            "unit_price": sale.unit_price,
+            "total_amount": sale.quantity * sale.unit_price,
+            "sale_date": sale.sale_date or now,
+            "channel": sale.channel
+        }
+        for _, sale in sales
+    ]
+    
+    try:
+        # executemany - one insert statement for the whole chunk
+        db.execute(insert(Sale), rows)
+        sales_rollup.record_sales(db, rows)
+        sales_leaderboard.record_sales(db, rows)
+        db.commit()
+    except SQLAlchemyError as e:
+        # the chunk is all or nothing (stock included)
+        db.rollback()
+        return errors + _retry_rows(db, sales, e)
+    
+    # cached analytics covering these months are now stale, in every worker
+    days = {row["sale_date"].date() for row in rows}
+    cache.invalidate("sales", month_buckets([(day, day) for day in days]))
+    sales_columns.touch()
+    
+    return errors
+
+
+def _retry_rows(db: Session, sales: List[Tuple[int, schemas.SaleCreate]], error: SQLAlchemyError):
+    """Errors for a chunk that failed - a single row reports the error, more are saved one by one"""
+    if len(sales) == 1:
+        return [{"row": sales[0][0], "error": str(getattr(error, "orig", None) or error)}]
+    return [item for row, sale in sales for item in create_sales_bulk(db, [(row, sale)])]
+
+
+def _filter_sales(
+    query,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     product_id: Optional[int] = None,
     category: Optional[str] = None,
     channel: Optional[str] = None
 ):
-    """Get sales with various filters"""
-    # start with base query
-    query = db.query(Sale)
-    
+    """The GET /sales filters, applied to a query over Sale"""
     # apply date range filter
     if start_date:
         query = query.filter(Sale.sale_date >= start_date)
@@ -63,12 +222,157 @@ def get_sales(
     
     # filter by category (requires join)
     if category:
-        query = query.join(Product).filter(Product.category == category)
+        query = query.join(Product, Product.id == Sale.product_id).filter(Product.category == category)
     
-    # get results
-    return query.offset(skip).limit(limit).all()
+    return query
+
+
+def sale_cursor_key(sale):
+    """Sort key sales are paged by"""
+    return [field(sale, "sale_date").isoformat(), field(sale, "id")]
 
 
+# GET /sales columns, in schemas.Sale field order
+SALE_COLUMNS = [Sale.product_id, Sale.quantity, Sale.unit_price, Sale.channel, Sale.id, Sale.total_amount, Sale.sale_date]
+
+
+def _sales_page(
+    query,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[int] = None,
+    category: Optional[str] = None,
+    channel: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """One page of a query over Sale, filtered and ordered like GET /sales"""
+    query = _filter_sales(
+        query,
+        start_date=start_date,
+        end_date=end_date,
+        product_id=product_id,
+        category=category,
+        channel=channel
+    )
+    
+    # stable order so pages don't overlap
+    query = query.order_by(Sale.sale_date, Sale.id)
+    
+    if cursor:
+        # keyset - seek past the last row instead of skipping rows
+        last_date, last_id = decode_cursor(cursor, size=2)
+        query = query.filter(
+            tuple_(Sale.sale_date, Sale.id) > tuple_(datetime.fromisoformat(str(last_date)), last_id)
+        )
+        return query.limit(limit)
+    
+    return query.offset(skip).limit(limit)
+
+
+def get_sales(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[int] = None,
+    category: Optional[str] = None,
+    channel: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get sales with various filters
+    Pages by cursor (keyset on sale_date, id) when one is given, otherwise by offset
+    """
+    return _sales_page(
+        db.query(Sale),
+        skip=skip,
+        limit=limit,
+        start_date=start_date,
+        end_date=end_date,
+        product_id=product_id,
+        category=category,
+        channel=channel,
+        cursor=cursor
+    ).all()
+
+
+def get_sales_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[int] = None,
+    category: Optional[str] = None,
+    channel: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """get_sales as plain dicts - columns straight from the cursor, no ORM objects"""
+    page = _sales_page(
+        db.query(*SALE_COLUMNS),
+        skip=skip,
+        limit=limit,
+        start_date=start_date,
+        end_date=end_date,
+        product_id=product_id,
+        category=category,
+        channel=channel,
+        cursor=cursor
+    )
+    return [row._asdict() for row in page]
+
+
+# exported columns and their parquet (arrow) types
+EXPORT_COLUMNS = [
+    ("id", "int64"),
+    ("product_id", "int64"),
+    ("quantity", "int64"),
+    ("unit_price", "double"),
+    ("total_amount", "double"),
+    ("sale_date", "timestamp[us]"),
+    ("channel", "string"),
+]
+
+
+def export_sales(
+    db: Session,
+    batch_size: int = 1000,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    product_id: Optional[int] = None,
+    category: Optional[str] = None,
+    channel: Optional[str] = None
+):
+    """
+    Yield every matching sale as batches of plain row tuples, ordered like get_sales
+    Each batch is its own query, seeking past the last row with the (sale_date, id) keyset -
+    memory stays at one batch on every driver (mysqlconnector has no server-side cursors,
+    a streamed result would be read into memory whole before the first row)
+    """
+    query = _filter_sales(
+        db.query(*(getattr(Sale, name) for name, _ in EXPORT_COLUMNS)),
+        start_date=start_date,
+        end_date=end_date,
+        product_id=product_id,
+        category=category,
+        channel=channel
+    ).order_by(Sale.sale_date, Sale.id)
+    
+    page = query
+    while True:
+        batch = page.limit(batch_size).all()
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        page = query.filter(tuple_(Sale.sale_date, Sale.id) > tuple_(last.sale_date, last.id))
+
+
+@cached("sales", ttl=settings.ANALYTICS_CACHE_TTL, buckets=_date_range_months)
 def get_revenue_analytics(
     db: Session,
     period: str,
@@ -78,72 +382,249 @@ def get_revenue_analytics(
     channel: Optional[str] = None
 ):
     """Get revenue analytics by period"""
+    columns = columns_for(db)
+    if columns:
+        total_sales, total_quantity = columns.totals(start_date, end_date, category=category, channel=channel)
+    else:
+        total_sales, total_quantity = _revenue_query(db, start_date, end_date, category, channel).first()
+    
+    # create response object
+    return {
+        "total_sales": total_sales or 0,
+        "total_quantity": total_quantity or 0,
+        "period": period
+    }
+
+
+def _revenue_query(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    category: Optional[str] = None,
+    channel: Optional[str] = None
+):
+    """Total sales and quantity in a range, SQL path"""
+    source = _analytics_source(start_date, end_date)
+    
     # base query to sum sales and count quantity
     query = db.query(
-        func.sum(Sale.total_amount).label("total_sales"),
-        func.sum(Sale.quantity).label("total_quantity")
-    )
+        func.sum(source.total_amount).label("total_sales"),
+        func.sum(source.quantity).label("total_quantity")
+    ).select_from(source.table)
     
     # apply date range filter
-    next_day = end_date + timedelta(days=1)
-    query = query.filter(and_(
-        Sale.sale_date >= start_date,
-        Sale.sale_date < next_day
-    ))
+    query = query.filter(source.date_filter)
     
     # filter by channel
     if channel:
-        query = query.filter(Sale.channel == channel)
+        query = query.filter(source.channel == channel)
     
     # filter by category (requires join)
     if category:
-        query = query.join(Product).filter(Product.category == category)
+        query = query.join(Product, Product.id == source.product_id).filter(Product.category == category)
     
-    # execute query
-    result = query.first()
+    return query
+
+
+# periods supported by the time series endpoint
+PERIODS = ("daily", "weekly", "monthly", "yearly")
+
+
+def _as_date(value):
+    """Day column value as a date - DATE() comes back as a string on sqlite"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _bucket_start(day: date, period: str):
+    """Truncate a day to the start of its period bucket"""
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())  # weeks start on monday
+    if period == "monthly":
+        return day.replace(day=1)
+    if period == "yearly":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _next_bucket(bucket: date, period: str):
+    """Start of the bucket after this one"""
+    if period == "weekly":
+        return bucket + timedelta(days=7)
+    if period == "monthly":
+        return (bucket + timedelta(days=32)).replace(day=1)
+    if period == "yearly":
+        return bucket.replace(year=bucket.year + 1)
+    return bucket + timedelta(days=1)
+
+
+def _daily_totals(
+    db: Session,
+    periods: List[Tuple[date, date]],
+    category: Optional[str] = None,
+    channel: Optional[str] = None
+):
+    """
+    (day, total sales, total quantity) for each day inside any of the periods that has sales
+    From the columnar engine when it's on, else one grouped query
+    """
+    periods = _merge_ranges(periods)
+    columns = columns_for(db)
+    if columns:
+        return [row for start, end in periods for row in columns.daily(start, end, category=category, channel=channel)]
+    
+    source = _analytics_source(periods[0][0], periods[-1][1])
+    
+    # one query - a row per day that has sales
+    query = db.query(
+        source.day.label("day"),
+        func.sum(source.total_amount).label("total_sales"),
+        func.sum(source.quantity).label("total_quantity")
+    ).select_from(source.table)
+    
+    # only read rows inside some period - touching periods scan as one range
+    query = query.filter(or_(*(source.in_range(start, end) for start, end in periods)))
+    
+    # filter by channel
+    if channel:
+        query = query.filter(source.channel == channel)
+    
+    # filter by category (requires join)
+    if category:
+        query = query.join(Product, Product.id == source.product_id).filter(Product.category == category)
+    
+    return [
+        (_as_date(result.day), result.total_sales, result.total_quantity)
+        for result in query.group_by(source.day).all()
+    ]
+
+
+@cached("sales", ttl=settings.ANALYTICS_CACHE_TTL, buckets=_date_range_months)
+def get_revenue_timeseries(
+    db: Session,
+    period: str,
+    start_date: date,
+    end_date: date,
+    category: Optional[str] = None,
+    channel: Optional[str] = None
+):
+    """
+    Get revenue per period bucket in a single grouped query
+    Groups by day in SQL (portable across mysql/sqlite) and folds days into
+    weekly/monthly/yearly buckets here, zero-filling empty buckets
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+
+    # fold days into buckets
+    totals = {}
+    for day, total_sales, total_quantity in _daily_totals(db, [(start_date, end_date)], category, channel):
+        bucket = _bucket_start(day, period)
+        sales, quantity = totals.get(bucket, (0, 0))
+        totals[bucket] = (sales + (total_sales or 0), quantity + (total_quantity or 0))
+    
+    # zero-fill every bucket in the range
+    buckets = []
+    bucket = _bucket_start(start_date, period)
+    while bucket <= end_date:
+        sales, quantity = totals.get(bucket, (0, 0))
+        buckets.append({
+            "bucket_start": bucket,
+            "total_sales": sales,
+            "total_quantity": quantity
+        })
+        bucket = _next_bucket(bucket, period)
     
-    # create response object
     return {
-        "total_sales": result.total_sales or 0,
-        "total_quantity": result.total_quantity or 0,
-        "period": period
+        "period": period,
+        "start_date": start_date,
+        "end_date": end_date,
+        "buckets": buckets
     }
 
 
+def _merge_ranges(periods: List[Tuple[date, date]]):
+    """Collapse overlapping or back-to-back periods into disjoint date ranges"""
+    merged = []
+    for start, end in sorted(periods):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _percent_change(previous, current):
+    """Change from previous to current in percent, None when previous is 0"""
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 2)
+
+
+@cached("sales", ttl=settings.ANALYTICS_CACHE_TTL, buckets=lambda args: month_buckets(args["periods"]))
 def compare_revenue(
     db: Session,
-    period1_start: date,
-    period1_end: date,
-    period2_start: date,
-    period2_end: date,
+    periods: List[Tuple[date, date]],
     category: Optional[str] = None,
     channel: Optional[str] = None
 ):
-    """Compare revenue between two periods"""
-    # get revenue for period 1
-    period1 = get_revenue_analytics(
-        db=db,
-        period="period1",
-        start_date=period1_start,
-        end_date=period1_end,
-        category=category,
-        channel=channel
+    """
+    Compare revenue across any number of (start, end) periods
+    One grouped query returns per-day totals for the days inside any period,
+    then each period is a difference of running totals - the database does a
+    single pass no matter how many periods are asked for
+    """
+    rows = sorted(
+        (day, total_sales or 0, total_quantity or 0)
+        for day, total_sales, total_quantity in _daily_totals(db, periods, category, channel)
     )
     
-    # get revenue for period 2
-    period2 = get_revenue_analytics(
-        db=db,
-        period="period2",
-        start_date=period2_start,
-        end_date=period2_end,
-        category=category,
-        channel=channel
-    )
+    # running totals over the days, so any period sum is two lookups
+    days = [day for day, _, _ in rows]
+    sales_running = [0]
+    quantity_running = [0]
+    for _, total_sales, total_quantity in rows:
+        sales_running.append(sales_running[-1] + total_sales)
+        quantity_running.append(quantity_running[-1] + total_quantity)
+    
+    # one entry per period, with the change from the previous one
+    comparison = []
+    previous = None
+    for index, (start, end) in enumerate(periods):
+        low = bisect_left(days, start)
+        high = bisect_right(days, end)
+        total_sales = sales_running[high] - sales_running[low]
+        total_quantity = quantity_running[high] - quantity_running[low]
+        
+        entry = {
+            "total_sales": total_sales,
+            "total_quantity": total_quantity,
+            "period": f"period{index + 1}",
+            "start_date": start,
+            "end_date": end,
+            "delta_sales": None,
+            "delta_quantity": None,
+            "pct_change_sales": None,
+            "pct_change_quantity": None
+        }
+        if previous:
+            entry.update({
+                "delta_sales": total_sales - previous["total_sales"],
+                "delta_quantity": total_quantity - previous["total_quantity"],
+                "pct_change_sales": _percent_change(previous["total_sales"], total_sales),
+                "pct_change_quantity": _percent_change(previous["total_quantity"], total_quantity)
+            })
+        
+        comparison.append(entry)
+        previous = entry
     
-    # return both periods for comparison
-    return [period1, period2]
+    return comparison
 
 
+@cached("sales", ttl=settings.ANALYTICS_CACHE_TTL, buckets=_date_range_months)
 def get_sales_by_product(
     db: Session,
     start_date: date,
@@ -151,75 +632,87 @@ def get_sales_by_product(
     limit: int = 10
 ):
     """Get top selling products"""
+    # the maintained windows (last 30 days etc) first - only the top rows are read
+    results = sales_leaderboard.top_products(db, start_date, end_date, limit)
+    if results is None:
+        columns = columns_for(db)
+        if columns:
+            results = columns.by_product(start_date, end_date, limit)
+        else:
+            results = _sales_by_product_query(db, start_date, end_date).limit(limit).all()
+    
+    # format results
+    return [
+        {
+            "product_id": product_id,
+            "total_sales": total_sales,
+            "total_quantity": total_quantity,
+            "period": f"{start_date} to {end_date}"
+        }
+        for product_id, total_sales, total_quantity in results
+    ]
+
+
+def _sales_by_product_query(db: Session, start_date: date, end_date: date):
+    """Sales per product in a range, best sellers first - SQL path"""
+    source = _analytics_source(start_date, end_date)
+    
     # query to get sales by product
     query = db.query(
-        Sale.product_id,
-        func.sum(Sale.total_amount).label("total_sales"),
-        func.sum(Sale.quantity).label("total_quantity")
+        source.product_id.label("product_id"),
+        func.sum(source.total_amount).label("total_sales"),
+        func.sum(source.quantity).label("total_quantity")
     )
     
     # apply date range filter
-    next_day = end_date + timedelta(days=1)
-    query = query.filter(and_(
-        Sale.sale_date >= start_date,
-        Sale.sale_date < next_day
-    ))
+    query = query.filter(source.date_filter)
     
     # group by product and order by sales
-    query = query.group_by(Sale.product_id).order_by(
-        func.sum(Sale.total_amount).desc()
+    return query.group_by(source.product_id).order_by(
+        func.sum(source.total_amount).desc()
     )
-    
-    # limit to top products
-    results = query.limit(limit).all()
+
+
+@cached("sales", ttl=settings.ANALYTICS_CACHE_TTL, buckets=_date_range_months)
+def get_sales_by_category(
+    db: Session,
+    start_date: date,
+    end_date: date
+):
+    """Get sales by product category"""
+    columns = columns_for(db)
+    if columns:
+        results = columns.by_category(start_date, end_date)
+    else:
+        results = _sales_by_category_query(db, start_date, end_date).all()
     
     # format results
     return [
         {
-            "product_id": result.product_id,
-            "total_sales": result.total_sales,
-            "total_quantity": result.total_quantity,
+            "category": category,
+            "total_sales": total_sales,
+            "total_quantity": total_quantity,
             "period": f"{start_date} to {end_date}"
         }
-        for result in results
+        for category, total_sales, total_quantity in results
     ]
 
 
-def get_sales_by_category(
-    db: Session,
-    start_date: date,
-    end_date: date
-):
-    """Get sales by product category"""
+def _sales_by_category_query(db: Session, start_date: date, end_date: date):
+    """Sales per category in a range, biggest first - SQL path"""
+    source = _analytics_source(start_date, end_date)
+    
     # query to get sales by category
     query = db.query(
         Product.category,
-        func.sum(Sale.total_amount).label("total_sales"),
-        func.sum(Sale.quantity).label("total_quantity")
-    )
+        func.sum(source.total_amount).label("total_sales"),
+        func.sum(source.quantity).label("total_quantity")
+    ).select_from(source.table)
     
     # apply date range filter
-    next_day = end_date + timedelta(days=1)
-    query = query.filter(and_(
-        Sale.sale_date >= start_date,
-        Sale.sale_date < next_day
-    ))
+    query = query.filter(source.date_filter)
     
     # join with products and group by category
-    query = query.join(Product).group_by(Product.category).order_by(
-        func.sum(Sale.total_amount).desc()
-    )
-    
-    # get results
-    results = query.all()
-    
-    # format results
-    return [
-        {
-            "category": result.category,
-            "total_sales": result.total_sales,
-            "total_quantity": result.total_quantity,
-            "period": f"{start_date} to {end_date}"
-        }
-        for result in results
-    ]
\ No newline at end of file
+    return query.join(Product, Product.id == source.product_id).group_by(Product.category).order_by(
+        func.sum(source.total_amount).desc()
+    )
\ No newline at end of file
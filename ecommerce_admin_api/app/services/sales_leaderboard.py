@@ -0,0 +1,238 @@
+import time
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from typing import Iterable, Optional
+from datetime import date, timedelta
+
+from ecommerce_admin_api.app.config import settings
+from ecommerce_admin_api.app.database import upsert
+from ecommerce_admin_api.app.models.sale_rollup import SaleDailyRollup
+from ecommerce_admin_api.app.models.sales_leaderboard import SalesLeaderboard, SalesLeaderboardWindow
+from ecommerce_admin_api.app.services.sales_rollup import _field, _sale_day
+
+
+def window_for(start_date: date, end_date: date, today: date):
+    """Maintained window (days before today) for a range ending today, None for other ranges"""
+    if end_date != today:
+        return None
+    window_days = (end_date - start_date).days
+    return window_days if window_days in settings.SALES_LEADERBOARD_WINDOWS else None
+
+
+def _rollup_totals(db: Session, start_date: date, end_date: date):
+    """product id -> (total amount, total quantity, sale count) from the rollup for whole days"""
+    if start_date > end_date:
+        return {}
+    rows = db.execute(
+        select(
+            SaleDailyRollup.product_id,
+            func.sum(SaleDailyRollup.total_amount),
+            func.sum(SaleDailyRollup.total_quantity),
+            func.sum(SaleDailyRollup.sale_count)
+        ).where(and_(
+            SaleDailyRollup.day >= start_date,
+            SaleDailyRollup.day <= end_date,
+            # sales without a product are left out, every maintained row is a product
+            SaleDailyRollup.product_id.isnot(None)
+        )).group_by(SaleDailyRollup.product_id)
+    ).all()
+    return {product_id: (amount or 0, quantity or 0, count or 0) for product_id, amount, quantity, count in rows}
+
+
+def _add(db: Session, totals):
+    """Add (window, product id) -> totals to the leaderboard, one upsert for every window"""
+    if not totals:
+        return
+
+    table = SalesLeaderboard.__table__
+    upsert(
+        db,
+        table,
+        [
+            {
+                "window_days": window_days,
+                "product_id": product_id,
+                "total_amount": amount,
+                "total_quantity": quantity,
+                "sale_count": count
+            }
+            for (window_days, product_id), (amount, quantity, count) in totals.items()
+        ],
+        index_elements=["window_days", "product_id"],
+        set_=lambda new: {
+            "total_amount": table.c.total_amount + new.total_amount,
+            "total_quantity": table.c.total_quantity + new.total_quantity,
+            "sale_count": table.c.sale_count + new.sale_count
+        }
+    )
+
+
+def record_sales(db: Session, sales: Iterable):
+    """
+    Add new sales (Sale objects or row dicts) to the windows they fall in
+    Runs inside the caller's transaction, after sales_rollup.record_sales
+    Windows not built yet are skipped - they are built from the rollup later
+    No lock on the windows: a sale that read a window's day just before refresh()
+    moved it is added by the old day's rules, and refresh() recounts the windows
+    it moved once such writes are done
+    """
+    windows = db.execute(select(SalesLeaderboardWindow.window_days, SalesLeaderboardWindow.as_of)).all()
+    if not windows:
+        return
+
+    totals = {}
+    for sale in sales:
+        product_id = _field(sale, "product_id")
+        if product_id is None:
+            continue
+        day = _sale_day(_field(sale, "sale_date"))
+        for window_days, as_of in windows:
+            # sales dated after as_of are picked up from the rollup when the window gets there
+            if as_of - timedelta(days=window_days) <= day <= as_of:
+                amount, quantity, count = totals.get((window_days, product_id), (0, 0, 0))
+                totals[(window_days, product_id)] = (
+                    amount + _field(sale, "total_amount"), quantity + _field(sale, "quantity"), count + 1
+                )
+
+    _add(db, totals)
+
+
+def _build(db: Session, window_days: int, today: date):
+    """Fill a window from the rollup, False if another worker is building it"""
+    # the window row is the claim, a second builder fails on its primary key
+    try:
+        db.execute(insert(SalesLeaderboardWindow).values(window_days=window_days, as_of=today))
+        db.execute(delete(SalesLeaderboard).where(SalesLeaderboard.window_days == window_days))
+        totals = _rollup_totals(db, today - timedelta(days=window_days), today)
+        _add(db, {(window_days, product_id): values for product_id, values in totals.items()})
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def _advance(db: Session, window_days: int, as_of: date, today: date):
+    """
+    Move a window from as_of to today - days that left it are taken away
+    and days that entered it are added, both from the rollup
+    False if another worker moved it first
+    """
+    # the window row is the claim, only one worker moves it
+    claimed = db.execute(
+        update(SalesLeaderboardWindow)
+        .where(SalesLeaderboardWindow.window_days == window_days, SalesLeaderboardWindow.as_of == as_of)
+        .values(as_of=today)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return False
+
+    old_start = as_of - timedelta(days=window_days)
+    new_start = today - timedelta(days=window_days)
+    totals = {
+        (window_days, product_id): values
+        for product_id, values in _rollup_totals(db, max(as_of + timedelta(days=1), new_start), today).items()
+    }
+    for product_id, (amount, quantity, count) in _rollup_totals(db, old_start, min(as_of, new_start - timedelta(days=1))).items():
+        added = totals.get((window_days, product_id), (0, 0, 0))
+        totals[(window_days, product_id)] = (added[0] - amount, added[1] - quantity, added[2] - count)
+    _add(db, totals)
+
+    # products whose sales all left the window
+    db.execute(delete(SalesLeaderboard).where(and_(
+        SalesLeaderboard.window_days == window_days,
+        SalesLeaderboard.sale_count <= 0
+    )))
+    db.commit()
+    return True
+
+
+def _recount(db: Session, window_days: int):
+    """Replace a window's totals with a fresh sum of the rollup for the day it is at"""
+    # rows first - the delete waits for sale writes still adding to the window, and the rollup
+    # read after it sees them; writes that come later wait for this commit, then add on top
+    db.execute(delete(SalesLeaderboard).where(SalesLeaderboard.window_days == window_days))
+    as_of = db.execute(
+        select(SalesLeaderboardWindow.as_of).where(SalesLeaderboardWindow.window_days == window_days)
+    ).scalar()
+    if as_of is not None:
+        totals = _rollup_totals(db, as_of - timedelta(days=window_days), as_of)
+        _add(db, {(window_days, product_id): values for product_id, values in totals.items()})
+    db.commit()
+
+
+def refresh(db: Session, today: Optional[date] = None, settle: Optional[float] = None):
+    """
+    Build missing windows and move the others to today - scripts/refresh_leaderboard.py,
+    from cron just after midnight. Until a window is at today, its ranges group the rollup
+    Sale writes in flight when a window moved may have used its old day, so once they are
+    done (settle seconds) the moved windows are recounted from the rollup
+    Returns the windows it built or moved
+    """
+    today = today or date.today()
+    settle = settings.SALES_LEADERBOARD_SETTLE_SECONDS if settle is None else settle
+
+    moved = []
+    for window_days in settings.SALES_LEADERBOARD_WINDOWS:
+        as_of = db.execute(
+            select(SalesLeaderboardWindow.as_of).where(SalesLeaderboardWindow.window_days == window_days)
+        ).scalar()
+        if as_of is None:
+            done = _build(db, window_days, today)
+        elif as_of < today:
+            done = _advance(db, window_days, as_of, today)
+        else:
+            # already moved (another job), or ahead of a clock that went back
+            continue
+        if done:
+            moved.append(window_days)
+
+    if moved:
+        # nothing held open while waiting, and the recount's reads start in a new transaction
+        db.rollback()
+        time.sleep(settle)
+        for window_days in moved:
+            _recount(db, window_days)
+    return moved
+
+
+def rebuild(db: Session, today: Optional[date] = None):
+    """Rebuild every configured window from the rollup (after the rollup itself was rebuilt)"""
+    today = today or date.today()
+    db.execute(delete(SalesLeaderboard))
+    db.execute(delete(SalesLeaderboardWindow))
+    db.commit()
+    for window_days in settings.SALES_LEADERBOARD_WINDOWS:
+        _build(db, window_days, today)
+
+
+def top_products(db: Session, start_date: date, end_date: date, limit: int, today: Optional[date] = None):
+    """
+    (product id, total sales, total quantity) of the best sellers from the maintained window,
+    None when the range isn't one, or the window isn't at today yet (the caller groups the rollup instead)
+    Only reads - refresh() builds and moves the windows
+    """
+    if not settings.SALES_LEADERBOARD or not settings.USE_SALES_ROLLUP:
+        return None
+    today = today or date.today()
+    window_days = window_for(start_date, end_date, today)
+    if window_days is None:
+        return None
+
+    as_of = db.execute(
+        select(SalesLeaderboardWindow.as_of).where(SalesLeaderboardWindow.window_days == window_days)
+    ).scalar()
+    # not built, not moved to today yet, or ahead of a clock that went back
+    if as_of != today:
+        return None
+
+    rows = db.execute(
+        select(SalesLeaderboard.product_id, SalesLeaderboard.total_amount, SalesLeaderboard.total_quantity)
+        .where(SalesLeaderboard.window_days == window_days)
+        .order_by(SalesLeaderboard.total_amount.desc())
+        .limit(limit)
+    ).all()
+    return [(product_id, total_sales, total_quantity) for product_id, total_sales, total_quantity in rows]
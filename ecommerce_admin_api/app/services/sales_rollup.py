@@ -0,0 +1,190 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, select, delete, insert
+from typing import Iterable, Optional
+from datetime import date, datetime, timedelta
+
+from ecommerce_admin_api.app.database import upsert
+from ecommerce_admin_api.app.models.sale import Sale
+from ecommerce_admin_api.app.models.sale_rollup import SaleDailyRollup
+
+
+def _sale_day(value):
+    """Day bucket for a sale date"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _field(sale, name):
+    """Read a field from a Sale object or a row dict"""
+    return sale[name] if isinstance(sale, dict) else getattr(sale, name)
+
+
+def record_sales(db: Session, sales: Iterable):
+    """
+    Add new sales (Sale objects or row dicts) to the daily rollup
+    Runs inside the caller's transaction so the rollup commits with the sales
+    """
+    # aggregate first so each bucket is one upsert row
+    buckets = {}
+    for sale in sales:
+        key = (_sale_day(_field(sale, "sale_date")), _field(sale, "product_id"), _field(sale, "channel"))
+        amount, quantity, count = buckets.get(key, (0, 0, 0))
+        buckets[key] = (amount + _field(sale, "total_amount"), quantity + _field(sale, "quantity"), count + 1)
+
+    if not buckets:
+        return
+
+    rows = [
+        {
+            "day": day,
+            "product_id": product_id,
+            "channel": channel,
+            "total_amount": amount,
+            "total_quantity": quantity,
+            "sale_count": count
+        }
+        for (day, product_id, channel), (amount, quantity, count) in buckets.items()
+    ]
+
+    # increment existing buckets, insert new ones
+    table = SaleDailyRollup.__table__
+    upsert(
+        db,
+        table,
+        rows,
+        index_elements=["day", "product_id", "channel"],
+        set_=lambda new: {
+            "total_amount": table.c.total_amount + new.total_amount,
+            "total_quantity": table.c.total_quantity + new.total_quantity,
+            "sale_count": table.c.sale_count + new.sale_count
+        }
+    )
+
+
+def _sales_date_bounds(db):
+    """First and last day that has sales"""
+    first, last = db.execute(select(func.min(Sale.sale_date), func.max(Sale.sale_date))).one()
+    if first is None:
+        return None, None
+    return _sale_day(first), _sale_day(last)
+
+
+def rebuild(
+    db,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    chunk_days: int = 31,
+    commit: bool = True
+):
+    """
+    Rebuild the rollup from the raw sales table (backfill)
+    Works through the range in chunks, committing each one unless commit is False
+    (a migration's connection, which commits once at the end)
+    """
+    first, last = _sales_date_bounds(db)
+    start_date = start_date or first
+    end_date = end_date or last
+    if start_date is None or end_date is None:
+        return 0
+
+    rebuilt = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        next_day = chunk_end + timedelta(days=1)
+
+        # clear the chunk then re-aggregate it in one INSERT ... SELECT
+        db.execute(delete(SaleDailyRollup).where(and_(
+            SaleDailyRollup.day >= chunk_start,
+            SaleDailyRollup.day <= chunk_end
+        )))
+
+        day = func.date(Sale.sale_date)
+        aggregated = select(
+            day,
+            Sale.product_id,
+            Sale.channel,
+            func.sum(Sale.total_amount),
+            func.sum(Sale.quantity),
+            func.count(Sale.id)
+        ).where(and_(
+            Sale.sale_date >= chunk_start,
+            Sale.sale_date < next_day
+        )).group_by(day, Sale.product_id, Sale.channel)
+
+        result = db.execute(insert(SaleDailyRollup).from_select(
+            ["day", "product_id", "channel", "total_amount", "total_quantity", "sale_count"],
+            aggregated
+        ))
+        if commit:
+            db.commit()
+
+        rebuilt += max(result.rowcount or 0, 0)
+        chunk_start = next_day
+
+    return rebuilt
+
+
+def check_consistency(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    tolerance: float = 0.01
+):
+    """
+    Compare the rollup against the raw sales table
+    Returns a list of mismatched buckets (empty means consistent)
+    """
+    first, last = _sales_date_bounds(db)
+    start_date = start_date or first
+    end_date = end_date or last
+    if start_date is None or end_date is None:
+        return []
+
+    next_day = end_date + timedelta(days=1)
+
+    # raw aggregates
+    day = func.date(Sale.sale_date)
+    raw = db.query(
+        day.label("day"),
+        Sale.product_id,
+        Sale.channel,
+        func.sum(Sale.total_amount).label("total_amount"),
+        func.sum(Sale.quantity).label("total_quantity"),
+        func.count(Sale.id).label("sale_count")
+    ).filter(and_(
+        Sale.sale_date >= start_date,
+        Sale.sale_date < next_day
+    )).group_by(day, Sale.product_id, Sale.channel).all()
+
+    # rollup rows for the same range
+    rolled = db.query(SaleDailyRollup).filter(and_(
+        SaleDailyRollup.day >= start_date,
+        SaleDailyRollup.day <= end_date
+    )).all()
+
+    # key on the day as a string - DATE() comes back as str on sqlite
+    expected = {
+        (str(r.day), r.product_id, r.channel): (r.total_amount or 0, r.total_quantity or 0, r.sale_count)
+        for r in raw
+    }
+    # several rows per key when sales lost their product (no unique key on NULL)
+    actual = {}
+    for r in rolled:
+        key = (str(r.day), r.product_id, r.channel)
+        amount, quantity, count = actual.get(key, (0, 0, 0))
+        actual[key] = (amount + (r.total_amount or 0), quantity + (r.total_quantity or 0), count + (r.sale_count or 0))
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key, (0, 0, 0))
+        got = actual.get(key, (0, 0, 0))
+        if abs(want[0] - got[0]) > tolerance or want[1] != got[1] or want[2] != got[2]:
+            mismatches.append({
+                "day": key[0],
+                "product_id": key[1],
+                "channel": key[2],
+                "expected": {"total_amount": want[0], "total_quantity": want[1], "sale_count": want[2]},
+                "actual": {"total_amount": got[0], "total_quantity": got[1], "sale_count": got[2]}
+            })
+
+    return mismatches